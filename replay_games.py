@@ -0,0 +1,28 @@
+#!/usr/bin/env python
+
+"""Replays a file of game records, one JSON record per line (see src/lib/game_replay.py),
+and checks every game ends in its recorded state and winner.
+
+Usage: python replay_games.py FILE [processes] [board|bitboard]
+Use - as FILE to read from stdin.
+"""
+
+import sys
+from src.lib.game_replay import verify_records
+
+# Number of failures printed, all of them are counted
+MAX_PRINTED_FAILURES = 20
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    engine = sys.argv[3] if len(sys.argv) > 3 else 'board'
+    records = sys.stdin if sys.argv[1] == '-' else open(sys.argv[1])
+    report = verify_records(records, processes=processes, engine=engine)
+    for game_id, reason in report.failures[:MAX_PRINTED_FAILURES]:
+        print("{}: {}".format(game_id, reason))
+    print("{} games, {} failed, {:.1f}s, {:.0f} games/s".format(
+        report.games, len(report.failures), report.elapsed, report.games_per_second()))
+    sys.exit(1 if report.failures else 0)
@@ -0,0 +1,13 @@
+#!/usr/bin/env python
+
+# gevent has to patch the standard library before the app creates its locks,
+# so that waiting on a game lock parks a greenlet instead of blocking the process
+from gevent import monkey
+monkey.patch_all()
+
+from gevent.pywsgi import WSGIServer
+from src.app import app
+
+
+if __name__ == "__main__":
+    WSGIServer(('', 8080), app).serve_forever()
@@ -0,0 +1,22 @@
+#!/usr/bin/env python
+
+import os
+import sys
+from src.lib.shard_router import ShardRouter
+
+# Number of game worker processes, defaults to 4
+SHARDS = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+
+
+if __name__ == "__main__":
+    # Workers are forked before the app is imported, so they start without any game.
+    # Persistence is done by the workers, one directory each.
+    router = ShardRouter.start(SHARDS, data_dir=os.environ.pop('DROP_TOKEN_DATA_DIR', None))
+
+    from src.app import app
+    from src.routes.drop_token import set_service
+    set_service(router)
+    try:
+        app.run(port=8080, threaded=True)
+    finally:
+        router.stop()
@@ -1,10 +1,22 @@
+import os
 from flask import Flask, jsonify
+from lib import metrics
+from lib.arena_service import ArenaService
+from lib.game_arena import GameArena
 from lib.exception.api_exception import ApiException
-from routes.drop_token import drop_token_bp
+from routes.drop_token import drop_token_bp, set_service
+from routes.metrics import metrics_bp
 
 
 app = Flask(__name__)
 app.register_blueprint(drop_token_bp)
+# Set DROP_TOKEN_ARENA to a file, e.g. under /dev/shm, to keep games in a shared memory arena,
+# so every worker of a pre-fork server serves every game
+if os.environ.get('DROP_TOKEN_ARENA'):
+    set_service(ArenaService(GameArena(os.environ['DROP_TOKEN_ARENA'])))
+# Times every request and serves /metrics, unless DROP_TOKEN_METRICS=0
+if metrics.ENABLED:
+    app.register_blueprint(metrics_bp)
 
 
 @app.errorhandler(ApiException)
@@ -0,0 +1,34 @@
+"""Nodes per second of the AI player's search from a few positions.
+
+Run with: python -m src.bench.bench_ai_player
+"""
+
+import time
+from ..lib.ai_player import AiPlayer
+from ..lib.drop_token_game import DropTokenGame
+
+TIME_BUDGET = 3
+# Opening moves of each position, board size
+POSITIONS = [
+    ([], 7, 6),
+    ([3, 3, 2, 4, 4], 7, 6),
+    ([0, 1, 2, 3, 4, 5, 6, 0], 7, 6),
+    ([], 10, 10),
+]
+
+
+def main():
+    for columns, width, height in POSITIONS:
+        game = DropTokenGame(width, height, ['red', 'blue'], 1)
+        for col in columns:
+            game.play_token(game.get_players()[game.curr_player_idx], col)
+        ai_player = AiPlayer()
+        start = time.time()
+        col = ai_player.choose_column(game, TIME_BUDGET)
+        elapsed = time.time() - start
+        print("{}x{} after {}: column {}, depth {}, {} nodes, {:.0f} nodes/s".format(
+            width, height, columns, col, ai_player.depth, ai_player.nodes, ai_player.nodes / elapsed))
+
+
+if __name__ == '__main__':
+    main()
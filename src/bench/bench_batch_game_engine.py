@@ -0,0 +1,43 @@
+"""Random games played by the NumPy BatchGameEngine against the same number of
+DropTokenGames played one by one.
+
+Run with: python -m src.bench.bench_batch_game_engine
+"""
+
+import random
+import time
+from ..lib.batch_game_engine import BatchGameEngine
+from ..lib.drop_token_game import DropTokenGame
+from ..lib.game_state import GameState
+from ..lib.exception import InvalidMoveException
+
+GAMES = 20000
+SIZES = [(7, 6), (20, 20)]
+
+
+def play_one_by_one(games, width, height):
+    rand = random.Random(0)
+    for i in xrange(games):
+        game = DropTokenGame(width, height, ['red', 'blue'], i)
+        while game.get_game_state() == GameState.IN_PROGRESS:
+            try:
+                game.play_token(game.get_players()[game.curr_player_idx], rand.randrange(width))
+            except InvalidMoveException:
+                pass
+
+
+def main():
+    for width, height in SIZES:
+        start = time.time()
+        BatchGameEngine(GAMES, width, height).play_random(seed=0)
+        batch = GAMES / (time.time() - start)
+
+        # A tenth of the games is enough to measure the slow path
+        start = time.time()
+        play_one_by_one(GAMES // 10, width, height)
+        one_by_one = GAMES // 10 / (time.time() - start)
+        print("{}x{}: batch {:>9.0f} games/s, DropTokenGame {:>7.0f} games/s".format(width, height, batch, one_by_one))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""Plays the same random games with every board engine and reports games per second.
+
+Run with: python -m src.bench.bench_board
+"""
+
+import random
+import timeit
+from ..lib.board import Board
+from ..lib.bit_board import BitBoard
+from ..lib.game_state import GameState
+from ..lib.drop_token_game import DropTokenGame
+from ..lib.exception import InvalidMoveException
+
+GAMES = 2000
+SIZES = [(4, 4), (7, 6), (20, 20)]
+
+
+def play_games(board_class, width, height, seed=0):
+    rand = random.Random(seed)
+    for i in xrange(GAMES):
+        game = DropTokenGame(width, height, ['red', 'blue'], i, board_class)
+        while game.get_game_state() == GameState.IN_PROGRESS:
+            try:
+                game.play_token(game.get_players()[game.curr_player_idx], rand.randrange(width))
+            except InvalidMoveException:
+                pass
+
+
+def main():
+    for width, height in SIZES:
+        for board_class in (Board, BitBoard):
+            elapsed = timeit.timeit(lambda: play_games(board_class, width, height), number=1)
+            print("{}x{} {:<8} {:>10.0f} games/s".format(width, height, board_class.__name__, GAMES / elapsed))
+
+
+if __name__ == '__main__':
+    main()
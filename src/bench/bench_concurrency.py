@@ -0,0 +1,65 @@
+"""Stress test for game_service.make_move from many threads at once.
+
+Every thread plays random columns as random players on random games, so most calls
+are rejected. Afterwards, every accepted move must show up exactly once in its game's log
+and the logs must still follow the turn order.
+
+Run with: python -m src.bench.bench_concurrency
+"""
+
+import random
+import threading
+import time
+from ..lib import game_service as service
+from ..lib.move_type import MoveType
+from ..lib.exception.api_exception import ApiException
+
+GAMES = 200
+THREADS = 16
+CALLS_PER_THREAD = 20000
+PLAYERS = ['red', 'blue', 'green']
+
+
+def hammer(game_ids, accepted, seed):
+    rand = random.Random(seed)
+    for i in xrange(CALLS_PER_THREAD):
+        game_id = rand.choice(game_ids)
+        try:
+            accepted.append(service.make_move(game_id, rand.choice(PLAYERS), rand.randrange(7))['move'])
+        except ApiException:
+            pass
+
+
+def check_game(game):
+    players = list(PLAYERS)
+    for move in game.iter_moves_taken():
+        assert move.get_type() == MoveType.MOVE
+        assert move.get_player() == players[move.get_move_number() % len(players)]
+
+
+def main():
+    game_ids = [service.create_new_game(list(PLAYERS), 7, 6)['gameId'] for i in xrange(GAMES)]
+    accepted = []
+    threads = [threading.Thread(target=hammer, args=(game_ids, accepted, seed)) for seed in xrange(THREADS)]
+
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - start
+
+    logged = 0
+    for game_id in game_ids:
+        game = service.game_manager.get_game(game_id)
+        logged += len(game.moves_log)
+        if len(game.moves_log):
+            check_game(game)
+    assert len(accepted) == len(set(accepted)), "duplicated moves"
+    assert len(accepted) == logged, "lost moves: {} accepted, {} logged".format(len(accepted), logged)
+    print("{} threads, {} calls, {} moves accepted in {:.2f}s ({:.0f} calls/s)".format(
+        THREADS, THREADS * CALLS_PER_THREAD, logged, elapsed, THREADS * CALLS_PER_THREAD / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Throughput of games kept in a shared memory GameArena, against a GameManager in the process,
+and of several processes playing on the same arena at once, as the workers of a pre-fork server would.
+Every process can only go faster than one up to the number of cores.
+
+Run with: python -m src.bench.bench_game_arena
+"""
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from ..lib.game_arena import GameArena
+from ..lib.game_manager import GameManager
+
+GAMES = 3000
+PROCESSES = [1, 2, 4]
+# The same 7 move win for red every game
+MOVES = [('red', 0), ('blue', 1), ('red', 0), ('blue', 1), ('red', 0), ('blue', 1), ('red', 0)]
+
+
+def play_arena(path, games):
+    arena = GameArena(path)
+    for i in xrange(games):
+        game_id = arena.new_game(['red', 'blue'], 7, 6)
+        for player, col in MOVES:
+            arena.play_token(game_id, player, col)
+            arena.get_game(game_id)
+    arena.close()
+
+
+def play_manager(games):
+    game_manager = GameManager()
+    for i in xrange(games):
+        game_id = game_manager.new_game(['red', 'blue'], 7, 6).get_game_id()
+        for player, col in MOVES:
+            with game_manager.lock_game(game_id):
+                game_manager.get_game(game_id).play_token(player, col)
+            game = game_manager.get_game(game_id)
+            game.get_players(), game.get_game_state(), game.get_winner()
+
+
+def main():
+    directory = tempfile.mkdtemp(prefix='drop_token_arena')
+    try:
+        start = time.time()
+        play_manager(GAMES)
+        print("GameManager, 1 process   {:>8.0f} games/s".format(GAMES / (time.time() - start)))
+
+        print("{} cores".format(multiprocessing.cpu_count()))
+        for processes in PROCESSES:
+            path = os.path.join(directory, 'arena{}'.format(processes))
+            GameArena(path, slots=GAMES).close()
+            workers = [multiprocessing.Process(target=play_arena, args=(path, GAMES // processes))
+                       for i in xrange(processes)]
+            start = time.time()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            print("GameArena, {} process{} {:>8.0f} games/s".format(
+                processes, 'es' if processes > 1 else '  ', GAMES // processes * processes / (time.time() - start)))
+
+        # Reads take no lock and unpack the slot in place
+        arena = GameArena(os.path.join(directory, 'arena1'))
+        start = time.time()
+        for i in xrange(GAMES * 10):
+            arena.get_game('gameid1')
+        print("GameArena state read     {:>8.2f} us".format((time.time() - start) / (GAMES * 10) * 1e6))
+        arena.close()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+"""Games per second on Board with the shared LineIndex and with the board scan it replaces,
+and the one time cost of building the index of each geometry.
+
+Run with: python -m src.bench.bench_line_index
+"""
+
+import timeit
+from ..lib import line_index
+from ..lib.board import Board
+from ..lib.line_index import LineIndex
+from .bench_board import GAMES, play_games
+
+SIZES = [(7, 6), (20, 20), (50, 50)]
+
+
+def main():
+    max_line_cells = line_index.MAX_LINE_CELLS
+    for width, height in SIZES:
+        build = timeit.timeit(lambda: LineIndex(width, height, 4), number=1)
+        indexed = timeit.timeit(lambda: play_games(Board, width, height), number=1)
+        # Indexes already built are still handed out, drop them too
+        line_index.MAX_LINE_CELLS = 0
+        line_index._indexes.clear()
+        try:
+            scanned = timeit.timeit(lambda: play_games(Board, width, height), number=1)
+        finally:
+            line_index.MAX_LINE_CELLS = max_line_cells
+        print("{}x{} index built in {:.1f} ms, {:>6.0f} games/s indexed, {:>6.0f} games/s scanning".format(
+            width, height, build * 1000, GAMES / indexed, GAMES / scanned))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Throughput of the Matchmaker: players joining, with few or many players already waiting,
+rounds of matching turning them into games, made in bulk or one new_game at a time,
+and both together.
+
+Run with: python -m src.bench.bench_matchmaker
+"""
+
+import random
+import time
+from ..lib.game_manager import GameManager
+from ..lib.matchmaker import Matchmaker
+
+PLAYERS = 100000
+SIZES = [(7, 6), (8, 7), (9, 7)]
+BATCH = 2000
+
+
+def join(matchmaker, rand, players, prefix):
+    start = time.time()
+    for i in xrange(players):
+        columns, rows = rand.choice(SIZES)
+        matchmaker.join('{}{}'.format(prefix, i), columns, rows, int(rand.gauss(1500, 300)))
+    return time.time() - start
+
+
+def main():
+    rand = random.Random(0)
+    matchmaker = Matchmaker(GameManager())
+    elapsed = join(matchmaker, rand, BATCH, 'few')
+    print("join, {:>6} waiting     {:>9.0f} players/s".format(0, BATCH / elapsed))
+    elapsed = join(matchmaker, rand, PLAYERS, 'player')
+    print("join, {:>6} waiting     {:>9.0f} players/s".format(BATCH, PLAYERS / elapsed))
+    elapsed = join(matchmaker, rand, BATCH, 'more')
+    print("join, {:>6} waiting     {:>9.0f} players/s".format(BATCH + PLAYERS, BATCH / elapsed))
+
+    start = time.time()
+    games = len(matchmaker.match())
+    elapsed = time.time() - start
+    print("match, bulk new_games    {:>9.0f} games/s ({} games)".format(games / elapsed, games))
+
+    # The same players, with games made one at a time
+    game_manager = GameManager()
+    pairs = [(game.get_players(), game.board.width, game.board.height)
+             for game in matchmaker.game_manager.get_all_games()]
+    start = time.time()
+    for players, columns, rows in pairs:
+        game_manager.new_game(players, columns, rows)
+    elapsed = time.time() - start
+    print("match, one new_game each {:>9.0f} games/s".format(len(pairs) / elapsed))
+
+    # Steady state: a round of matching after every BATCH players join
+    matchmaker = Matchmaker(GameManager())
+    start = time.time()
+    for batch in xrange(PLAYERS // BATCH):
+        join(matchmaker, rand, BATCH, 'batch{}-'.format(batch))
+        matchmaker.match()
+    elapsed = time.time() - start
+    print("join and match           {:>9.0f} players/s, {} left waiting".format(PLAYERS / elapsed,
+                                                                             len(matchmaker.waiting)))
+
+if __name__ == '__main__':
+    main()
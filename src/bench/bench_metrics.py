@@ -0,0 +1,58 @@
+"""Overhead of the metrics: games per second played on the engine and requests per second
+through the Flask app, with DROP_TOKEN_METRICS on and off.
+
+The switch is read at import time, so every run happens in a fresh process.
+
+Run with: python -m src.bench.bench_metrics
+"""
+
+import json
+import os
+import subprocess
+import sys
+import timeit
+
+REQUESTS = 3000
+RUNS = 5
+
+
+def run():
+    """Prints (games/s, requests/s) for the switch set in the environment"""
+    from ..app import app
+    from .bench_board import GAMES, play_games
+    from ..lib.board import Board
+
+    games = GAMES / timeit.timeit(lambda: play_games(Board, 7, 6), number=1)
+
+    client = app.test_client()
+    body = json.dumps({'players': ['red', 'blue'], 'columns': 7, 'rows': 6})
+
+    def requests():
+        for i in xrange(REQUESTS // 10):
+            game_id = json.loads(client.post('/drop_token', data=body).data)['gameId']
+            for col in (0, 1, 0, 1, 0, 1, 0):
+                client.post('/drop_token/{}/{}'.format(game_id, 'red' if col == 0 else 'blue'),
+                            data=json.dumps({'column': col}))
+            client.get('/drop_token/{}'.format(game_id))
+            client.get('/drop_token/{}/moves'.format(game_id))
+    print("{} {}".format(games, REQUESTS / timeit.timeit(requests, number=1)))
+
+
+def main():
+    for enabled in ('0', '1'):
+        env = dict(os.environ, DROP_TOKEN_METRICS=enabled)
+        results = [map(float, subprocess.check_output([sys.executable, '-m', 'src.bench.bench_metrics', 'run'],
+                                                       env=env).split())
+                   for i in xrange(RUNS)]
+        # Best of RUNS, the least disturbed by everything else running
+        games = max(result[0] for result in results)
+        requests = max(result[1] for result in results)
+        print("metrics {:<3} {:>7.0f} games/s {:>7.0f} requests/s".format(
+            'on' if enabled == '1' else 'off', games, requests))
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] == ['run']:
+        run()
+    else:
+        main()
@@ -0,0 +1,74 @@
+"""Write throughput of the write ahead log with and without group commit,
+and recovery time of a snapshot holding many finished games.
+
+Run with: python -m src.bench.bench_persistence [recovered games]
+"""
+
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from ..lib.game_manager import GameManager
+from ..lib.game_persistence import GamePersistence
+
+THREADS = 8
+RECORDS_PER_THREAD = 2000
+RECOVERED_GAMES = 100000
+
+
+def bench_writes(batch_size):
+    directory = tempfile.mkdtemp()
+    try:
+        persistence = GamePersistence(directory, fsync=True, batch_size=batch_size)
+        persistence.attach(GameManager())
+        record = ['M', 'gameid1', 0, 'red', 3]
+
+        def write():
+            for i in xrange(RECORDS_PER_THREAD):
+                persistence.wal.append(record)
+
+        threads = [threading.Thread(target=write) for i in xrange(THREADS)]
+        start = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        persistence.close()
+        elapsed = time.time() - start
+        print("batch size {:>4}: {:>9.0f} records/s".format(batch_size, THREADS * RECORDS_PER_THREAD / elapsed))
+    finally:
+        shutil.rmtree(directory)
+
+
+def bench_recovery(games):
+    directory = tempfile.mkdtemp()
+    try:
+        game_manager = GameManager()
+        persistence = GamePersistence(directory, fsync=False)
+        persistence.attach(game_manager)
+        for i in xrange(games):
+            game = game_manager.new_game(['red', 'blue'], 7, 6)
+            for col in (0, 1, 0, 1, 0, 1):
+                game.play_token(game.get_players()[game.curr_player_idx], col)
+            game.play_token('red', 0)
+        persistence.snapshot()
+        persistence.close()
+
+        start = time.time()
+        GamePersistence(directory).recover(GameManager())
+        elapsed = time.time() - start
+        print("recovered {} games in {:.2f}s".format(games, elapsed))
+    finally:
+        shutil.rmtree(directory)
+
+
+def main():
+    print("{} threads appending {} records each, fsync on".format(THREADS, RECORDS_PER_THREAD))
+    bench_writes(1)
+    bench_writes(256)
+    bench_recovery(int(sys.argv[1]) if len(sys.argv) > 1 else RECOVERED_GAMES)
+
+
+if __name__ == '__main__':
+    main()
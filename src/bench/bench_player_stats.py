@@ -0,0 +1,47 @@
+"""Cost of keeping player stats and the leaderboard up to date as games end,
+and of reading the leaderboard once many games are done.
+
+Run with: python -m src.bench.bench_player_stats
+"""
+
+import random
+import time
+from ..lib.game_manager import GameManager
+from ..lib.player_stats import PlayerStats
+
+GAMES = 100000
+PLAYERS = 10000
+READS = 10000
+
+
+def play_games(game_manager):
+    rand = random.Random(0)
+    for i in xrange(GAMES):
+        players = rand.sample(xrange(PLAYERS), 2)
+        game = game_manager.new_game(['player{}'.format(player) for player in players], 4, 4)
+        for col in (0, 1, 0, 1, 0, 1, 0):
+            game.play_token(game.get_players()[game.curr_player_idx], col)
+
+
+def main():
+    player_stats = PlayerStats()
+    # Stats first, before the heap has grown from the other run
+    for with_stats in (True, False):
+        game_manager = GameManager()
+        if with_stats:
+            player_stats.attach(game_manager)
+        start = time.time()
+        play_games(game_manager)
+        elapsed = time.time() - start
+        print("stats {:<3} {:>7.0f} games/s".format('on' if with_stats else 'off', GAMES / elapsed))
+
+    for k in (10, 100):
+        start = time.time()
+        for i in xrange(READS):
+            player_stats.get_leaderboard(k)
+        elapsed = time.time() - start
+        print("top {:<4} {:>8.1f} us per read after {} games".format(k, elapsed / READS * 1e6, GAMES))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Games per second replayed and verified from a file of game records,
+in this process and across a process pool, on every board engine.
+
+Run with: python -m src.bench.bench_replay [games]
+"""
+
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+from ..lib.drop_token_game import DropTokenGame
+from ..lib.game_replay import ENGINES, game_record, verify_records
+from ..lib.game_state import GameState
+from ..lib.exception import InvalidMoveException
+
+GAMES = 20000
+
+
+def write_records(path, games, seed=0):
+    rand = random.Random(seed)
+    with open(path, 'w') as records:
+        for i in xrange(games):
+            game = DropTokenGame(7, 6, ['red', 'blue'], 'gameid{}'.format(i))
+            while game.get_game_state() == GameState.IN_PROGRESS:
+                try:
+                    game.play_token(game.get_players()[game.curr_player_idx], rand.randrange(7))
+                except InvalidMoveException:
+                    pass
+            records.write(json.dumps(game_record(game)) + '\n')
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else GAMES
+    handle, path = tempfile.mkstemp(suffix='.jsonl')
+    os.close(handle)
+    try:
+        write_records(path, games)
+        print("{} random 7x6 games, {} cores".format(games, multiprocessing.cpu_count()))
+        for engine in sorted(ENGINES):
+            for processes in sorted(set([1, multiprocessing.cpu_count()])):
+                with open(path) as records:
+                    report = verify_records(records, processes=processes, engine=engine)
+                print("{:<8} {:>2} processes {:>9.0f} games/s, {} failed".format(
+                    engine, processes, report.games_per_second(), len(report.failures)))
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
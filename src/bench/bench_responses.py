@@ -0,0 +1,41 @@
+"""Requests per second of the GET game state and moves bodies, rebuilt and encoded
+with the standard json module on every call as before, or served from the response cache.
+
+Run with: python -m src.bench.bench_responses
+"""
+
+import json
+import timeit
+from ..lib import game_service
+from ..lib import json_encoder
+
+CALLS = 20000
+
+
+def play_game():
+    game = game_service.game_manager.new_game(['red', 'blue'], 7, 6)
+    for col in (0, 1, 2, 3, 4, 5, 6, 0, 1, 2, 3, 4, 5, 6, 1, 0, 3, 2, 5, 4):
+        game.play_token(game.get_players()[game.curr_player_idx], col)
+    return game
+
+
+def uncached(game):
+    json.dumps(game_service._state_output(game))
+    json.dumps({'moves': [game_service._move_output(m) for m in game.iter_moves_taken()]})
+
+
+def cached(game):
+    game_service.get_game_state(game.get_game_id())
+    game_service.get_game_moves(game.get_game_id())
+
+
+def main():
+    game = play_game()
+    print("encoder: {}".format('ujson' if json_encoder.ujson is not None else 'json'))
+    for name, function in (('uncached', uncached), ('cached', cached)):
+        elapsed = timeit.timeit(lambda: function(game), number=CALLS)
+        print("{:<8} {:>9.0f} state+moves requests/s".format(name, CALLS / elapsed))
+
+
+if __name__ == '__main__':
+    main()
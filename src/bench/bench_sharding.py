@@ -0,0 +1,48 @@
+"""Throughput of games played through a ShardRouter for different numbers of workers.
+
+Several client processes, each with its own router, play full games at the same time.
+Throughput can only grow with the number of workers up to the number of cores.
+
+Run with: python -m src.bench.bench_sharding
+"""
+
+import multiprocessing
+import time
+from ..lib.shard_router import ShardRouter
+
+CLIENTS = 4
+GAMES_PER_CLIENT = 300
+WORKERS = [1, 2, 4]
+
+
+def play_games(addresses, authkey):
+    router = ShardRouter(addresses, authkey)
+    for i in xrange(GAMES_PER_CLIENT):
+        game_id = router.create_new_game(['red', 'blue'], 7, 6)['gameId']
+        for col in (0, 1, 0, 1, 0, 1, 0):
+            player = 'red' if col == 0 else 'blue'
+            router.make_move(game_id, player, col)
+        router.get_game_state(game_id)
+
+
+def main():
+    print("{} cores, {} clients".format(multiprocessing.cpu_count(), CLIENTS))
+    for workers in WORKERS:
+        router = ShardRouter.start(workers)
+        try:
+            clients = [multiprocessing.Process(target=play_games, args=(router.addresses, router.authkey))
+                       for i in xrange(CLIENTS)]
+            start = time.time()
+            for client in clients:
+                client.start()
+            for client in clients:
+                client.join()
+            elapsed = time.time() - start
+            calls = CLIENTS * GAMES_PER_CLIENT * 9
+            print("{} workers: {:>8.0f} calls/s".format(workers, calls / elapsed))
+        finally:
+            router.stop()
+
+
+if __name__ == '__main__':
+    main()
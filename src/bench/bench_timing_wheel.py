@@ -0,0 +1,46 @@
+"""Cost of scheduling, rescheduling and ticking a TimingWheel holding a million timers,
+with 1 ms ticks and deadlines spread over the next 10 minutes, like turn clocks of a million games.
+
+Run with: python -m src.bench.bench_timing_wheel
+"""
+
+import random
+import time
+from ..lib.timing_wheel import TimingWheel
+
+TIMERS = 1000000
+SPREAD = 600.0
+TICK = 0.001
+RESCHEDULES = 200000
+TICKS = 10000
+
+
+def main():
+    rand = random.Random(0)
+    wheel = TimingWheel(TICK, 0)
+
+    start = time.time()
+    for key in xrange(TIMERS):
+        wheel.schedule(key, rand.uniform(0, SPREAD), key)
+    elapsed = time.time() - start
+    print("schedule    {:>9.0f} timers/s".format(TIMERS / elapsed))
+
+    # A move pushes its game's deadline back by a full turn
+    start = time.time()
+    for i in xrange(RESCHEDULES):
+        key = rand.randrange(TIMERS)
+        wheel.schedule(key, rand.uniform(1, SPREAD), key)
+    elapsed = time.time() - start
+    print("reschedule  {:>9.0f} timers/s".format(RESCHEDULES / elapsed))
+
+    start = time.time()
+    expired = 0
+    for tick in xrange(1, TICKS + 1):
+        expired += len(wheel.advance(tick * TICK))
+    elapsed = time.time() - start
+    print("tick        {:>9.2f} us/tick with {} timers, {} expired".format(
+        elapsed / TICKS * 1e6, len(wheel) + expired, expired))
+
+
+if __name__ == '__main__':
+    main()
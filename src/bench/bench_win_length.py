@@ -0,0 +1,45 @@
+"""Games per second for different win lengths, rule variants and board sizes, on every board engine.
+The standard rules (4 in a row, no variant) are the baseline the others compare to.
+
+Run with: python -m src.bench.bench_win_length
+"""
+
+import random
+import timeit
+from ..lib.board import Board
+from ..lib.bit_board import BitBoard
+from ..lib.game_rules import GameRules
+from ..lib.game_state import GameState
+from ..lib.drop_token_game import DropTokenGame
+from ..lib.exception import InvalidMoveException
+
+GAMES = 1000
+SIZES = [(7, 6), (20, 20)]
+WIN_LENGTHS = [3, 4, 5, 8]
+VARIANTS = [('standard', {}), ('wraparound', {'wraparound': True})]
+
+
+def play_games(board_class, width, height, rules, seed=0):
+    rand = random.Random(seed)
+    for i in xrange(GAMES):
+        game = DropTokenGame(width, height, ['red', 'blue'], i, board_class, rules)
+        while game.get_game_state() == GameState.IN_PROGRESS:
+            try:
+                game.play_token(game.get_players()[game.curr_player_idx], rand.randrange(width))
+            except InvalidMoveException:
+                pass
+
+
+def main():
+    for width, height in SIZES:
+        for win_length in WIN_LENGTHS:
+            for variant, options in VARIANTS:
+                rules = GameRules(win_length, **options)
+                for board_class in (Board, BitBoard):
+                    elapsed = timeit.timeit(lambda: play_games(board_class, width, height, rules), number=1)
+                    print("{}x{} k={} {:<10} {:<8} {:>8.0f} games/s".format(
+                        width, height, win_length, variant, board_class.__name__, GAMES / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,426 @@
+import random
+import time
+from collections import OrderedDict
+from threading import Lock
+from move_type import MoveType
+from game_rules import MATCHES
+from exception import MalformedRequestException
+
+
+# Score of a win found at the root, wins further down score a bit less
+WIN_SCORE = 1000000
+# Number of slots in the transposition table
+TABLE_SIZE = 1 << 16
+# Most cells a board can have for the AI player to search it
+MAX_CELLS = 64 * 64
+# Number of geometries whose Zobrist keys are kept, least recently used dropped first
+MAX_GEOMETRIES = 32
+
+# (column, row) steps of horizontal, vertical, right and left diagonal lines
+DIRECTIONS = ((1, 0), (0, 1), (1, 1), (1, -1))
+
+# Transposition table entry flags
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+# Zobrist keys only depend on the board geometry, so they are shared
+_zobrist_keys = OrderedDict()
+_lock = Lock()
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class SearchBoard:
+    """Bitboard with make/unmake moves and an incrementally updated Zobrist hash.
+
+    Uses the same layout as BitBoard: column c, row r is bit c * (height + 1) + r.
+    Players are indexes into a list of masks. Tokens of players that quit are kept
+    in a separate neutral mask that blocks lines for everyone.
+    """
+
+    def __init__(self, width, height, players, matches=MATCHES):
+        """Arguments
+        width -- int number of columns
+        height -- int number of rows
+        players -- int number of players
+        matches -- int number of tokens in a row needed to win
+        """
+        self.width = width
+        self.height = height
+        self.matches = matches
+        self.col_bits = height + 1
+        self.masks = [0] * players
+        self.neutral = 0
+        self.heights = [0] * width
+        self.tokens = 0
+        self.hash = 0
+        self.shifts = (1, self.col_bits, self.col_bits + 1, self.col_bits - 1)
+        # Mask of the line of matches cells starting at bit 0 in each direction, shifted to any start
+        self._lines = {}
+        for dx, dy in DIRECTIONS:
+            line = 0
+            for i in xrange(matches):
+                line |= 1 << (dx * i * self.col_bits + dy * i)
+            self._lines[dx, dy] = line
+        # Keys per player and cell, the last row is for the neutral player,
+        # and keys for the player to move
+        self.keys, self.turn_keys = _get_zobrist_keys(width, height, players)
+
+
+    @staticmethod
+    def snapshot(game):
+        """Returns (width, height, players, matches, moves) of a DropTokenGame, the arguments of
+        from_moves. It only copies the moves, so it is cheap enough to take holding the game's lock.
+        """
+        if game.rules.wraparound or game.rules.pop_out:
+            raise MalformedRequestException("Auto moves are not available with wraparound or pop out rules.")
+        board = game.get_board()
+        if board.width * board.height > MAX_CELLS:
+            raise MalformedRequestException("Auto moves are limited to boards of {} cells.".format(MAX_CELLS))
+        players = game.get_players()
+        player_idx = dict((player, i) for i, player in enumerate(players))
+        moves = []
+        for move_number in xrange(len(game.moves_log)):
+            move = game.get_move(move_number)
+            if move.get_type() == MoveType.MOVE:
+                moves.append((player_idx.get(move.get_player(), -1), move.get_token().get_column()))
+        return board.width, board.height, len(players), game.rules.win_length, moves
+
+
+    @classmethod
+    def from_moves(cls, width, height, players, matches, moves):
+        """Builds a board from a list of (player index or -1 for neutral, column) moves"""
+        search_board = cls(width, height, players, matches)
+        for player, col in moves:
+            search_board.play(player, col)
+        return search_board
+
+
+    @classmethod
+    def from_game(cls, game):
+        """Builds the board of a DropTokenGame, with players indexed like game.get_players()"""
+        return cls.from_moves(*cls.snapshot(game))
+
+
+    def can_play(self, col):
+        return self.heights[col] < self.height
+
+
+    def play(self, player, col):
+        """Adds a token of player (-1 for neutral) on top of col"""
+        cell = col * self.col_bits + self.heights[col]
+        if player < 0:
+            self.neutral |= 1 << cell
+        else:
+            self.masks[player] |= 1 << cell
+        self.heights[col] += 1
+        self.tokens += 1
+        self.hash ^= self.keys[player][cell]
+
+
+    def undo(self, player, col):
+        """Removes the top token of col, which player played last"""
+        self.heights[col] -= 1
+        self.tokens -= 1
+        cell = col * self.col_bits + self.heights[col]
+        self.masks[player] ^= 1 << cell
+        self.hash ^= self.keys[player][cell]
+
+
+    def is_full(self):
+        return self.tokens == self.width * self.height
+
+
+    def is_win(self, player):
+        mask = self.masks[player]
+        for shift in self.shifts:
+            line = mask
+            for i in xrange(1, self.matches):
+                line &= mask >> (i * shift)
+                if not line:
+                    break
+            if line:
+                return True
+        return False
+
+
+    def windows(self):
+        """Yields the masks of every line of matches cells on the board"""
+        for col in xrange(self.width):
+            for row in xrange(self.height):
+                for window in self._windows_from(col, row):
+                    yield window
+
+
+    def windows_through(self, col, row):
+        """Returns the masks of every line of matches cells on the board going through col, row"""
+        windows = []
+        for back in xrange(self.matches):
+            windows.extend(self._windows_from(col - back, row, (1, 0)))
+            windows.extend(self._windows_from(col, row - back, (0, 1)))
+            windows.extend(self._windows_from(col - back, row - back, (1, 1)))
+            windows.extend(self._windows_from(col - back, row + back, (1, -1)))
+        return windows
+
+
+    def _windows_from(self, col, row, direction=None):
+        """Yields the masks of the lines starting at col, row, in direction (dx, dy) or in all of them"""
+        last = self.matches - 1
+        for dx, dy in (direction,) if direction is not None else DIRECTIONS:
+            if col >= 0 and col + dx * last < self.width and 0 <= row < self.height \
+                    and 0 <= row + dy * last < self.height:
+                yield self._lines[dx, dy] << (col * self.col_bits + row)
+
+
+class TranspositionTable:
+    """Fixed size table of search results, indexed by Zobrist hash.
+
+    A slot is overwritten by a search of the same or greater depth, or by any entry
+    for a different position stored during a later search.
+    """
+
+    def __init__(self, size=TABLE_SIZE):
+        self.size = size
+        self.slots = [None] * size
+        self.generation = 0
+
+
+    def get(self, key):
+        """Returns (depth, flag, value, move) for key, or None"""
+        slot = self.slots[key % self.size]
+        if slot is not None and slot[0] == key:
+            return slot[1:5]
+        return None
+
+
+    def put(self, key, depth, flag, value, move):
+        index = key % self.size
+        slot = self.slots[index]
+        if slot is None or slot[5] != self.generation or depth >= slot[1]:
+            self.slots[index] = (key, depth, flag, value, move, self.generation)
+
+
+class AiPlayer:
+    """Picks a column for the current player of a DropTokenGame.
+
+    Negamax with alpha-beta pruning over a SearchBoard, a TranspositionTable and
+    iterative deepening until the time budget runs out. With more than 2 players,
+    every opponent is assumed to play against the AI player.
+
+    Positions are scored by their open lines. The score is kept up to date move by move
+    from the lines through the cell played, so a node costs the same on any board size.
+    """
+
+    def __init__(self, table=None):
+        """Arguments
+        table -- optional TranspositionTable, kept between searches
+        """
+        self.table = table or TranspositionTable()
+        self.nodes = 0
+        self.depth = 0
+
+
+    def choose_column(self, game, time_budget, max_depth=None):
+        """Returns the column to play for the current player of game
+
+        Arguments
+        game -- in progress DropTokenGame
+        time_budget -- max number of seconds to search
+        max_depth -- optional max number of moves to look ahead
+        """
+        return self.choose_board_column(SearchBoard.from_game(game), game.curr_player_idx,
+                                        len(game.get_players()), time_budget, max_depth)
+
+
+    def choose_board_column(self, board, player, players, time_budget, max_depth=None):
+        """Returns the column to play for player on a SearchBoard, e.g. one copied from a game
+        so the search doesn't have to hold the game's lock
+
+        Arguments
+        board -- SearchBoard, player to move included
+        player -- int index of the player to move
+        players -- int number of players still in the game
+        time_budget -- max number of seconds to search
+        max_depth -- optional max number of moves to look ahead
+        """
+        self.player = player
+        self.players = players
+        self.board = board
+        self.deadline = time.time() + time_budget
+        self.nodes = 0
+        self.depth = 0
+        self.table.generation += 1
+        # Lines through each cell that tokens of players who quit don't block, built on first use
+        self.cell_windows = {}
+        # Lines without a token score nothing
+        occupied = board.neutral
+        for mask in board.masks:
+            occupied |= mask
+        self.score = self._score_lines([window for window in board.windows()
+                                        if window & occupied and not window & board.neutral])
+        # Center columns first, they take part in the most lines
+        center = (board.width - 1) / 2.0
+        self.order = sorted(xrange(board.width), key=lambda col: abs(col - center))
+
+        best_col = next(col for col in self.order if board.can_play(col))
+        remaining = board.width * board.height - board.tokens
+        max_depth = min(max_depth or remaining, remaining)
+        for depth in xrange(1, max_depth + 1):
+            try:
+                value, col = self._search_root(depth)
+            except SearchTimeout:
+                break
+            best_col = col
+            self.depth = depth
+            # No need to look deeper once the outcome is known
+            if abs(value) >= WIN_SCORE - board.width * board.height:
+                break
+        return best_col
+
+
+    def _search_root(self, depth):
+        entry = self.table.get(self._key(self.player))
+        best_value = -WIN_SCORE * 2
+        best_col = None
+        alpha = -WIN_SCORE * 2
+        for col in self._ordered_columns(entry[3] if entry else None):
+            value = self._play_and_search(self.player, col, depth, alpha, WIN_SCORE * 2, 0)
+            if value > best_value:
+                best_value = value
+                best_col = col
+            alpha = max(alpha, value)
+        self.table.put(self._key(self.player), depth, EXACT, best_value, best_col)
+        return best_value, best_col
+
+
+    def _negamax(self, mover, depth, alpha, beta, ply):
+        """Returns the value of the position for the team of mover"""
+        self.nodes += 1
+        if time.time() > self.deadline:
+            raise SearchTimeout()
+
+        key = self._key(mover)
+        entry = self.table.get(key)
+        best_move = None
+        if entry is not None:
+            entry_depth, flag, value, best_move = entry
+            if entry_depth >= depth:
+                if flag == EXACT:
+                    return value
+                if flag == LOWER_BOUND:
+                    alpha = max(alpha, value)
+                elif flag == UPPER_BOUND:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value
+
+        if depth == 0:
+            return self._evaluate(mover)
+
+        alpha_start = alpha
+        best_value = -WIN_SCORE * 2
+        for col in self._ordered_columns(best_move):
+            value = self._play_and_search(mover, col, depth, alpha, beta, ply)
+            if value > best_value:
+                best_value = value
+                best_move = col
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+
+        if best_value <= alpha_start:
+            flag = UPPER_BOUND
+        elif best_value >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self.table.put(key, depth, flag, best_value, best_move)
+        return best_value
+
+
+    def _play_and_search(self, mover, col, depth, alpha, beta, ply):
+        """Plays col for mover, searches the rest and returns the value for mover's team"""
+        board = self.board
+        windows = self._windows_through(col * board.col_bits + board.heights[col])
+        score = self.score
+        before = self._score_lines(windows)
+        board.play(mover, col)
+        self.score += self._score_lines(windows) - before
+        try:
+            if board.is_win(mover):
+                return WIN_SCORE - ply
+            if board.is_full():
+                return 0
+            next_mover = (mover + 1) % self.players
+            if (next_mover == self.player) == (mover == self.player):
+                return self._negamax(next_mover, depth - 1, alpha, beta, ply + 1)
+            return -self._negamax(next_mover, depth - 1, -beta, -alpha, ply + 1)
+        finally:
+            board.undo(mover, col)
+            self.score = score
+
+
+    def _ordered_columns(self, first):
+        if first is not None and self.board.can_play(first):
+            yield first
+        for col in self.order:
+            if col != first and self.board.can_play(col):
+                yield col
+
+
+    def _key(self, mover):
+        # The same tokens with a different player to move is a different position
+        return self.board.hash ^ self.board.turn_keys[mover]
+
+
+    def _evaluate(self, mover):
+        return self.score if mover == self.player else -self.score
+
+
+    def _windows_through(self, cell):
+        windows = self.cell_windows.get(cell)
+        if windows is None:
+            board = self.board
+            col, row = divmod(cell, board.col_bits)
+            windows = self.cell_windows[cell] = [window for window in board.windows_through(col, row)
+                                                 if not window & board.neutral]
+        return windows
+
+
+    def _score_lines(self, windows):
+        """Scores the open lines of each team among windows, 10 times more per extra token in the line"""
+        masks = self.board.masks
+        mine = masks[self.player]
+        theirs = 0
+        for player, mask in enumerate(masks):
+            if player != self.player:
+                theirs |= mask
+        score = 0
+        for window in windows:
+            own = mine & window
+            other = theirs & window
+            if own and not other:
+                score += 10 ** bin(own).count('1')
+            elif other and not own:
+                score -= 10 ** bin(other).count('1')
+        return score
+
+
+def _get_zobrist_keys(width, height, players):
+    """Returns the shared (keys per player and cell, keys per player to move) of a geometry,
+    built on first use
+    """
+    geometry = (width, height, players)
+    with _lock:
+        keys = _zobrist_keys.pop(geometry, None)
+        if keys is None:
+            rand = random.Random(hash(geometry))
+            keys = ([[rand.getrandbits(64) for cell in xrange(width * (height + 1))] for player in xrange(players + 1)],
+                    [rand.getrandbits(64) for player in xrange(players)])
+        _zobrist_keys[geometry] = keys
+        while len(_zobrist_keys) > MAX_GEOMETRIES:
+            _zobrist_keys.popitem(last=False)
+        return keys
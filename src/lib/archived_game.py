@@ -0,0 +1,114 @@
+from game_state import GameState
+from game_rules import GameRules
+from board_view import BoardView
+from response_cache import ResponseCache
+from exception import GameEndedException, NotYourTurnException
+
+
+class ArchivedGame:
+    """Compact, read-only record of a finished DropTokenGame.
+
+    Keeps the players, winner, state and a packed MoveLog but drops the board,
+    so finished games cost a few bytes per move once evicted from GameManager.
+    """
+
+    def __init__(self, game_id, width, height, players, winner, game_state, moves_log, version=None,
+                 board_view=None, response_cache=None, rules=None):
+        """Arguments
+        game_id -- str id/name of the archived game
+        width -- int number of columns the board had
+        height -- int number of rows the board had
+        players -- list of players still in the game when it ended
+        winner -- name of the winner, None for a draw
+        game_state -- final GameState of the game
+        moves_log -- MoveLog of every move taken
+        version -- optional int version the game ended at, defaults to its number of moves
+        board_view -- optional BoardView of the game
+        response_cache -- optional ResponseCache of the game
+        rules -- optional GameRules the game was played with, the standard rules by default
+        """
+        self.game_id = game_id
+        self.width = width
+        self.height = height
+        self.players = players
+        self.winner = winner
+        self.game_state = game_state
+        self.moves_log = moves_log
+        self.version = len(moves_log) if version is None else version
+        self.board_view = board_view
+        self.response_cache = response_cache
+        self.rules = rules or GameRules()
+
+
+    @classmethod
+    def from_game(cls, game):
+        """Compacts a finished DropTokenGame into an ArchivedGame"""
+        board = game.get_board()
+        # The MoveLog is already packed, so it is shared rather than copied
+        return cls(game.get_game_id(), board.width, board.height, list(game.get_players()),
+                   game.get_winner(), game.get_game_state(), game.moves_log, game.version,
+                   game.board_view, game.response_cache, game.rules)
+
+
+    def get_board_view(self):
+        if self.board_view is None:
+            self.board_view = BoardView(self.width, self.height, self.moves_log, self.version)
+        return self.board_view
+
+
+    def get_response_cache(self):
+        if self.response_cache is None:
+            self.response_cache = ResponseCache()
+        return self.response_cache
+
+
+    def get_game_id(self):
+        return self.game_id
+
+
+    def get_winner(self):
+        return self.winner
+
+
+    def get_players(self):
+        return self.players
+
+
+    def get_game_state(self):
+        return self.game_state
+
+
+    def get_all_moves_taken(self, start=None, end=None):
+        return self.moves_log.get_all_moves_taken(start, end)
+
+
+    def iter_moves_taken(self, start=None, end=None):
+        return self.moves_log.iter_moves_taken(start, end)
+
+
+    def get_move(self, move_number):
+        return self.moves_log.get_move(move_number)
+
+
+    def remove_player(self, player):
+        raise GameEndedException("Can't remove player; Game already ended")
+
+
+    def undo_last_move(self):
+        raise GameEndedException("Game '{}' is archived, its moves can't be undone.".format(self.game_id))
+
+
+    def rewind(self, moves):
+        self.undo_last_move()
+
+
+    def check_turn(self, player):
+        raise NotYourTurnException("Game is currently '{}', no moves allowed.".format(self.game_state.name))
+
+
+    def play_token(self, player, col):
+        raise NotYourTurnException("Game is currently '{}', no moves allowed.".format(self.game_state.name))
+
+
+    def pop_token(self, player, col):
+        self.play_token(player, col)
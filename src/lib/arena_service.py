@@ -0,0 +1,180 @@
+import time
+from game_rules import MATCHES
+from game_state import GameState
+from pagination import encode_cursor, decode_cursor
+import json_encoder
+import metrics
+from exception.api_exception import ApiException
+from exception import MalformedRequestException, UnsupportedOperationException
+
+
+# Longest a client can block waiting for new moves, in seconds
+MAX_WAIT = 60
+# Seconds between two looks for new moves while waiting, moves can come from any process
+WAIT_POLL = 0.01
+
+
+class ArenaService:
+    """The functions of game_service on games kept in a GameArena, so that every process mapping
+    the arena serves every game. Only games of standard rules are supported, functions needing
+    more than the arena holds (undo, pop out, AI moves, player indexes, stats, matchmaking)
+    answer 501.
+    """
+
+    def __init__(self, arena):
+        """Arguments
+        arena -- GameArena holding the games
+        """
+        self.arena = arena
+
+
+    def get_all_in_progress_games(self, limit=None, cursor=None):
+        output = {}
+        after = None if cursor is None else decode_cursor(cursor, basestring)
+        # One more than needed tells if there is a next page
+        games = self.arena.get_in_progress_page(after, None if limit is None else limit + 1)
+        if limit is not None and len(games) > limit:
+            games = games[:limit]
+            output['cursor'] = encode_cursor(games[-1])
+        output['games'] = games
+        return output
+
+
+    def create_new_game(self, players, columns, rows, win_length=MATCHES, wraparound=False, pop_out=False,
+                        turn_timeout=None):
+        output = {}
+        if win_length > max(columns, rows):
+            raise MalformedRequestException("'winLength' can't be more than the number of columns or rows.")
+        if win_length < 1:
+            raise MalformedRequestException("'winLength' should be 1 or more.")
+        if wraparound or pop_out or turn_timeout is not None:
+            raise MalformedRequestException("Games in the shared arena only support 'winLength'.")
+        output['gameId'] = self.arena.new_game(players, columns, rows, win_length)
+        return output
+
+
+    def get_game_state(self, game_id):
+        """Returns the JSON body of the state of game_id"""
+        players, game_state, winner, version, moves = self.arena.get_game(game_id)
+        output = {}
+        output['players'] = players
+        output['state'] = game_state.name
+        if game_state == GameState.DONE:
+            output['winner'] = winner
+        return json_encoder.dumps(output)
+
+
+    def get_game_board(self, game_id, since=None):
+        """Returns (version, JSON body) of the whole board of game_id, changes since a version aren't kept"""
+        version, game_state, grid = self.arena.get_board(game_id)
+        return version, json_encoder.dumps({'version': version, 'state': game_state.name, 'board': grid})
+
+
+    def get_game_moves(self, game_id, start=None, end=None, limit=None, cursor=None):
+        """Returns the JSON body of moves start to end of game_id, see game_service.get_game_moves"""
+        if cursor is not None:
+            start = decode_cursor(cursor, (int, long))
+        moves = self.arena.get_moves(game_id, start, end)
+        next_cursor = None
+        if limit is not None and len(moves) > limit:
+            next_cursor = encode_cursor((start or 0) + limit)
+            moves = moves[:limit]
+        return _moves_body([_encode_move(move) for move in moves], next_cursor)
+
+
+    def get_move_fragments(self, game_id, start, limit):
+        """Returns up to limit encoded moves of game_id from move start on, to stream them"""
+        moves = self.arena.get_game(game_id)[4]
+        if start >= moves:
+            return []
+        return [_encode_move(move) for move in self.arena.get_moves(game_id, start, min(moves, start + limit) - 1)]
+
+
+    def wait_for_game_moves(self, game_id, after, wait):
+        """Returns the JSON body of the moves of game_id after move after, waiting up to wait seconds for one"""
+        deadline = time.time() + min(wait, MAX_WAIT)
+        players, game_state, winner, version, moves = self.arena.get_game(game_id)
+        while moves <= after + 1 and game_state == GameState.IN_PROGRESS and time.time() < deadline:
+            time.sleep(WAIT_POLL)
+            players, game_state, winner, version, moves = self.arena.get_game(game_id)
+        if moves > after + 1:
+            return _moves_body([_encode_move(move) for move in self.arena.get_moves(game_id, after + 1)])
+        return _moves_body([])
+
+
+    def make_move(self, game_id, player, column):
+        output = {}
+        move_number = self.arena.play_token(game_id, player, column)
+        output['move'] = '{}/moves/{}'.format(game_id, move_number)
+        return output
+
+
+    def make_moves(self, moves, stop_on_failure=False):
+        """Applies a list of (game_id, player, column) moves in order, see game_service.make_moves"""
+        output = {}
+        results = []
+        failed_games = set()
+        for game_id, player, column in moves:
+            if game_id in failed_games:
+                results.append({'message': "Skipped after an earlier move failed in game '{}'.".format(game_id),
+                                'status': 424})
+                continue
+            try:
+                results.append(self.make_move(game_id, player, column))
+            except ApiException as e:
+                results.append(_error_output(e))
+                if stop_on_failure:
+                    failed_games.add(game_id)
+        output['moves'] = results
+        return output
+
+
+    def get_move(self, game_id, move_number):
+        output = {}
+        output['move'] = _move_output(self.arena.get_moves(game_id, move_number, move_number)[0])
+        return output
+
+
+    def player_quits(self, game_id, player):
+        self.arena.remove_player(game_id, player)
+        return {}
+
+
+    def get_metrics(self):
+        """Returns the metrics of this process, see metrics.Registry.collect"""
+        return metrics.REGISTRY.collect()
+
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        def unsupported(*args, **kwargs):
+            raise UnsupportedOperationException("Not available for games in the shared arena.")
+        return unsupported
+
+
+def _error_output(error):
+    output = error.to_dict()
+    output['status'] = error.status_code
+    return output
+
+
+def _encode_move(move):
+    return json_encoder.dumps(_move_output(move))
+
+
+def _move_output(move):
+    move_type, player, column = move
+    output = {}
+    output['type'] = move_type.name.upper()
+    output['player'] = player
+    if column is not None:
+        output['column'] = column
+    return output
+
+
+def _moves_body(fragments, cursor=None):
+    body = '{"moves":[' + ','.join(fragments) + ']'
+    if cursor is not None:
+        body += ',"cursor":' + json_encoder.dumps(cursor)
+    return body + '}'
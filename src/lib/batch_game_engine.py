@@ -0,0 +1,128 @@
+import numpy as np
+from drop_token_game import DropTokenGame
+from game_rules import GameRules, MATCHES
+
+
+class BatchGameEngine:
+    """Plays many drop-token games of the same board size at once with NumPy.
+
+    Boards are held in a single (games, height, width) int8 array where 0 is an empty cell
+    and i + 1 a token of player i. Each step plays one move in every unfinished game.
+    The rules are the same as DropTokenGame: players take turns in order, moves off the board
+    or into a full column are rejected without using the turn, and a full board is a draw.
+    Players can't quit.
+
+    Needs numpy, which the rest of the service doesn't.
+    """
+
+    def __init__(self, games, width, height, players=2, matches=MATCHES):
+        """Arguments
+        games -- int number of games
+        width -- int number of columns of every board
+        height -- int number of rows of every board
+        players -- int number of players per game
+        matches -- int number of tokens in a row needed to win
+        """
+        self.games = games
+        self.width = width
+        self.height = height
+        self.players = players
+        self.matches = matches
+        self.boards = np.zeros((games, height, width), dtype=np.int8)
+        self.heights = np.zeros((games, width), dtype=np.int32)
+        self.curr_player_idx = np.zeros(games, dtype=np.int32)
+        self.done = np.zeros(games, dtype=bool)
+        # Index of the winning player, -1 for none (yet)
+        self.winner = np.full(games, -1, dtype=np.int32)
+        # Column of every move taken, by game
+        self.moves = np.zeros((games, width * height), dtype=np.int32)
+        self.move_counts = np.zeros(games, dtype=np.int32)
+        self.game_range = np.arange(games)
+
+
+    def legal_columns(self):
+        """Returns a (games, width) bool array of the columns each unfinished game can play"""
+        return (self.heights < self.height) & ~self.done[:, None]
+
+
+    def step(self, columns):
+        """Plays one move for the current player of every unfinished game
+
+        Arguments
+        columns -- int array of one column per game. Entries for finished games are ignored.
+
+        Returns a bool array of the games where the move was played
+        """
+        columns = np.asarray(columns)
+        on_board = (columns >= 0) & (columns < self.width)
+        cols = np.where(on_board, columns, 0)
+        rows = self.heights[self.game_range, cols]
+        played = ~self.done & on_board & (rows < self.height)
+
+        games = self.game_range[played]
+        cols = cols[played]
+        rows = rows[played]
+        players = self.curr_player_idx[played]
+        self.boards[games, rows, cols] = players + 1
+        self.heights[games, cols] += 1
+        self.moves[games, self.move_counts[games]] = cols
+        self.move_counts[games] += 1
+        self.curr_player_idx[games] = (players + 1) % self.players
+
+        won = self._has_line(games, players)
+        self.winner[games[won]] = players[won]
+        full = self.move_counts[games] == self.width * self.height
+        self.done[games[won | full]] = True
+        return played
+
+
+    def play_random(self, seed=None):
+        """Plays random legal moves until every game is done"""
+        rand = np.random.RandomState(seed)
+        while not self.done.all():
+            legal = self.legal_columns()
+            # Random scores, minus 1 for illegal columns, so argmax picks a random legal one
+            scores = rand.random_sample(legal.shape) - ~legal
+            self.step(scores.argmax(axis=1))
+
+
+    def export_game(self, index, players, game_id):
+        """Replays game index as a DropTokenGame
+
+        Arguments
+        index -- int position of the game in this batch
+        players -- list of player names, one per player index
+        game_id -- str id/name of the new DropTokenGame
+        """
+        rules = GameRules(win_length=self.matches) if self.matches != MATCHES else None
+        game = DropTokenGame(self.width, self.height, list(players), game_id, rules=rules)
+        for move_number in xrange(self.move_counts[index]):
+            game.play_token(players[move_number % self.players], int(self.moves[index, move_number]))
+        return game
+
+
+    def _has_line(self, games, players):
+        """Returns a bool array, True for the games where the player has matches tokens in a row.
+        Checks whole boards through sliding windows, which is cheap next to checking only
+        around the last token game by game.
+        """
+        if len(games) == 0:
+            return np.zeros(0, dtype=bool)
+        mine = self.boards[games] == (players + 1)[:, None, None]
+        k = self.matches
+        height, width = self.height, self.width
+        won = np.zeros(len(games), dtype=bool)
+        # (row step, col step) for vertical, horizontal, right diagonal and left diagonal
+        for dy, dx in ((1, 0), (0, 1), (1, 1), (1, -1)):
+            rows = height - (k - 1) * dy
+            cols = width - (k - 1) * abs(dx)
+            if rows <= 0 or cols <= 0:
+                continue
+            col_start = (k - 1) if dx < 0 else 0
+            line = np.ones((len(games), rows, cols), dtype=bool)
+            for i in xrange(k):
+                y = i * dy
+                x = col_start + i * dx
+                line &= mine[:, y:y + rows, x:x + cols]
+            won |= line.any(axis=(1, 2))
+        return won
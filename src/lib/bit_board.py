@@ -0,0 +1,163 @@
+from game_token import GameToken
+from exception import InvalidMoveException
+
+
+class BitBoard:
+    """Bitboard-backed alternative to Board.
+
+    Every player owns a single int bitmask and every column keeps a height counter.
+    Column c, row r is stored at bit c * (height + 1) + r. The extra bit per column is a
+    sentinel row that is never set, so shifted lines can't wrap from one column into the next.
+    """
+
+    def __init__(self, width, height):
+        """Arguments
+        width -- int number of columns on the board
+        height -- int number of rows on the board
+        """
+        self.width = width
+        self.height = height
+        # Bits used by one column, including the sentinel row
+        self.col_bits = height + 1
+        # Number of tokens in each column
+        self.heights = [0] * width
+        # Bitmask of occupied cells per player
+        self.masks = {}
+        self.full_cols = 0
+        # Shift distances for vertical, horizontal, right diagonal and left diagonal lines
+        self.shifts = (1, self.col_bits, self.col_bits + 1, self.col_bits - 1)
+
+
+    def add_token(self, player, col):
+        """Add a token to a column on the board
+
+        Arguments
+        player -- str name of the player adding the token
+        col -- int position of the column that will recieve the new token
+
+        Returns the new GameToken
+        """
+        if not (0 <= col < self.width):
+            raise InvalidMoveException("Move {} is not on the board.".format(col))
+
+        row = self.heights[col]
+        if row == self.height:
+            raise InvalidMoveException("Column {} is full.".format(col))
+
+        self.masks[player] = self.masks.get(player, 0) | (1 << (col * self.col_bits + row))
+        self.heights[col] = row + 1
+        if row + 1 == self.height:
+            self.full_cols += 1
+        return GameToken(col, row, player)
+
+
+    def remove_token(self, col):
+        """Remove the top token of a column, undoing add_token
+
+        Returns the removed GameToken
+        """
+        if self.heights[col] == self.height:
+            self.full_cols -= 1
+        row = self.heights[col] - 1
+        token = self.get_token(col, row)
+        self.masks[token.get_player()] ^= 1 << (col * self.col_bits + row)
+        self.heights[col] = row
+        return token
+
+
+    def pop_token(self, col):
+        """Remove the bottom token of a column, the tokens above fall down one row
+
+        Returns the removed GameToken
+        """
+        token = self.get_token(col, 0)
+        if self.heights[col] == self.height:
+            self.full_cols -= 1
+        column = ((1 << self.height) - 1) << (col * self.col_bits)
+        for player, mask in self.masks.items():
+            # The bottom bit shifts into the sentinel row of the previous column and is masked out
+            self.masks[player] = (mask & ~column) | ((mask & column) >> 1 & column)
+        self.heights[col] -= 1
+        return token
+
+
+    def unpop_token(self, col, player):
+        """Put back a token of player at the bottom of a column, undoing pop_token"""
+        column = ((1 << self.height) - 1) << (col * self.col_bits)
+        for other, mask in self.masks.items():
+            self.masks[other] = (mask & ~column) | ((mask & column) << 1 & column)
+        self.masks[player] = self.masks.get(player, 0) | (1 << (col * self.col_bits))
+        self.heights[col] += 1
+        if self.heights[col] == self.height:
+            self.full_cols += 1
+        return GameToken(col, 0, player)
+
+
+    def get_token(self, x, y):
+        """Retrieve the GameToken at column x, row y
+
+        Returns a token if found, None otherwise
+        """
+        if not (0 <= x < self.width) or not (0 <= y < self.heights[x]):
+            return None
+        bit = 1 << (x * self.col_bits + y)
+        for player, mask in self.masks.iteritems():
+            if mask & bit:
+                return GameToken(x, y, player)
+        return None
+
+
+    def is_full(self):
+        """Returns True if no more tokens can be added to this board"""
+        return self.full_cols == self.width
+
+
+    def make_win_check(self, matches, wraparound=False):
+        """Returns a function telling if the player of a token just played has matches tokens in a row.
+
+        Only the mover's mask can have changed, and a game ends on its first win,
+        so checking that one mask as a whole is enough.
+        With wraparound, the mask is repeated side by side as many times as a line can span,
+        so lines running off the last column carry on into the next copy.
+        """
+        masks = self.masks
+        shifts = self.shifts
+        if not wraparound:
+            return lambda token: _has_line(masks[token.get_player()], shifts, matches)
+
+        copies = 1 + (matches + self.width - 2) // self.width
+        copy_shift = self.width * self.col_bits
+        # A row can't hold more than width distinct tokens
+        wrapping_shifts = shifts[1:] if matches <= self.width else shifts[2:]
+
+        def is_winning_token(token):
+            mask = masks[token.get_player()]
+            if _has_line(mask, shifts[:1], matches):
+                return True
+            repeated = mask
+            for i in xrange(1, copies):
+                repeated |= mask << (i * copy_shift)
+            return _has_line(repeated, wrapping_shifts, matches)
+        return is_winning_token
+
+
+    def is_winning_token(self, token, matches):
+        """Returns True if the player of token has at least matches tokens in a row."""
+        return _has_line(self.masks[token.get_player()], self.shifts, matches)
+
+
+def _has_line(mask, shifts, matches):
+    """Returns True if mask has matches bits in a row along any of shifts.
+    Doubles the run length found at each step, so long lines take log(matches) steps.
+    """
+    for shift in shifts:
+        line = mask
+        length = 1
+        while line and length * 2 <= matches:
+            line &= line >> (length * shift)
+            length *= 2
+        if line and length < matches:
+            line &= line >> ((matches - length) * shift)
+        if line:
+            return True
+    return False
@@ -1,4 +1,6 @@
+from array import array
 from board_column import BoardColumn
+from line_index import get_line_index
 from exception import InvalidMoveException
 
 class Board:
@@ -17,6 +19,12 @@ class Board:
         # It coud be a list, but making it a dictionary helps with fast deletes
         # if in the future we want to undo moves
         self.full_cols = {}
+        # Shared LineIndex of this board's geometry, set by make_win_check
+        self.lines = None
+        # Per player, number of their tokens in each line of self.lines
+        self.line_counts = {}
+        # Per player, number of lines they fill completely
+        self.full_lines = {}
 
 
     def add_token(self, player, col):
@@ -37,6 +45,49 @@ class Board:
         token = self.columns[col].add_token(player)
         if self.columns[col].is_full():
             self.full_cols[col] = self.columns[col]
+        if self.lines is not None:
+            self._count_token(player, col * self.height + token.get_row())
+        return token
+
+
+    def remove_token(self, col):
+        """Remove the top token of a column, undoing add_token
+
+        Arguments
+        col -- int position of the column
+
+        Returns the removed GameToken
+        """
+        token = self.columns[col].remove_token()
+        self.full_cols.pop(col, None)
+        if self.lines is not None:
+            self._uncount_token(token.get_player(), col * self.height + token.get_row())
+        return token
+
+
+    def pop_token(self, col):
+        """Remove the bottom token of a column, the tokens above fall down one row
+
+        Returns the removed GameToken
+        """
+        if self.lines is not None:
+            self._uncount_column(col)
+        token = self.columns[col].pop_bottom()
+        self.full_cols.pop(col, None)
+        if self.lines is not None:
+            self._count_column(col)
+        return token
+
+
+    def unpop_token(self, col, player):
+        """Put back a token of player at the bottom of a column, undoing pop_token"""
+        if self.lines is not None:
+            self._uncount_column(col)
+        token = self.columns[col].push_bottom(player)
+        if self.columns[col].is_full():
+            self.full_cols[col] = self.columns[col]
+        if self.lines is not None:
+            self._count_column(col)
         return token
 
 
@@ -56,3 +107,118 @@ class Board:
     def is_full(self):
         """Returns True if no more tokens can be added to this board"""
         return len(self.full_cols) == self.width
+
+
+    def make_win_check(self, matches, wraparound=False):
+        """Returns a function telling if a token just played is part of matches tokens in a row.
+        With wraparound, lines continue from the last column to the first one.
+
+        When the geometry is small enough to have a LineIndex, the board counts the tokens
+        of each player in every line from then on, and a player has won once one of their
+        counts reaches matches. A game ends on its first line, so the player of a token
+        just played has a full line only if that token is part of it.
+        Otherwise the check walks the board around the token.
+        """
+        self.lines = get_line_index(self.width, self.height, matches, wraparound)
+        self.line_counts = {}
+        self.full_lines = {}
+        if self.lines is not None:
+            for col in self.columns:
+                self._count_column(col)
+            full_lines = self.full_lines
+            return lambda token: full_lines.get(token.get_player(), 0) > 0
+
+        directions = [(1, 0), (0, 1), (1, 1), (1, -1)]
+        if wraparound and matches > self.width:
+            # A row can't hold that many distinct tokens, walking around it would count some twice
+            directions.remove((1, 0))
+        find = self._find_matching_consecutive_tokens
+
+        def is_winning_token(token):
+            for x_diff, y_diff in directions:
+                if find(token, x_diff, y_diff, matches, wraparound) >= matches:
+                    return True
+            return False
+        return is_winning_token
+
+
+    def is_winning_token(self, token, matches):
+        """Checks if there are at least matches consecutive matching tokens in a row.
+        Looks in every direction (horizontal, verticle, right diagonal, left diagonal). 
+        """
+        # horizontal, verticle, right diagonal, left diagonal respectively
+        return self._find_matching_consecutive_tokens(token, 1, 0, matches) >= matches  \
+                or self._find_matching_consecutive_tokens(token, 0, 1, matches) >= matches  \
+                or self._find_matching_consecutive_tokens(token, 1, 1, matches) >= matches  \
+                or self._find_matching_consecutive_tokens(token, 1, -1, matches) >= matches
+
+
+    def _count_token(self, player, cell):
+        counts = self.line_counts.get(player)
+        if counts is None:
+            counts = self.line_counts[player] = array('H', [0]) * self.lines.size
+        win_length = self.lines.win_length
+        for line in self.lines.cell_lines[cell]:
+            count = counts[line] + 1
+            counts[line] = count
+            if count == win_length:
+                self.full_lines[player] = self.full_lines.get(player, 0) + 1
+
+
+    def _uncount_token(self, player, cell):
+        counts = self.line_counts[player]
+        win_length = self.lines.win_length
+        for line in self.lines.cell_lines[cell]:
+            count = counts[line]
+            if count == win_length:
+                self.full_lines[player] -= 1
+            counts[line] = count - 1
+
+
+    def _count_column(self, col):
+        for token in self.columns[col].tokens:
+            self._count_token(token.get_player(), col * self.height + token.get_row())
+
+
+    def _uncount_column(self, col):
+        for token in self.columns[col].tokens:
+            self._uncount_token(token.get_player(), col * self.height + token.get_row())
+
+
+    def _find_matching_consecutive_tokens(self, token, x_diff, y_diff, matches, wraparound=False):
+        """Looks at most matches number of spots in each of 2 opposite directions:
+        +x_diff, +y_diff and -x_diff, -y_diff.
+        With wraparound, columns are taken modulo the width of the board.
+        """
+        width = self.width if wraparound else None
+        found = 0
+        x = token.get_column()
+        y = token.get_row()
+        # We only need to look at at most matches spots
+        # Any more matches than that are pointless
+        for i in xrange(matches):
+            # If we find a token of another player, no point in continuing
+            if not token.has_same_player(self.get_token(x, y)):
+                break
+            found += 1
+            x += x_diff
+            y += y_diff
+            if width:
+                x %= width
+
+        # We already counted the current played token above, so we start at 1 position further
+        # Otherwise, identical to above besides subtracting x_diff and y_diff instead of adding 
+        # (thus moving in the opposite diection)
+        x = token.get_column() - x_diff
+        y = token.get_row() - y_diff
+        if width:
+            x %= width
+        for i in xrange(matches):
+            if not token.has_same_player(self.get_token(x, y)):
+                break
+            found += 1
+            x -= x_diff
+            y -= y_diff
+            if width:
+                x %= width
+        return found
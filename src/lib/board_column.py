@@ -28,6 +28,25 @@ class BoardColumn:
         self.tokens.append(token)
         return token
 
+    def remove_token(self):
+        """Removes and returns the top GameToken of this column"""
+        return self.tokens.pop()
+
+    def pop_bottom(self):
+        """Removes and returns the bottom GameToken, the tokens above fall down one row"""
+        token = self.tokens.pop(0)
+        for above in self.tokens:
+            above.row -= 1
+        return token
+
+    def push_bottom(self, player):
+        """Inserts a token of player at the bottom, undoing pop_bottom. Returns the new GameToken"""
+        for above in self.tokens:
+            above.row += 1
+        token = GameToken(self.position, 0, player)
+        self.tokens.insert(0, token)
+        return token
+
     def get_position(self, position):
         return self.position
 
@@ -0,0 +1,113 @@
+import json_encoder
+from move_type import MoveType
+
+
+class BoardView:
+    """Grid of a game's tokens, kept up to date move by move, with its JSON rendering cached.
+
+    Every change to the game (move, quit or undo) is a new version. The view remembers
+    which cell each version changed, so clients holding an older version can fetch
+    only the cells changed since.
+    """
+
+    def __init__(self, width, height, moves_log, version):
+        """Arguments
+        width -- int number of columns on the board
+        height -- int number of rows on the board
+        moves_log -- MoveLog of the game, replayed once to fill the grid
+        version -- int current version of the game
+        """
+        self.width = width
+        self.height = height
+        # grid[row][column] is the player of that token or None, row 0 at the bottom
+        self.grid = [[None] * width for row in xrange(height)]
+        for move_number in xrange(len(moves_log)):
+            move = moves_log.get_move(move_number)
+            if move.get_type() == MoveType.MOVE:
+                token = move.get_token()
+                self.grid[token.get_row()][token.get_column()] = move.get_player()
+            elif move.get_type() == MoveType.POP:
+                self._shift_column(move.get_token().get_column(), -1, None)
+        # Changes are only known from the version the view was built at
+        self.base_version = version
+        self.version = version
+        # Cells changed by each version after base_version, as lists of (column, row, player)
+        self.changes = []
+        # (version, JSON body) of the last rendering
+        self.rendered = None
+
+
+    def on_move(self, game, move):
+        """DropTokenGame move listener"""
+        token = move.get_token()
+        if move.get_type() == MoveType.QUIT:
+            self._add_change([])
+        elif move.get_type() == MoveType.POP:
+            self._add_change(self._shift_column(token.get_column(), -1, None))
+        else:
+            self._add_change([self._set_cell(token.get_column(), token.get_row(), move.get_player())])
+
+
+    def on_undo(self, game, move):
+        """DropTokenGame undo listener"""
+        token = move.get_token()
+        if move.get_type() == MoveType.QUIT:
+            self._add_change([])
+        elif move.get_type() == MoveType.POP:
+            self._add_change(self._shift_column(token.get_column(), 1, move.get_player()))
+        else:
+            self._add_change([self._set_cell(token.get_column(), token.get_row(), None)])
+
+
+    def render(self, game_state):
+        """Returns (version, JSON body) of the whole board
+
+        Arguments
+        game_state -- GameState of the game, part of the body
+        """
+        rendered = self.rendered
+        if rendered is not None and rendered[0] == self.version:
+            return rendered
+        # Read the version first: a move landing while the grid is copied only
+        # makes the body newer than its version, and it gets rendered again
+        version = self.version
+        body = json_encoder.dumps({'version': version, 'state': game_state.name, 'board': self.grid})
+        self.rendered = (version, body)
+        return self.rendered
+
+
+    def changes_since(self, version):
+        """Returns (version, list of (column, row, player)) of the cells changed after version,
+        or None if they aren't known.
+        """
+        current = self.version
+        if not (self.base_version <= version <= current):
+            return None
+        cells = {}
+        for change in self.changes[version - self.base_version:current - self.base_version]:
+            for col, row, player in change:
+                cells[col, row] = player
+        return current, [(col, row, player) for (col, row), player in sorted(cells.iteritems())]
+
+
+    def _add_change(self, cells):
+        self.changes.append(cells)
+        self.version += 1
+
+
+    def _set_cell(self, col, row, player):
+        self.grid[row][col] = player
+        return (col, row, player)
+
+
+    def _shift_column(self, col, rows, bottom):
+        """Moves the tokens of a column down (rows -1, a pop) or up (rows 1, an undone pop)
+        and puts bottom in the bottom cell. Returns the changed cells.
+        """
+        column = [self.grid[row][col] for row in xrange(self.height)]
+        if rows < 0:
+            column = column[1:] + [None]
+        else:
+            column = [bottom] + column[:-1]
+        return [self._set_cell(col, row, player) for row, player in enumerate(column)
+                if self.grid[row][col] != player]
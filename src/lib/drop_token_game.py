@@ -1,32 +1,44 @@
 from board import Board
+from game_rules import GameRules
 from move import Move
+from move_log import MoveLog
+from board_view import BoardView
+from response_cache import ResponseCache
 from move_type import MoveType
 from game_state import GameState
-from exception import GameEndedException, PlayerNotFoundException, NotYourTurnException, MovesNotFoundException, DuplicatePlayersException
+import metrics
+from exception import GameEndedException, PlayerNotFoundException, NotYourTurnException, MovesNotFoundException, DuplicatePlayersException, InvalidMoveException
 
 
-# Represents how many tokens a player needs in a row to win
-# We could potentially make it a parameter to the game for more flexibility
-MATCHES = 4
+# Win checks are closures made per game, they all share this timer
+_time_win_check = metrics.timed('DropTokenGame._is_winning_token')
 
 
 class DropTokenGame:
     """Class that represents a drop-token game."""
 
-    def __init__(self, width, height, players, game_id):
+    def __init__(self, width, height, players, game_id, board_class=Board, rules=None):
         """Arguments
         width -- int number of columns on the board
         height -- int number of rows on the board
         players -- list of participating players
         game_id -- str id/name of this game
+        board_class -- optional board engine, Board or BitBoard
+        rules -- optional GameRules, the standard rules by default
         """
-        self.board = Board(width, height)
+        self.board = board_class(width, height)
+        self.rules = rules or GameRules()
+        # The board engine builds a win check for these rules once, rather than
+        # looking at them on every move
+        self._is_winning_token = _time_win_check(self.board.make_win_check(self.rules.win_length,
+                                                                           self.rules.wraparound))
         # Simple way of checking for duplicates in a python list
         if len(players) != len(set(players)):
             raise DuplicatePlayersException("All player names should be unique.")
         self.players = players
         self.winner = None
-        self.moves_log = []
+        # Packed log of every move and quit, see MoveLog
+        self.moves_log = MoveLog(players)
         self.game_id = game_id
         # We could potentially have additional game states
         # For example, a STARTING state where players can still join but not move
@@ -34,6 +46,76 @@ class DropTokenGame:
         # Keeps track of who's turn it is
         # We start with the first name in players
         self.curr_player_idx = 0
+        # Functions called as listener(game, old_state) whenever game_state changes
+        self.state_listeners = []
+        # Functions called as listener(game, move) whenever a move or quit is logged
+        self.move_listeners = []
+        # Functions called as listener(game, move) whenever a move or quit is undone
+        self.undo_listeners = []
+        # Position in players and curr_player_idx before each quit, by move number,
+        # so quits can be undone
+        self.quits = {}
+        # Bumped by every move, quit and undo
+        self.version = 0
+        # BoardView built on first use by get_board_view
+        self.board_view = None
+        # ResponseCache built on first use by get_response_cache
+        self.response_cache = None
+
+
+    @classmethod
+    def from_moves_log(cls, width, height, moves_log, game_id, board_class=Board, rules=None):
+        """Rebuilds a game by replaying every move and quit of a MoveLog"""
+        game = cls(width, height, list(moves_log.players), game_id, board_class, rules)
+        for move_number in xrange(len(moves_log)):
+            move = moves_log.get_move(move_number)
+            if move.get_type() == MoveType.QUIT:
+                game.remove_player(move.get_player())
+            elif move.get_type() == MoveType.POP:
+                game.pop_token(move.get_player(), move.get_token().get_column())
+            else:
+                game.play_token(move.get_player(), move.get_token().get_column())
+        return game
+
+
+    def add_state_listener(self, listener):
+        """Register a function called as listener(game, old_state) after every game_state change"""
+        self.state_listeners.append(listener)
+
+
+    def add_move_listener(self, listener):
+        """Register a function called as listener(game, move) after every move or quit,
+        once the game is fully updated.
+        """
+        self.move_listeners.append(listener)
+
+
+    def add_undo_listener(self, listener):
+        """Register a function called as listener(game, move) after every undone move or quit"""
+        self.undo_listeners.append(listener)
+
+
+    def get_board_view(self):
+        """Returns the BoardView of this game, kept up to date from now on.
+        The first call must not run concurrently with changes to the game.
+        """
+        if self.board_view is None:
+            view = BoardView(self.board.width, self.board.height, self.moves_log, self.version)
+            self.add_move_listener(view.on_move)
+            self.add_undo_listener(view.on_undo)
+            self.board_view = view
+        return self.board_view
+
+
+    def get_response_cache(self):
+        """Returns the ResponseCache of this game.
+        The first call must not run concurrently with changes to the game.
+        """
+        if self.response_cache is None:
+            cache = ResponseCache()
+            self.add_undo_listener(cache.on_undo)
+            self.response_cache = cache
+        return self.response_cache
 
 
     def get_game_id(self):
@@ -65,17 +147,12 @@ class DropTokenGame:
         
         Returns a list of Moves from start to end inclusive
         """
-        moves = len(self.moves_log)
-        if moves == 0:
-            raise MovesNotFoundException("No moves made thus far.")
-        if start is None:
-            start = 0
-        if end is None:
-            end = moves-1
-        if start < 0 or start >= end or end >= moves:
-            raise MovesNotFoundException("Moves {} to {} not found. Current total moves: {}.".format(start, end, moves))
+        return self.moves_log.get_all_moves_taken(start, end)
 
-        return self.moves_log[start:end+1]
+
+    def iter_moves_taken(self, start=None, end=None):
+        """Same as get_all_moves_taken, but returns an iterator instead of building a list"""
+        return self.moves_log.iter_moves_taken(start, end)
 
 
     def get_move(self, move_number):
@@ -86,9 +163,7 @@ class DropTokenGame:
 
         Returns a Move
         """
-        if move_number < 0 or move_number >= len(self.moves_log):
-            raise MovesNotFoundException("Move '{}' not found.".format(move_number))
-        return self.moves_log[move_number]
+        return self.moves_log.get_move(move_number)
     
 
     def remove_player(self, player):
@@ -105,18 +180,35 @@ class DropTokenGame:
         if player not in self.players:
             raise PlayerNotFoundException("{} not found in game {}".format(player, self.game_id))
 
+        self.quits[len(self.moves_log)] = (self.players.index(player), self.curr_player_idx)
         self.players.remove(player)
         # If it was that player's turn, we move on to the next player
         self.curr_player_idx %= len(self.players)
         move = Move(MoveType.QUIT, player, len(self.moves_log))
-        self.moves_log.append(move)
+        self.moves_log.append_quit(player)
         # As per the spec, no point in continuing a game with only 1 player
         if len(self.players) == 1:
-            self.game_state = GameState.DONE
             self.winner = self.players[0]
+            self._set_game_state(GameState.DONE)
+        self.version += 1
+        self._notify_move(move)
         return move
 
 
+    def check_turn(self, player):
+        """Raises an exception unless player is allowed to play a token now"""
+        if self.game_state != GameState.IN_PROGRESS:
+            raise NotYourTurnException("Game is currently '{}', no moves allowed.".format(self.game_state.name))
+
+        if player not in self.players:
+            raise PlayerNotFoundException("Player '{}' not part of game.".format(player))
+
+        next_player = self.players[self.curr_player_idx]
+        if player != next_player:
+            raise NotYourTurnException("{}, its not your turn! Next player is {}".format(player, next_player))
+
+
+    @metrics.timed('DropTokenGame.play_token')
     def play_token(self, player, col):
         """Add a new GameToken to the GameBoard.
 
@@ -126,73 +218,132 @@ class DropTokenGame:
 
         Retuns a new Move that represents this action
         """
-        if self.game_state != GameState.IN_PROGRESS:
-            raise NotYourTurnException("Game is currently '{}', no moves allowed.".format(self.game_state.name))
+        self.check_turn(player)
 
-        if player not in self.players:
-            raise PlayerNotFoundException("Player '{}' not part of game.".format(player))
+        token = self.board.add_token(player, col)
 
-        next_player = self.players[self.curr_player_idx]
-        if player != next_player:
-            raise NotYourTurnException("{}, its not your turn! Next player is {}".format(player, next_player))
+        move = Move(MoveType.MOVE, player, len(self.moves_log), token)
+        self.moves_log.append_move(player, token.get_column(), token.get_row())
 
-        token = self.board.add_token(player, col)
+        # Move to the next player in line
+        self.curr_player_idx = (self.curr_player_idx + 1) % len(self.players)
 
         if self._is_winning_token(token):
             self.winner = token.get_player()
-            self.game_state = GameState.DONE
+            self._set_game_state(GameState.DONE)
         # If there is a winner as the board becomes full, we shouldn't draw
-        elif self.board.is_full():
-            self.game_state = GameState.DONE
+        elif self._is_draw():
+            self._set_game_state(GameState.DONE)
 
-        move = Move(MoveType.MOVE, player, len(self.moves_log), token)
-        self.moves_log.append(move)
+        self.version += 1
+        self._notify_move(move)
+        return move
 
-        # Move to the next player in line
+
+    def pop_token(self, player, col):
+        """Pop one of player's tokens out of the bottom of a column, see GameRules.pop_out.
+        The tokens above fall down one row, which can make lines for any player. If the popping
+        player gets one they win, otherwise the next player in turn with a line does.
+
+        Arguments
+        player -- player popping the token
+        col -- int column to pop the bottom token of
+
+        Returns a new Move that represents this action
+        """
+        self.check_turn(player)
+        if not self.rules.pop_out:
+            raise InvalidMoveException("Popping tokens is not allowed in this game.")
+        bottom = self.board.get_token(col, 0)
+        if bottom is None or bottom.get_player() != player:
+            raise InvalidMoveException("{} has no token at the bottom of column {}.".format(player, col))
+
+        self.board.pop_token(col)
+        move = Move(MoveType.POP, player, len(self.moves_log), bottom)
+        self.moves_log.append_pop(player, col)
+
+        popper_idx = self.curr_player_idx
         self.curr_player_idx = (self.curr_player_idx + 1) % len(self.players)
-        
+
+        # Every token that fell can be part of a new line
+        winners = set()
+        for row in xrange(self.board.height):
+            token = self.board.get_token(col, row)
+            if token is None:
+                break
+            if token.get_player() not in winners and self._is_winning_token(token):
+                winners.add(token.get_player())
+        winners.intersection_update(self.players)
+        if winners:
+            players = len(self.players)
+            self.winner = min(winners, key=lambda p: (self.players.index(p) - popper_idx) % players)
+            self._set_game_state(GameState.DONE)
+        elif self._is_draw():
+            self._set_game_state(GameState.DONE)
+
+        self.version += 1
+        self._notify_move(move)
         return move
 
 
-    def _is_winning_token(self, token):
-        """Checks if there are more thant MATHCES consecutive matching tokens in a row.
-        Looks in every direction (horizontal, verticle, right diagonal, left diagonal). 
-        """
-        # horizontal, verticle, right diagonal, left diagonal respectively
-        return self._find_matching_consecutive_tokens(token, 1, 0) >= MATCHES  \
-                or self._find_matching_consecutive_tokens(token, 0, 1) >= MATCHES  \
-                or self._find_matching_consecutive_tokens(token, 1, 1) >= MATCHES  \
-                or self._find_matching_consecutive_tokens(token, 1, -1) >= MATCHES
-        
-       
-    def _find_matching_consecutive_tokens(self, token, x_diff, y_diff):
-        """Looks at most MATCHES number of spots in each of 2 opposite directions:
-        +x_diff, +y_diff and -x_diff, -y_diff.
+    def undo_last_move(self):
+        """Takes back the last move or quit, in constant time.
+        A game that ended with that move is in progress again.
+
+        Returns the undone Move
         """
-        found = 0
-        x = token.get_column()
-        y = token.get_row()
-        # We only need to look at at most MATCHES spots
-        # Any more matches than that are pointless
-        for i in xrange(MATCHES):
-            # If we find a token of another player, no point in continuing
-            if not token.has_same_player(self.board.get_token(x, y)):
-                break
-            found += 1
-            x += x_diff
-            y += y_diff
-
-        # We already counted the current played token above, so we start at 1 position further
-        # Otherwise, identical to above besides subtracting x_diff and y_diff instead of adding 
-        # (thus moving in the opposite diection)
-        x = token.get_column() - x_diff
-        y = token.get_row() - y_diff
-        for i in xrange(MATCHES):
-            if not token.has_same_player(self.board.get_token(x, y)):
-                break
-            found += 1
-            x -= x_diff
-            y -= y_diff
-        return found 
+        move = self.moves_log.pop()
+        if move.get_type() == MoveType.QUIT:
+            index, self.curr_player_idx = self.quits.pop(move.get_move_number())
+            self.players.insert(index, move.get_player())
+        elif move.get_type() == MoveType.POP:
+            self.board.unpop_token(move.get_token().get_column(), move.get_player())
+            self.curr_player_idx = (self.curr_player_idx - 1) % len(self.players)
+        else:
+            self.board.remove_token(move.get_token().get_column())
+            self.curr_player_idx = (self.curr_player_idx - 1) % len(self.players)
+
+        # A game ends on its last move, so before it the game was in progress
+        self.winner = None
+        if self.game_state != GameState.IN_PROGRESS:
+            self._set_game_state(GameState.IN_PROGRESS)
+        self.version += 1
+        for listener in self.undo_listeners:
+            listener(self, move)
+        return move
 
 
+    def rewind(self, moves):
+        """Undoes moves until only the first moves moves are left
+
+        Arguments
+        moves -- int number of moves to keep
+        """
+        if moves < 0 or moves > len(self.moves_log):
+            raise MovesNotFoundException("Can't rewind to move {}. Current total moves: {}.".format(moves, len(self.moves_log)))
+        while len(self.moves_log) > moves:
+            self.undo_last_move()
+
+
+    def _set_game_state(self, game_state):
+        old_state = self.game_state
+        self.game_state = game_state
+        for listener in self.state_listeners:
+            listener(self, old_state)
+
+
+    def _notify_move(self, move):
+        for listener in self.move_listeners:
+            listener(self, move)
+
+
+    def _is_draw(self):
+        """A full board is a draw, unless the next player can still pop a token out of it"""
+        if not self.board.is_full():
+            return False
+        if self.rules.pop_out:
+            next_player = self.players[self.curr_player_idx]
+            for col in xrange(self.board.width):
+                if self.board.get_token(col, 0).get_player() == next_player:
+                    return False
+        return True
@@ -6,4 +6,6 @@ from game_not_found_exception import GameNotFoundException
 from moves_not_found_exception import MovesNotFoundException
 from malformed_request_exception import MalformedRequestException
 from duplicate_players_exception import DuplicatePlayersException
-
+from arena_full_exception import ArenaFullException
+from unsupported_operation_exception import UnsupportedOperationException
+from game_changed_exception import GameChangedException
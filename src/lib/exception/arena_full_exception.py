@@ -0,0 +1,4 @@
+from api_exception import ApiException
+
+class ArenaFullException(ApiException):
+    status_code = 503
@@ -0,0 +1,4 @@
+from api_exception import ApiException
+
+class GameChangedException(ApiException):
+    status_code = 409
@@ -0,0 +1,4 @@
+from api_exception import ApiException
+
+class UnsupportedOperationException(ApiException):
+    status_code = 501
@@ -0,0 +1,571 @@
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from game_manager import GameManager
+from game_state import GameState
+from game_rules import MATCHES
+from move_type import MoveType
+from pagination import game_id_key
+from exception import GameNotFoundException, GameEndedException, PlayerNotFoundException, NotYourTurnException, \
+    InvalidMoveException, MovesNotFoundException, MalformedRequestException, DuplicatePlayersException, \
+    ArenaFullException
+
+
+# Largest games a slot holds
+MAX_COLUMNS = 16
+MAX_ROWS = 16
+MAX_PLAYERS = 8
+# Bytes of a game id or of a utf-8 player name
+NAME_SIZE = 32
+# A game has at most a move per cell and a quit per player
+MAX_MOVES = MAX_COLUMNS * MAX_ROWS + MAX_PLAYERS
+# Slots of a new arena by default, a file of about 76 MB of which only the pages used take memory
+SLOTS = 1 << 16
+# Number of locks shared by the slots within a process, see GameArena.lock_slot
+LOCK_STRIPES = 256
+
+MAGIC = 'DTA2'
+# magic, slots, slots in use, next game number, slot the next recycling scan starts at
+HEADER = struct.Struct('<4sIIQI')
+# First and last slot of the list of in progress games, right after HEADER
+ENDS = struct.Struct('<II')
+ENDS_OFFSET = HEADER.size
+HEADER_SIZE = 64
+# Index entries are the slot number plus 1, 0 for an empty entry
+INDEX_ENTRY = struct.Struct('<I')
+# Per slot, the previous and next slot in the list of in progress games, and 1 while in the list.
+# Slot numbers in the list are plus 1, 0 for none. Games taken out of the list keep their previous slot.
+LINK = struct.Struct('<III')
+# seq, game id, columns, rows, win length, players, bit mask of the players still in,
+# index of the player to move, state, winner index (NO_WINNER if none), moves, version.
+# seq is odd while the slot is being written, see GameArena.read.
+SLOT_HEADER = struct.Struct('<I{}sBBBBBBBBHI'.format(NAME_SIZE))
+SEQ = struct.Struct('<I')
+NAMES = struct.Struct('<' + '{}s'.format(NAME_SIZE) * MAX_PLAYERS)
+NO_WINNER = 0xFF
+IN_PROGRESS, DONE = 0, 1
+# Followed by the player names (NAMES), the height of every column, a byte per cell holding
+# the index of its player plus 1 (0 if empty), column after column, and the moves,
+# two bytes each: the player index, plus QUIT_BIT for quits, and the column
+NAMES_OFFSET = SLOT_HEADER.size
+HEIGHTS_OFFSET = NAMES_OFFSET + MAX_PLAYERS * NAME_SIZE
+CELLS_OFFSET = HEIGHTS_OFFSET + MAX_COLUMNS
+MOVES_OFFSET = CELLS_OFFSET + MAX_COLUMNS * MAX_ROWS
+QUIT_BIT = 0x80
+# Slots are cache line aligned
+SLOT_SIZE = (MOVES_OFFSET + 2 * MAX_MOVES + 63) // 64 * 64
+
+# Directions a line can take: right, up and both diagonals
+DIRECTIONS = ((1, 0), (0, 1), (1, 1), (1, -1))
+
+
+class GameArena:
+    """Games of standard rules kept in a memory mapped file of fixed size slots, so that every
+    process mapping the same file, e.g. the workers of a pre-fork server, serves every game.
+
+    The file starts with a header, then an open addressing hash table from game id to slot,
+    the links of a list of the in progress games in creation order, then the slots. A slot holds
+    all of a game: its players, the cells and column heights of its board, turn, state, winner
+    and log of moves.
+
+    Changes to a slot are serialized by a lock on its first byte of the file (fcntl), and
+    within a process by a thread lock. Reads take no lock: a slot's seq is odd while a change
+    is written and bumped once done, so readers unpack fields straight from the mapping,
+    then retry if seq moved. New games take the lock on the header. Once every slot is used,
+    new games take the slot of the oldest finished game, which is then gone.
+    """
+
+    def __init__(self, path, slots=SLOTS, lock_stripes=LOCK_STRIPES):
+        """Opens the arena in file path, making it if it doesn't exist
+
+        Arguments
+        path -- file of the arena, e.g. under /dev/shm to keep it in memory
+        slots -- optional int number of slots of a new arena, an existing one keeps its own
+        lock_stripes -- optional int number of thread locks the slots are spread over
+        """
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0600)
+        self.thread_locks = [threading.Lock() for i in xrange(lock_stripes)]
+        self.header_thread_lock = threading.Lock()
+        with self.header_thread_lock:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, 1, 0)
+            try:
+                if os.fstat(self.fd).st_size == 0:
+                    self._layout(slots)
+                    os.ftruncate(self.fd, self.size)
+                    self.map = mmap.mmap(self.fd, self.size)
+                    HEADER.pack_into(self.map, 0, MAGIC, slots, 0, 1, 0)
+                else:
+                    header = os.read(self.fd, HEADER.size)
+                    if len(header) < HEADER.size or HEADER.unpack(header)[0] != MAGIC:
+                        raise ValueError("{} is not a game arena.".format(path))
+                    self._layout(HEADER.unpack(header)[1])
+                    self.map = mmap.mmap(self.fd, self.size)
+            finally:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN, 1, 0)
+
+
+    def close(self):
+        self.map.close()
+        os.close(self.fd)
+
+
+    def lock_slot(self, slot):
+        """Returns the lock to hold while changing slot, across threads and processes"""
+        return _ArenaLock(self.fd, self.thread_locks[slot % len(self.thread_locks)], self._slot_offset(slot))
+
+
+    def new_game(self, players, columns, rows, win_length=MATCHES):
+        """Makes a game of standard rules and returns its id
+
+        Arguments
+        players -- list of players to join, must not contain duplicates
+        columns -- width of the board, at most MAX_COLUMNS
+        rows -- height of the board, at most MAX_ROWS
+        win_length -- optional number of tokens in a row needed to win
+        """
+        if not (1 <= columns <= MAX_COLUMNS and 1 <= rows <= MAX_ROWS):
+            raise MalformedRequestException("Boards are limited to {} columns and {} rows.".format(MAX_COLUMNS, MAX_ROWS))
+        if not (1 <= len(players) <= MAX_PLAYERS):
+            raise MalformedRequestException("Games are limited to {} players.".format(MAX_PLAYERS))
+        if not all(isinstance(player, basestring) for player in players):
+            raise MalformedRequestException("Player names should be strings.")
+        if len(players) != len(set(players)):
+            raise DuplicatePlayersException("All player names should be unique.")
+        names = [player.encode('utf-8') for player in players]
+        if max(len(name) for name in names) > NAME_SIZE:
+            raise MalformedRequestException("Player names are limited to {} bytes.".format(NAME_SIZE))
+
+        with _ArenaLock(self.fd, self.header_thread_lock, 0):
+            magic, slots, used, number, recycle = HEADER.unpack_from(self.map, 0)
+            game_id = GameManager.game_id_prefix + str(number)
+            if used < slots:
+                slot = used
+                used += 1
+            else:
+                slot = self._recycle(recycle)
+                recycle = (slot + 1) % slots
+            with self.lock_slot(slot):
+                offset = self._slot_offset(slot)
+                self._begin_write(offset)
+                self.map[offset + SEQ.size:offset + SLOT_SIZE] = '\0' * (SLOT_SIZE - SEQ.size)
+                SLOT_HEADER.pack_into(self.map, offset, SEQ.unpack_from(self.map, offset)[0], game_id,
+                                      columns, rows, min(win_length, 255), len(players), (1 << len(players)) - 1,
+                                      0, IN_PROGRESS, NO_WINNER, 0, 0)
+                for index, name in enumerate(names):
+                    name_offset = offset + NAMES_OFFSET + index * NAME_SIZE
+                    self.map[name_offset:name_offset + len(name)] = name
+                self._end_write(offset)
+            # Published once the slot is written, for readers who don't lock
+            self._index_insert(game_id, slot)
+            self._link(slot)
+            HEADER.pack_into(self.map, 0, magic, slots, used, number + 1, recycle)
+        return game_id
+
+
+    def play_token(self, game_id, player, col):
+        """Drops a token of player in column col, returns the move number"""
+        slot = self._find_slot(game_id)
+        with self.lock_slot(slot):
+            offset = self._slot_offset(slot)
+            header = self._check_slot(offset, game_id)
+            seq, slot_id, columns, rows, win_length, players, active, turn, state, winner, moves, version = header
+            names = self._read_names(offset, players)
+            if state != IN_PROGRESS:
+                raise NotYourTurnException("Game is currently 'DONE', no moves allowed.")
+            if player not in names or not active >> names.index(player) & 1:
+                raise PlayerNotFoundException("Player '{}' not part of game.".format(player))
+            if player != names[turn]:
+                raise NotYourTurnException("{}, its not your turn! Next player is {}".format(player, names[turn]))
+            if not (0 <= col < columns):
+                raise InvalidMoveException("Move {} is not on the board.".format(col))
+            heights = bytearray(self.map[offset + HEIGHTS_OFFSET:offset + HEIGHTS_OFFSET + columns])
+            row = heights[col]
+            if row == rows:
+                raise InvalidMoveException("Column {} is full.".format(col))
+
+            cells = bytearray(self.map[offset + CELLS_OFFSET:offset + CELLS_OFFSET + columns * MAX_ROWS])
+            cells[col * MAX_ROWS + row] = turn + 1
+            if _is_winning_cell(cells, columns, rows, win_length, col, row):
+                state, winner = DONE, turn
+            # If there is a winner as the board becomes full, we shouldn't draw
+            elif sum(heights) + 1 == columns * rows:
+                state = DONE
+
+            self._begin_write(offset)
+            self.map[offset + CELLS_OFFSET + col * MAX_ROWS + row] = chr(turn + 1)
+            self.map[offset + HEIGHTS_OFFSET + col] = chr(row + 1)
+            self.map[offset + MOVES_OFFSET + 2 * moves:offset + MOVES_OFFSET + 2 * moves + 2] = chr(turn) + chr(col)
+            SLOT_HEADER.pack_into(self.map, offset, seq + 1, slot_id, columns, rows, win_length, players, active,
+                                  _next_player(active, players, turn), state, winner, moves + 1, version + 1)
+            self._end_write(offset)
+        if state == DONE:
+            self._game_done(slot, game_id)
+        return moves
+
+
+    def remove_player(self, game_id, player):
+        """Takes player out of the game, as they quit. Returns the move number of the quit."""
+        slot = self._find_slot(game_id)
+        with self.lock_slot(slot):
+            offset = self._slot_offset(slot)
+            header = self._check_slot(offset, game_id)
+            seq, slot_id, columns, rows, win_length, players, active, turn, state, winner, moves, version = header
+            names = self._read_names(offset, players)
+            if state != IN_PROGRESS:
+                raise GameEndedException("Can't remove player; Game already ended")
+            if player not in names or not active >> names.index(player) & 1:
+                raise PlayerNotFoundException("{} not found in game {}".format(player, game_id))
+
+            index = names.index(player)
+            active &= ~(1 << index)
+            # If it was that player's turn, we move on to the next player
+            if turn == index:
+                turn = _next_player(active, players, turn)
+            # As per the spec, no point in continuing a game with only 1 player
+            if active & (active - 1) == 0:
+                state, winner = DONE, turn
+
+            self._begin_write(offset)
+            self.map[offset + MOVES_OFFSET + 2 * moves:offset + MOVES_OFFSET + 2 * moves + 2] = chr(index | QUIT_BIT) + '\0'
+            SLOT_HEADER.pack_into(self.map, offset, seq + 1, slot_id, columns, rows, win_length, players, active,
+                                  turn, state, winner, moves + 1, version + 1)
+            self._end_write(offset)
+        if state == DONE:
+            self._game_done(slot, game_id)
+        return moves
+
+
+    def get_game(self, game_id):
+        """Returns (players still in, GameState, winner or None, version, number of moves) of game_id"""
+        return self.read(game_id, self._read_game)
+
+
+    def get_moves(self, game_id, start=None, end=None):
+        """Returns the list of (MoveType, player, column or None) of moves start to end inclusive,
+        by default every move. Raises MovesNotFoundException if out of range.
+        """
+        return self.read(game_id, lambda offset: self._read_moves(offset, start, end))
+
+
+    def get_board(self, game_id):
+        """Returns (version, GameState, grid) of game_id, where grid[row][column] is the player
+        of that token or None, row 0 at the bottom
+        """
+        return self.read(game_id, self._read_board)
+
+
+    def get_in_progress_page(self, after=None, limit=None):
+        """Returns the ids of the in progress games, in creation order, starting after game id
+        after, at most limit of them. Walks the list of in progress games from after on, so a page
+        costs as much as its games.
+        """
+        game_ids = []
+        after_key = None if after is None else game_id_key(after)
+        with _ArenaLock(self.fd, self.header_thread_lock, 0):
+            slot = ENDS.unpack_from(self.map, ENDS_OFFSET)[0] - 1
+            found = None
+            if after is not None:
+                found = self._index_lookup(after.encode('utf-8') if isinstance(after, unicode) else str(after))
+            # A finished game leads back to the game before it in the list when it was taken out,
+            # which may have finished since too, until one still in the list
+            while found is not None:
+                previous, following, linked = self._get_link(found)
+                if linked:
+                    slot = following - 1
+                    break
+                found = previous - 1 if previous else None
+                # A slot recycled since holds a newer game, the list is walked from its start
+                if found is not None and game_id_key(self._slot_game_id(self._slot_offset(found))) >= after_key:
+                    found = None
+            while slot >= 0 and (limit is None or len(game_ids) < limit):
+                offset = self._slot_offset(slot)
+                # Games that just ended can still be in the list
+                if SLOT_HEADER.unpack_from(self.map, offset)[8] == IN_PROGRESS:
+                    game_id = self._slot_game_id(offset)
+                    if after_key is None or game_id_key(game_id) > after_key:
+                        game_ids.append(game_id)
+                slot = self._get_link(slot)[1] - 1
+        return game_ids
+
+
+    def read(self, game_id, read):
+        """Returns read(offset of the slot of game_id), from a slot no one changed meanwhile.
+        read may be called more than once and must not change anything. An exception it raises
+        is only passed on if the slot didn't change meanwhile, else it came from a torn read.
+        """
+        while True:
+            offset = self._slot_offset(self._find_slot(game_id))
+            seq = SEQ.unpack_from(self.map, offset)[0]
+            if seq & 1:
+                # Being written, by another thread or process
+                time.sleep(0)
+                continue
+            try:
+                result = read(offset)
+            except Exception:
+                if SEQ.unpack_from(self.map, offset)[0] == seq and self._slot_game_id(offset) == game_id:
+                    raise
+                continue
+            if SEQ.unpack_from(self.map, offset)[0] == seq:
+                if self._slot_game_id(offset) != game_id:
+                    # Taken by a new game since it was looked up
+                    continue
+                return result
+
+
+    def _layout(self, slots):
+        self.slots = slots
+        # Half full at most, so probes stay short
+        self.index_size = 1
+        while self.index_size < 2 * slots:
+            self.index_size *= 2
+        self.links_offset = HEADER_SIZE + self.index_size * INDEX_ENTRY.size
+        self.slots_offset = (self.links_offset + slots * LINK.size + 63) // 64 * 64
+        self.size = self.slots_offset + slots * SLOT_SIZE
+
+
+    def _slot_offset(self, slot):
+        return self.slots_offset + slot * SLOT_SIZE
+
+
+    def _slot_game_id(self, offset):
+        return self.map[offset + SEQ.size:offset + SEQ.size + NAME_SIZE].rstrip('\0')
+
+
+    def _find_slot(self, game_id):
+        """Returns the slot of game_id, raises GameNotFoundException if there is none"""
+        game_id = game_id.encode('utf-8') if isinstance(game_id, unicode) else str(game_id)
+        slot = self._index_lookup(game_id)
+        if slot is None:
+            # A lookup racing the removal of another game from the index can miss,
+            # there is none while holding the header lock
+            with _ArenaLock(self.fd, self.header_thread_lock, 0):
+                slot = self._index_lookup(game_id)
+        if slot is None:
+            raise GameNotFoundException("Game '{}' not found.".format(game_id))
+        return slot
+
+
+    def _index_lookup(self, game_id):
+        mask = self.index_size - 1
+        position = zlib.crc32(game_id) & mask
+        while True:
+            entry = INDEX_ENTRY.unpack_from(self.map, HEADER_SIZE + position * INDEX_ENTRY.size)[0]
+            if entry == 0:
+                return None
+            if self._slot_game_id(self._slot_offset(entry - 1)) == game_id:
+                return entry - 1
+            position = (position + 1) & mask
+
+
+    def _index_insert(self, game_id, slot):
+        """Must be called holding the header lock"""
+        mask = self.index_size - 1
+        position = zlib.crc32(game_id) & mask
+        while INDEX_ENTRY.unpack_from(self.map, HEADER_SIZE + position * INDEX_ENTRY.size)[0]:
+            position = (position + 1) & mask
+        INDEX_ENTRY.pack_into(self.map, HEADER_SIZE + position * INDEX_ENTRY.size, slot + 1)
+
+
+    def _index_remove(self, game_id):
+        """Removes game_id by shifting back the entries after it, so no probe ends early on a hole.
+        Must be called holding the header lock.
+        """
+        mask = self.index_size - 1
+        position = zlib.crc32(game_id) & mask
+        while self._slot_game_id(self._slot_offset(self._index_entry(position) - 1)) != game_id:
+            position = (position + 1) & mask
+        hole = position
+        while True:
+            position = (position + 1) & mask
+            entry = self._index_entry(position)
+            if entry == 0:
+                break
+            home = zlib.crc32(self._slot_game_id(self._slot_offset(entry - 1))) & mask
+            # Entries whose home is cyclically after the hole, up to them, must stay
+            if (position - home) & mask >= (position - hole) & mask:
+                INDEX_ENTRY.pack_into(self.map, HEADER_SIZE + hole * INDEX_ENTRY.size, entry)
+                hole = position
+        INDEX_ENTRY.pack_into(self.map, HEADER_SIZE + hole * INDEX_ENTRY.size, 0)
+
+
+    def _index_entry(self, position):
+        return INDEX_ENTRY.unpack_from(self.map, HEADER_SIZE + position * INDEX_ENTRY.size)[0]
+
+
+    def _get_link(self, slot):
+        """Returns (previous slot + 1, next slot + 1, 1 if in the list) of slot"""
+        return LINK.unpack_from(self.map, self.links_offset + slot * LINK.size)
+
+
+    def _set_link(self, slot, previous, following, linked=1):
+        LINK.pack_into(self.map, self.links_offset + slot * LINK.size, previous, following, linked)
+
+
+    def _link(self, slot):
+        """Adds slot at the end of the list of in progress games. Must be called holding the header lock."""
+        head, tail = ENDS.unpack_from(self.map, ENDS_OFFSET)
+        self._set_link(slot, tail, 0)
+        if tail:
+            self._set_link(tail - 1, self._get_link(tail - 1)[0], slot + 1)
+        else:
+            head = slot + 1
+        ENDS.pack_into(self.map, ENDS_OFFSET, head, slot + 1)
+
+
+    def _unlink(self, slot):
+        """Takes slot out of the list of in progress games, if it is in it.
+        Must be called holding the header lock.
+        """
+        previous, following, linked = self._get_link(slot)
+        if not linked:
+            return
+        head, tail = ENDS.unpack_from(self.map, ENDS_OFFSET)
+        if previous:
+            self._set_link(previous - 1, self._get_link(previous - 1)[0], following)
+        else:
+            head = following
+        if following:
+            self._set_link(following - 1, previous, self._get_link(following - 1)[1])
+        else:
+            tail = previous
+        ENDS.pack_into(self.map, ENDS_OFFSET, head, tail)
+        self._set_link(slot, previous, 0, 0)
+
+
+    def _game_done(self, slot, game_id):
+        """Takes the game that just ended out of the list of in progress games, unless its slot
+        was already recycled. Must not be called holding a slot's lock.
+        """
+        with _ArenaLock(self.fd, self.header_thread_lock, 0):
+            if self._slot_game_id(self._slot_offset(slot)) == game_id:
+                self._unlink(slot)
+
+
+    def _recycle(self, start):
+        """Returns the first slot from start on, cyclically, holding a finished game, after removing
+        that game from the index. Must be called holding the header lock.
+        """
+        for i in xrange(self.slots):
+            slot = (start + i) % self.slots
+            offset = self._slot_offset(slot)
+            if SLOT_HEADER.unpack_from(self.map, offset)[8] == DONE:
+                self._index_remove(self._slot_game_id(offset))
+                # The game can have ended without being unlisted yet
+                self._unlink(slot)
+                return slot
+        raise ArenaFullException("The game arena is full, every game is in progress.")
+
+
+    def _check_slot(self, offset, game_id):
+        """Returns the header of the slot at offset, raises GameNotFoundException unless it
+        still holds game_id. Must be called holding the slot's lock.
+        """
+        header = SLOT_HEADER.unpack_from(self.map, offset)
+        if header[1].rstrip('\0') != game_id:
+            raise GameNotFoundException("Game '{}' not found.".format(game_id))
+        return header
+
+
+    def _begin_write(self, offset):
+        SEQ.pack_into(self.map, offset, SEQ.unpack_from(self.map, offset)[0] + 1)
+
+
+    def _end_write(self, offset):
+        self._begin_write(offset)
+
+
+    def _read_names(self, offset, players):
+        return [name.rstrip('\0').decode('utf-8') for name in NAMES.unpack_from(self.map, offset + NAMES_OFFSET)[:players]]
+
+
+    def _read_game(self, offset):
+        seq, game_id, columns, rows, win_length, players, active, turn, state, winner, moves, version = \
+            SLOT_HEADER.unpack_from(self.map, offset)
+        names = self._read_names(offset, players)
+        return ([name for index, name in enumerate(names) if active >> index & 1],
+                GameState.DONE if state == DONE else GameState.IN_PROGRESS,
+                None if winner == NO_WINNER else names[winner], version, moves)
+
+
+    def _read_moves(self, offset, start, end):
+        header = SLOT_HEADER.unpack_from(self.map, offset)
+        moves = header[10]
+        if moves == 0:
+            raise MovesNotFoundException("No moves made thus far.")
+        if start is None:
+            start = 0
+        if end is None:
+            end = moves - 1
+        if start < 0 or start > end or end >= moves:
+            raise MovesNotFoundException("Moves {} to {} not found. Current total moves: {}.".format(start, end, moves))
+        names = self._read_names(offset, header[5])
+        log = bytearray(self.map[offset + MOVES_OFFSET + 2 * start:offset + MOVES_OFFSET + 2 * end + 2])
+        output = []
+        for i in xrange(0, len(log), 2):
+            if log[i] & QUIT_BIT:
+                output.append((MoveType.QUIT, names[log[i] & ~QUIT_BIT], None))
+            else:
+                output.append((MoveType.MOVE, names[log[i]], log[i + 1]))
+        return output
+
+
+    def _read_board(self, offset):
+        header = SLOT_HEADER.unpack_from(self.map, offset)
+        columns, rows, state, version = header[2], header[3], header[8], header[11]
+        names = self._read_names(offset, header[5])
+        cells = bytearray(self.map[offset + CELLS_OFFSET:offset + CELLS_OFFSET + columns * MAX_ROWS])
+        grid = [[names[cells[col * MAX_ROWS + row] - 1] if cells[col * MAX_ROWS + row] else None
+                 for col in xrange(columns)] for row in xrange(rows)]
+        return version, GameState.DONE if state == DONE else GameState.IN_PROGRESS, grid
+
+
+class _ArenaLock:
+    """Thread lock, then fcntl lock on a byte of the arena file, which only excludes other processes"""
+
+    def __init__(self, fd, thread_lock, offset):
+        self.fd = fd
+        self.thread_lock = thread_lock
+        self.offset = offset
+
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        try:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, 1, self.offset)
+        except:
+            self.thread_lock.release()
+            raise
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        fcntl.lockf(self.fd, fcntl.LOCK_UN, 1, self.offset)
+        self.thread_lock.release()
+
+
+def _next_player(active, players, index):
+    """Index of the first player still in after index, cyclically"""
+    for step in xrange(1, players + 1):
+        following = (index + step) % players
+        if active >> following & 1:
+            return following
+    return index
+
+
+def _is_winning_cell(cells, columns, rows, win_length, col, row):
+    """True if the token at col, row is part of a line of win_length tokens of its player"""
+    player = cells[col * MAX_ROWS + row]
+    for dcol, drow in DIRECTIONS:
+        count = 1
+        for sign in (1, -1):
+            c, r = col + sign * dcol, row + sign * drow
+            while 0 <= c < columns and 0 <= r < rows and cells[c * MAX_ROWS + r] == player:
+                count += 1
+                c, r = c + sign * dcol, r + sign * drow
+        if count >= win_length:
+            return True
+    return False
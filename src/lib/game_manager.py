@@ -1,46 +1,399 @@
+import bisect
+import threading
+from board import Board
 from drop_token_game import DropTokenGame
+from archived_game import ArchivedGame
+from move_notifier import MoveNotifier
+from game_state import GameState
+from move_type import MoveType
+from pagination import game_id_key
+import metrics
 from exception import GameNotFoundException
 
 
+# Number of locks shared by all games, see GameManager.lock_game
+LOCK_STRIPES = 256
+
+
 class GameManager:
-    """Class to manager creation/delete/retrieval of games"""
+    """Class to manager creation/delete/retrieval of games.
+
+    Safe to share between threads. The manager's own tables are guarded by a single lock,
+    held only while creating, finishing or archiving games. Moves are serialized per game
+    through lock_game, so moves on different games don't wait on each other.
+    """
 
     next_game_id = 1
+    # Processes sharing the id space (see ShardRouter) each start at a different
+    # next_game_id and step over the ids of the others
+    game_id_step = 1
     game_id_prefix = "gameid"
+    game_id_lock = threading.Lock()
 
 
     @classmethod
     def generate_next_game_id(cls):
         """Makes a new unique game id per call."""
-        game_id = cls.game_id_prefix + str(cls.next_game_id)
-        cls.next_game_id += 1
+        with cls.game_id_lock:
+            game_id = cls.game_id_prefix + str(cls.next_game_id)
+            cls.next_game_id += cls.game_id_step
         return game_id
 
 
-    def __init__(self):
+    def __init__(self, board_class=Board, retention_policy=None, lock_stripes=LOCK_STRIPES):
+        """Arguments
+        board_class -- optional board engine used by every new game, Board or BitBoard
+        retention_policy -- optional RetentionPolicy deciding when finished games get archived.
+                            If None, every game stays resident.
+        lock_stripes -- optional int number of locks the games are spread over
+        """
+        # Guards games, archive, games_by_state, in_progress_order, games_by_player and the retention policy
+        self.lock = threading.Lock()
+        # Games hash onto a fixed set of locks instead of each owning one
+        self.game_locks = [threading.Lock() for i in xrange(lock_stripes)]
+        # Resident games, in progress or finished
         self.games = {}
-    
+        # ArchivedGames evicted from self.games by the retention policy
+        self.archive = {}
+        self.retention_policy = retention_policy
+        self.board_class = board_class
+        # Secondary index of game ids per GameState, so listing games by state
+        # doesn't have to scan every game ever created
+        self.games_by_state = {game_state: set() for game_state in GameState}
+        # game_id_key of every in progress game, sorted, so they can be listed page by page
+        self.in_progress_order = []
+        # Player name -> GameState -> set of the ids of their games. A game is in progress for
+        # a player while it is in progress and they haven't quit it, done otherwise.
+        self.games_by_player = {}
+        self.move_notifier = MoveNotifier()
+        # Functions called as listener(game) for every game made by new_game
+        self.game_listeners = []
+        # Functions called as listener(games) with the games added by restore_games
+        self.restore_listeners = []
+        # Functions called as listener(game_ids) with the games moved into the archive
+        self.archive_listeners = []
+
+
+    def add_game_listener(self, listener):
+        """Register a function called as listener(game) after every new game,
+        and every game brought back by unarchive_game.
+        Games restored through restore_games are not reported, see add_restore_listener.
+        """
+        self.game_listeners.append(listener)
+
 
-    def new_game(self, players, columns, rows):
+    def add_restore_listener(self, listener):
+        """Register a function called as listener(games) after every restore_games,
+        games being the list of restored DropTokenGames and ArchivedGames.
+        """
+        self.restore_listeners.append(listener)
+
+
+    def add_archive_listener(self, listener):
+        """Register a function called as listener(game_ids) after finished games are moved into
+        the archive. It is called holding the manager's lock, so must not call the manager.
+        """
+        self.archive_listeners.append(listener)
+
+
+    def new_game(self, players, columns, rows, rules=None):
         """Create a new DropTokenGame
 
         Arguments
         players -- list of players to join, must not contain duplicates
         columns -- width of the board
         rows -- height of the board
+        rules -- optional GameRules, the standard rules by default
         """
-        new_game = DropTokenGame(columns, rows, players, GameManager.generate_next_game_id())
-        self.games[new_game.get_game_id()] = new_game
+        new_game = DropTokenGame(columns, rows, players, GameManager.generate_next_game_id(), self.board_class, rules)
+        self._add_game(new_game)
+        # Listeners hear about the game once it can be found, see GamePersistence
+        for listener in self.game_listeners:
+            listener(new_game)
         return new_game
 
 
+    def new_games(self, games):
+        """Create a DropTokenGame for each (players, columns, rows, rules) of games, rules
+        may be None. The manager's lock is taken once for all of them rather than per game.
+        Returns the list of new games, in the same order.
+        """
+        new_games = [DropTokenGame(columns, rows, players, GameManager.generate_next_game_id(), self.board_class, rules)
+                     for players, columns, rows, rules in games]
+        for new_game in new_games:
+            self._add_listeners(new_game)
+        with self.lock:
+            for new_game in new_games:
+                self._insert_game(new_game, True)
+        for new_game in new_games:
+            for listener in self.game_listeners:
+                listener(new_game)
+        return new_games
+
+
+    def restore_games(self, games):
+        """Adds games rebuilt from storage, DropTokenGames or ArchivedGames"""
+        next_game_id = 0
+        prefix = GameManager.game_id_prefix
+        archived = {}
+        in_progress = []
+        for game in games:
+            game_id = game.get_game_id()
+            # New game ids must not collide with restored ones
+            suffix = game_id[len(prefix):]
+            if game_id.startswith(prefix) and suffix.isdigit() and int(suffix) >= next_game_id:
+                next_game_id = int(suffix) + 1
+
+            if isinstance(game, ArchivedGame):
+                archived[game_id] = game
+                with self.lock:
+                    self._index_players(game)
+                continue
+            # Sorted once at the end rather than game by game
+            self._add_game(game, insort=False)
+            if game.get_game_state() == GameState.IN_PROGRESS:
+                in_progress.append(game_id_key(game_id))
+            if self.retention_policy is not None and game.get_game_state() == GameState.DONE:
+                with self.lock:
+                    self.retention_policy.game_done(game_id)
+
+        with self.lock:
+            self.archive.update(archived)
+            self.games_by_state[GameState.DONE].update(archived)
+            self.in_progress_order.extend(in_progress)
+            self.in_progress_order.sort()
+        with GameManager.game_id_lock:
+            if next_game_id > GameManager.next_game_id:
+                # Stay on the ids of this process
+                step = GameManager.game_id_step
+                GameManager.next_game_id = next_game_id + (GameManager.next_game_id - next_game_id) % step
+        for listener in self.restore_listeners:
+            listener(games)
+
+
+    def unarchive_game(self, game_id):
+        """Rebuilds an ArchivedGame into a resident DropTokenGame, so it can be changed again.
+        Returns the resident game.
+        """
+        with self.lock:
+            archived = self.archive.get(game_id)
+        if archived is None:
+            return self.get_game(game_id)
+        game = DropTokenGame.from_moves_log(archived.width, archived.height, archived.moves_log,
+                                            game_id, self.board_class, archived.rules)
+        # Replaying skips undone moves, versions must keep going up from the archived one
+        game.version = archived.version
+        self._add_listeners(game)
+        with self.lock:
+            del self.archive[game_id]
+            self.games[game_id] = game
+            if self.retention_policy is not None:
+                self.retention_policy.game_done(game_id)
+        for listener in self.game_listeners:
+            listener(game)
+        return game
+
+
+    def rewind_game(self, game_id, moves):
+        """Undoes moves of game_id until only the first moves moves are left, unarchiving it first
+        if needed. Must be called holding lock_game(game_id). Returns the resident game.
+        """
+        while True:
+            game = self.unarchive_game(game_id)
+            with self.lock:
+                # It can have been archived again since, by a new game on another thread
+                if self.games.get(game_id) is game:
+                    held = self.retention_policy is not None and game.get_game_state() == GameState.DONE
+                    if held:
+                        # Not archived while its moves are being undone, the archive would share its log
+                        self.retention_policy.game_resumed(game_id)
+                    break
+        try:
+            game.rewind(moves)
+        finally:
+            if held and game.get_game_state() == GameState.DONE:
+                # Nothing was undone
+                with self.lock:
+                    self.retention_policy.game_done(game_id)
+        return game
+
+
+    def _add_game(self, game, insort=True):
+        self._add_listeners(game)
+        with self.lock:
+            self._insert_game(game, insort)
+
+
+    def _insert_game(self, game, insort):
+        """Adds game to the tables. Must be called holding self.lock."""
+        self._evict_games()
+        self.games[game.get_game_id()] = game
+        self.games_by_state[game.get_game_state()].add(game.get_game_id())
+        self._index_players(game)
+        if insort and game.get_game_state() == GameState.IN_PROGRESS:
+            bisect.insort(self.in_progress_order, game_id_key(game.get_game_id()))
+
+
+    def _add_listeners(self, game):
+        game.add_state_listener(self._on_game_state_change)
+        game.add_move_listener(self.move_notifier.notify)
+        game.add_move_listener(self._on_move)
+        game.add_undo_listener(self._on_undo)
+
+
+    @metrics.timed('GameManager.get_game')
     def get_game(self, game_id):
-        if game_id not in self.games:
+        """Returns the resident DropTokenGame, or its ArchivedGame if it has been evicted"""
+        if self.retention_policy is None:
+            # Without archiving, games never move between dicts and lookups are atomic.
+            # The archive only holds games restored by restore_games.
+            game = self.games.get(game_id)
+            if game is None:
+                game = self.archive.get(game_id)
+        else:
+            with self.lock:
+                self._evict_games()
+                game = self.games.get(game_id)
+                if game is not None:
+                    self.retention_policy.game_used(game_id)
+                else:
+                    game = self.archive.get(game_id)
+        if game is None:
             raise GameNotFoundException("Game '{}' not found.".format(game_id))
-        return self.games[game_id]
+        return game
+
+
+    def lock_game(self, game_id):
+        """Returns the lock to hold while changing game_id.
+
+        Usage:
+        with game_manager.lock_game(game_id):
+            game_manager.get_game(game_id).play_token(player, col)
+        """
+        return self.game_locks[hash(game_id) % len(self.game_locks)]
+
+
+    def wait_for_moves(self, game_id, moves, timeout):
+        """Blocks until game_id has more than moves moves logged, it ends, or timeout seconds pass.
+        Returns the game.
+        """
+        game = self.get_game(game_id)
+        self.move_notifier.wait_for_moves(game, moves, timeout)
+        return game
 
 
     def get_all_games(self, game_state=None):
-        if game_state is not None:
-            return [g.get_game_id() for g in self.games.values() if g.get_game_state() is game_state]
-        return self.games.values()
+        with self.lock:
+            if game_state is not None:
+                return list(self.games_by_state[game_state])
+            return self.games.values() + self.archive.values()
+
+
+    def get_in_progress_page(self, after=None, limit=None):
+        """Returns up to limit in progress game ids, in creation order
+
+        Arguments
+        after -- optional game id, only games created after it are returned
+        limit -- optional max number of game ids
+        """
+        with self.lock:
+            start = 0
+            if after is not None:
+                start = bisect.bisect_right(self.in_progress_order, game_id_key(after))
+            end = None if limit is None else start + limit
+            return [key[1] for key in self.in_progress_order[start:end]]
+
+
+    def get_player_games(self, player, game_state=None, after=None, limit=None):
+        """Returns up to limit ids of the games player joined, in creation order.
+        Costs O(number of games of player), whatever the total number of games.
+
+        Arguments
+        player -- str name of the player
+        game_state -- optional GameState of the games, as seen by player. Games player quit
+                      are done for them.
+        after -- optional game id, only games created after it are returned
+        limit -- optional max number of game ids
+        """
+        with self.lock:
+            by_state = self.games_by_player.get(player, {})
+            if game_state is not None:
+                keys = [game_id_key(game_id) for game_id in by_state.get(game_state, ())]
+            else:
+                keys = [game_id_key(game_id) for game_ids in by_state.itervalues() for game_id in game_ids]
+        keys.sort()
+        start = 0
+        if after is not None:
+            start = bisect.bisect_right(keys, game_id_key(after))
+        end = None if limit is None else start + limit
+        return [key[1] for key in keys[start:end]]
+
+
+    def _index_players(self, game):
+        """Indexes game under every player who joined it. Must be called holding self.lock."""
+        in_progress = game.get_game_state() == GameState.IN_PROGRESS
+        players = set(game.get_players())
+        for player in game.moves_log.players:
+            state = GameState.IN_PROGRESS if in_progress and player in players else GameState.DONE
+            self._index_player(player, game.get_game_id(), state)
+
+
+    def _index_player(self, player, game_id, game_state):
+        """Files game_id under game_state for player. Must be called holding self.lock."""
+        by_state = self.games_by_player.get(player)
+        if by_state is None:
+            by_state = self.games_by_player[player] = {state: set() for state in GameState}
+        for state, game_ids in by_state.iteritems():
+            if state == game_state:
+                game_ids.add(game_id)
+            else:
+                game_ids.discard(game_id)
+
+
+    def _on_move(self, game, move):
+        # A player who quits a game still in progress is done with it, the others carry on
+        if move.get_type() == MoveType.QUIT and game.get_game_state() == GameState.IN_PROGRESS:
+            with self.lock:
+                self._index_player(move.get_player(), game.get_game_id(), GameState.DONE)
+
+
+    def _on_undo(self, game, move):
+        if move.get_type() == MoveType.QUIT and game.get_game_state() == GameState.IN_PROGRESS:
+            with self.lock:
+                self._index_player(move.get_player(), game.get_game_id(), GameState.IN_PROGRESS)
+
+
+    def _on_game_state_change(self, game, old_state):
+        game_id = game.get_game_id()
+        with self.lock:
+            self.games_by_state[old_state].discard(game_id)
+            self.games_by_state[game.get_game_state()].add(game_id)
+            self._index_players(game)
+            key = game_id_key(game_id)
+            if game.get_game_state() == GameState.IN_PROGRESS:
+                bisect.insort(self.in_progress_order, key)
+            elif old_state == GameState.IN_PROGRESS:
+                index = bisect.bisect_left(self.in_progress_order, key)
+                if index < len(self.in_progress_order) and self.in_progress_order[index] == key:
+                    del self.in_progress_order[index]
+            # The game is archived on a later manager call rather than here,
+            # while it is still in the middle of play_token or remove_player
+            if self.retention_policy is not None:
+                if game.get_game_state() == GameState.DONE:
+                    self.retention_policy.game_done(game_id)
+                elif old_state == GameState.DONE:
+                    self.retention_policy.game_resumed(game_id)
+
+
+    def _evict_games(self):
+        """Moves the finished games picked by the retention policy into the archive.
+        Must be called holding self.lock.
+        """
+        if self.retention_policy is None:
+            return
+        evicted = self.retention_policy.get_evictions(len(self.games))
+        for game_id in evicted:
+            self.archive[game_id] = ArchivedGame.from_game(self.games.pop(game_id))
+        if evicted:
+            for listener in self.archive_listeners:
+                listener(evicted)
@@ -0,0 +1,267 @@
+import cPickle as pickle
+import gc
+import os
+import re
+import threading
+import time
+from archived_game import ArchivedGame
+from drop_token_game import DropTokenGame
+from game_state import GameState
+from game_rules import GameRules
+from move_log import MoveLog
+from move_type import MoveType
+from write_ahead_log import WriteAheadLog, DEFAULT_BATCH_SIZE, DEFAULT_FLUSH_INTERVAL
+
+
+# Write ahead log event types
+NEW_GAME = 'N'
+MOVE = 'M'
+QUIT = 'Q'
+UNDO = 'U'
+POP = 'P'
+# Index of the version a change brought its game to, in the records of each event type.
+# Logs written before versions were logged don't have it.
+VERSION_FIELD = {MOVE: 5, POP: 5, QUIT: 4, UNDO: 3}
+
+WAL_FILE = 'wal.{:010d}.log'
+SNAPSHOT_FILE = 'snapshot.{:010d}.pickle'
+FILE_PATTERN = re.compile(r'^(wal|snapshot)\.(\d+)\.(log|pickle)$')
+
+
+class GamePersistence:
+    """Keeps the games of a GameManager on disk.
+
+    Every new game, move, pop, quit and undo is appended to a WriteAheadLog. A snapshot of every game
+    is written from time to time, after which older logs and snapshots are deleted.
+    Generation N is made of snapshot N, holding every game as of the start of log N,
+    followed by logs N, N+1, ... Recovery loads the latest snapshot and replays the logs after it.
+
+    Snapshots are taken while games keep being played, so a snapshot can already contain
+    events that are also in the following log. Events carry the move number, which makes
+    replaying them a no-op for games that already have them.
+
+    Snapshots and events also keep the version of their game, so versions handed out to
+    clients (ETags, ?since=) keep meaning the same board after a restart, undos included.
+
+    Changes are logged without waiting for their batch to be written (see WriteAheadLog), so the
+    changes of the last flush_interval seconds before a crash can be lost even though they were
+    already reported as made.
+    """
+
+    def __init__(self, directory, fsync=True, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, snapshot_interval=None):
+        """Arguments
+        directory -- str directory holding the logs and snapshots, created if missing
+        fsync -- if True, log batches are synced to disk
+        batch_size -- int number of log records written together, 1 disables group commit
+        flush_interval -- optional max seconds a log record stays buffered
+        snapshot_interval -- optional seconds between background snapshots
+        """
+        self.directory = directory
+        self.fsync = fsync
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.snapshot_interval = snapshot_interval
+        self.game_manager = None
+        self.wal = None
+        self.generation = 0
+        # Only one snapshot is written at a time
+        self.snapshot_lock = threading.Lock()
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+
+    def recover(self, game_manager):
+        """Restores every stored game into game_manager. Call once, before attach."""
+        snapshots, wals = self._list_generations()
+        if snapshots:
+            self.generation = snapshots[-1]
+            self._load_snapshot(game_manager, self._path(SNAPSHOT_FILE, self.generation))
+        for generation in wals:
+            if generation >= self.generation:
+                self._replay_wal(game_manager, self._path(WAL_FILE, generation))
+        if wals:
+            self.generation = max(self.generation, wals[-1])
+
+
+    def attach(self, game_manager):
+        """Starts logging every change made to the games of game_manager"""
+        self.game_manager = game_manager
+        # Recovered logs are left as they are, new events go to a fresh one
+        self.generation += 1
+        self.wal = self._open_wal(self.generation)
+        game_manager.add_game_listener(self._on_new_game)
+        for game in game_manager.get_all_games():
+            # Finished games can still change through an undo
+            if isinstance(game, DropTokenGame):
+                game.add_move_listener(self._on_move)
+                game.add_undo_listener(self._on_undo)
+        if self.snapshot_interval is not None:
+            snapshotter = threading.Thread(target=self._snapshot_periodically)
+            snapshotter.daemon = True
+            snapshotter.start()
+
+
+    def snapshot(self):
+        """Writes a snapshot of every game and deletes the files it replaces"""
+        with self.snapshot_lock:
+            # Switch to a new log first: everything logged from now on is replayed
+            # on top of this snapshot. A listener still holding the old log can only
+            # be logging a change made before the games below are read.
+            old_wal = self.wal
+            self.generation += 1
+            generation = self.generation
+            self.wal = self._open_wal(generation)
+            old_wal.close()
+
+            path = self._path(SNAPSHOT_FILE, generation)
+            with open(path + '.tmp', 'wb') as snapshot_file:
+                records = [self._game_record(game) for game in self.game_manager.get_all_games()]
+                pickle.dump(records, snapshot_file, pickle.HIGHEST_PROTOCOL)
+                snapshot_file.flush()
+                os.fsync(snapshot_file.fileno())
+            os.rename(path + '.tmp', path)
+
+            snapshots, wals = self._list_generations()
+            for old in snapshots:
+                if old < generation:
+                    os.remove(self._path(SNAPSHOT_FILE, old))
+            for old in wals:
+                if old < generation:
+                    os.remove(self._path(WAL_FILE, old))
+
+
+    def close(self):
+        if self.wal is not None:
+            self.wal.close()
+
+
+    def _on_new_game(self, game):
+        board = game.get_board()
+        self.wal.append([NEW_GAME, game.get_game_id(), board.width, board.height, game.moves_log.players,
+                         game.rules.to_dict()])
+        game.add_move_listener(self._on_move)
+        game.add_undo_listener(self._on_undo)
+
+
+    def _on_move(self, game, move):
+        if move.get_type() == MoveType.QUIT:
+            self.wal.append([QUIT, game.get_game_id(), move.get_move_number(), move.get_player(), game.version])
+        else:
+            self.wal.append([POP if move.get_type() == MoveType.POP else MOVE, game.get_game_id(), move.get_move_number(), move.get_player(),
+                             move.get_token().get_column(), game.version])
+
+
+    def _on_undo(self, game, move):
+        self.wal.append([UNDO, game.get_game_id(), move.get_move_number(), game.version])
+
+
+    def _game_record(self, game):
+        # The state is read before the log: once a game is DONE its log is complete.
+        # The version is read first too, a change made meanwhile is replayed from the log
+        # and brings it up to date.
+        version = game.version
+        game_state = game.get_game_state()
+        players, entries, rows = game.moves_log.to_packed()
+        if isinstance(game, ArchivedGame):
+            width, height = game.width, game.height
+        else:
+            width, height = game.get_board().width, game.get_board().height
+        return (game.get_game_id(), width, height, list(game.get_players()), game.get_winner(),
+                game_state.name, players, entries, rows, game.rules.to_dict(), version)
+
+
+    def _load_snapshot(self, game_manager, path):
+        # Loading only allocates, the cyclic garbage collector would keep
+        # rescanning millions of new objects for nothing
+        gc.disable()
+        try:
+            with open(path, 'rb') as snapshot_file:
+                records = pickle.load(snapshot_file)
+            self._restore_records(game_manager, records)
+        finally:
+            gc.enable()
+
+
+    def _restore_records(self, game_manager, records):
+        games = []
+        done = GameState.DONE
+        standard = GameRules()
+        for record in records:
+            game_id, width, height, players, winner, game_state, all_players, entries, rows = record[:9]
+            # Snapshots written before rule variants existed have no rules
+            rules = GameRules.from_dict(record[9]) if len(record) > 9 else standard
+            # and those written before versions were kept count one per move
+            version = record[10] if len(record) > 10 else None
+            moves_log = MoveLog.from_packed(all_players, entries, rows)
+            if game_state == done.name:
+                # Finished games never change, so there's no need to rebuild their board
+                games.append(ArchivedGame(game_id, width, height, players, winner, done, moves_log, version,
+                                          rules=rules))
+            else:
+                game = DropTokenGame.from_moves_log(width, height, moves_log, game_id, game_manager.board_class, rules)
+                if version is not None:
+                    game.version = version
+                games.append(game)
+        game_manager.restore_games(games)
+
+
+    def _replay_wal(self, game_manager, path):
+        games = {}
+        for record in WriteAheadLog.read(path):
+            game_id = record[1]
+            if record[0] == NEW_GAME:
+                if game_id not in game_manager.games and game_id not in game_manager.archive:
+                    rules = GameRules.from_dict(record[5]) if len(record) > 5 else None
+                    game = DropTokenGame(record[2], record[3], record[4], game_id, game_manager.board_class, rules)
+                    game_manager.restore_games([game])
+                continue
+
+            if game_id not in games:
+                games[game_id] = game_manager.get_game(game_id)
+            game = games[game_id]
+            if record[0] == UNDO:
+                # Only undo the move if it's still the last one, else the snapshot
+                # was taken before that move was made
+                if record[2] == len(game.moves_log) - 1:
+                    if isinstance(game, ArchivedGame):
+                        game = games[game_id] = game_manager.unarchive_game(game_id)
+                    game.undo_last_move()
+            # Already part of the snapshot
+            elif record[2] < len(game.moves_log):
+                pass
+            elif record[0] == QUIT:
+                game.remove_player(record[3])
+            elif record[0] == POP:
+                game.pop_token(record[3], record[4])
+            else:
+                game.play_token(record[3], record[4])
+            # Even a change already in the snapshot can be newer than the version the snapshot read
+            if len(record) > VERSION_FIELD[record[0]]:
+                game.version = max(game.version, record[VERSION_FIELD[record[0]]])
+
+
+    def _open_wal(self, generation):
+        return WriteAheadLog(self._path(WAL_FILE, generation), self.fsync, self.batch_size, self.flush_interval)
+
+
+    def _list_generations(self):
+        """Returns the sorted generations of the snapshots and logs on disk"""
+        snapshots = []
+        wals = []
+        for name in os.listdir(self.directory):
+            match = FILE_PATTERN.match(name)
+            if match is None:
+                continue
+            (snapshots if match.group(1) == 'snapshot' else wals).append(int(match.group(2)))
+        return sorted(snapshots), sorted(wals)
+
+
+    def _path(self, file_format, generation):
+        return os.path.join(self.directory, file_format.format(generation))
+
+
+    def _snapshot_periodically(self):
+        while True:
+            time.sleep(self.snapshot_interval)
+            self.snapshot()
@@ -0,0 +1,163 @@
+import json
+import time
+from collections import deque
+from multiprocessing import Pool, cpu_count
+from board import Board
+from bit_board import BitBoard
+from drop_token_game import DropTokenGame
+from game_rules import GameRules
+from move_type import MoveType
+from exception.api_exception import ApiException
+
+
+# Board engines a replay can run on, by name
+ENGINES = {'board': Board, 'bitboard': BitBoard}
+# Number of records sent to a worker process at a time
+CHUNK_SIZE = 500
+
+
+class ReplayReport:
+    """Outcome of replaying a set of game records"""
+
+    def __init__(self):
+        self.games = 0
+        # (game id, reason) of every record that didn't replay to its recorded outcome
+        self.failures = []
+        self.elapsed = 0.0
+
+
+    def games_per_second(self):
+        return self.games / self.elapsed if self.elapsed else 0.0
+
+
+def game_record(game):
+    """Returns the record of a DropTokenGame or ArchivedGame, as read by replay_record.
+
+    Records are JSON objects with the same fields as the API:
+    {"gameId": ..., "players": [...], "columns": w, "rows": h,
+     "moves": [{"type": "MOVE", "player": ..., "column": ...}, {"type": "QUIT", "player": ...}],
+     "state": "DONE", "winner": ...}
+    plus "rules" (see GameRules.to_dict) for games not played with the standard rules.
+    """
+    if hasattr(game, 'width'):
+        width, height = game.width, game.height
+    else:
+        width, height = game.get_board().width, game.get_board().height
+    moves = []
+    for move_number in xrange(len(game.moves_log)):
+        move = game.get_move(move_number)
+        output = {'type': move.get_type().name, 'player': move.get_player()}
+        if move.get_type() != MoveType.QUIT:
+            output['column'] = move.get_token().get_column()
+        moves.append(output)
+    record = {'gameId': game.get_game_id(), 'players': list(game.moves_log.players), 'columns': width,
+              'rows': height, 'moves': moves, 'state': game.get_game_state().name, 'winner': game.get_winner()}
+    if not game.rules.is_standard():
+        record['rules'] = game.rules.to_dict()
+    return record
+
+
+def replay_record(record, board_class=Board):
+    """Replays a game record through the DropTokenGame rules
+
+    Arguments
+    record -- dict made by game_record
+    board_class -- optional board engine to replay on
+
+    Returns None if the replay ends in the recorded state and winner, the reason otherwise
+    """
+    try:
+        rules = GameRules.from_dict(record['rules']) if 'rules' in record else None
+        game = DropTokenGame(record['columns'], record['rows'], list(record['players']),
+                             record.get('gameId'), board_class, rules)
+        for move_number, move in enumerate(record['moves']):
+            try:
+                if move['type'] == MoveType.QUIT.name:
+                    game.remove_player(move['player'])
+                elif move['type'] == MoveType.POP.name:
+                    game.pop_token(move['player'], move['column'])
+                else:
+                    game.play_token(move['player'], move['column'])
+            except ApiException as e:
+                return "move {}: {}".format(move_number, e.message)
+    except (AttributeError, KeyError, TypeError, ValueError, ApiException) as e:
+        return "malformed record: {!r}".format(e)
+
+    if game.get_game_state().name != record.get('state'):
+        return "state is {}, recorded {}".format(game.get_game_state().name, record.get('state'))
+    if game.get_winner() != record.get('winner'):
+        return "winner is {}, recorded {}".format(game.get_winner(), record.get('winner'))
+    return None
+
+
+def verify_records(lines, processes=None, engine='board', chunk_size=CHUNK_SIZE):
+    """Replays game records, one JSON record per line, and returns a ReplayReport
+
+    Lines are read as they are needed, so a file object can be passed whatever its size.
+
+    Arguments
+    lines -- iterable of str JSON records, blank lines are skipped
+    processes -- optional int number of worker processes, defaults to the number of cores.
+                 1 replays in this process.
+    engine -- name of the board engine, a key of ENGINES
+    chunk_size -- int number of records sent to a worker at a time
+    """
+    if engine not in ENGINES:
+        raise ValueError("Unknown engine '{}', use one of {}.".format(engine, sorted(ENGINES)))
+    report = ReplayReport()
+    start = time.time()
+    chunks = _chunks(lines, chunk_size)
+    processes = processes or cpu_count()
+    if processes == 1:
+        for chunk in chunks:
+            _add_result(report, _replay_chunk(chunk, engine))
+    else:
+        pool = Pool(processes)
+        try:
+            # A few chunks per worker in flight, so the input is never read far ahead
+            pending = deque()
+            max_pending = 2 * processes
+            for chunk in chunks:
+                pending.append(pool.apply_async(_replay_chunk, (chunk, engine)))
+                if len(pending) >= max_pending:
+                    _add_result(report, pending.popleft().get())
+            while pending:
+                _add_result(report, pending.popleft().get())
+        finally:
+            pool.terminate()
+    report.elapsed = time.time() - start
+    return report
+
+
+def _add_result(report, result):
+    games, failures = result
+    report.games += games
+    report.failures.extend(failures)
+
+
+def _chunks(lines, chunk_size):
+    chunk = []
+    for line in lines:
+        if line.strip():
+            chunk.append(line)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def _replay_chunk(lines, engine):
+    """Worker entry point, returns (number of games, list of (game id, reason))"""
+    board_class = ENGINES[engine]
+    failures = []
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            failures.append((None, "malformed record: {}".format(e)))
+            continue
+        reason = replay_record(record, board_class)
+        if reason is not None:
+            failures.append((record.get('gameId') if isinstance(record, dict) else None, reason))
+    return len(lines), failures
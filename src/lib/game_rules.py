@@ -0,0 +1,47 @@
+from exception import MalformedRequestException
+
+
+# Represents how many tokens a player needs in a row to win, unless a game says otherwise
+MATCHES = 4
+
+
+class GameRules:
+    """Rule variant of a DropTokenGame, fixed when the game is created.
+
+    win_length -- number of tokens in a row needed to win
+    wraparound -- if True, the board is a cylinder: lines can run off the last column
+                  and continue from the first one
+    pop_out -- if True, instead of dropping a token, a player can pop one of their own tokens
+               out of the bottom of a column, making the tokens above fall down one row
+    turn_timeout -- optional number of seconds a player has to move before they forfeit,
+                    see TurnClock
+    """
+
+    def __init__(self, win_length=MATCHES, wraparound=False, pop_out=False, turn_timeout=None):
+        if type(win_length) not in (int, long) or win_length < 1:
+            raise MalformedRequestException("'winLength' should be 1 or more.")
+        if turn_timeout is not None and (type(turn_timeout) not in (int, long, float) or turn_timeout <= 0):
+            raise MalformedRequestException("'turnTimeout' should be more than 0.")
+        self.win_length = win_length
+        self.wraparound = bool(wraparound)
+        self.pop_out = bool(pop_out)
+        self.turn_timeout = turn_timeout
+
+
+    @classmethod
+    def from_dict(cls, data):
+        """Builds rules from the output of to_dict, missing fields take their default"""
+        return cls(data.get('winLength', MATCHES), data.get('wraparound', False), data.get('popOut', False),
+                   data.get('turnTimeout'))
+
+
+    def to_dict(self):
+        data = {'winLength': self.win_length, 'wraparound': self.wraparound, 'popOut': self.pop_out}
+        if self.turn_timeout is not None:
+            data['turnTimeout'] = self.turn_timeout
+        return data
+
+
+    def is_standard(self):
+        """Returns True for the rules every game had before variants existed"""
+        return self.win_length == MATCHES and not self.wraparound and not self.pop_out and self.turn_timeout is None
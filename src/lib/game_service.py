@@ -1,48 +1,277 @@
+import os
+from itertools import groupby
+from ai_player import AiPlayer, SearchBoard
 from game_manager import GameManager
+from game_persistence import GamePersistence
+from turn_clock import TurnClock
+from player_stats import PlayerStats, LEADERBOARD_SIZE, MAX_LEADERBOARD_SIZE
+from matchmaker import Matchmaker
 from game_state import GameState
+from game_rules import GameRules, MATCHES
+from pagination import encode_cursor, decode_cursor
+import json_encoder
+import metrics
+from exception.api_exception import ApiException
+from exception import MalformedRequestException, GameChangedException
 
 """This module represents the drop-token game service. All methods are 1:1 matches with api routes. Ideally documentation for the endpoints is done there."""
 
 game_manager = GameManager()
 
-def get_all_in_progress_games():
+# Set DROP_TOKEN_DATA_DIR to keep games on disk across restarts
+if os.environ.get('DROP_TOKEN_DATA_DIR'):
+    persistence = GamePersistence(os.environ['DROP_TOKEN_DATA_DIR'], snapshot_interval=300)
+    persistence.recover(game_manager)
+    persistence.attach(game_manager)
+
+# Wins, losses and draws per player, counted as games end
+player_stats = PlayerStats()
+player_stats.attach(game_manager)
+
+# Set DROP_TOKEN_TURN_TIMEOUT to make players forfeit after that many seconds without moving,
+# in every game. Games can also set their own with 'turnTimeout'. Its thread only starts
+# with the first game that has one.
+turn_clock = TurnClock(float(os.environ.get('DROP_TOKEN_TURN_TIMEOUT', 0)) or None)
+turn_clock.attach(game_manager)
+turn_clock.start()
+
+# Pairs up players queued through join_matchmaking into new games. Its thread only starts
+# with the first player to join.
+matchmaker = Matchmaker(game_manager)
+matchmaker.start()
+
+# Most columns or rows a board can have
+MAX_BOARD_SIZE = 1000
+# Longest a client can block waiting for new moves, in seconds
+MAX_WAIT = 60
+# Time the AI player thinks about a move by default, and at most, in seconds
+AI_TIME = 1
+MAX_AI_TIME = 5
+
+def get_all_in_progress_games(limit=None, cursor=None):
+    """With limit or cursor, games come in creation order, at most limit of them,
+    with the cursor of the next page if there is one.
+    """
     output = {}
-    output['games'] = get_all_games(game_state=GameState.IN_PROGRESS)
+    if limit is None and cursor is None:
+        output['games'] = game_manager.get_all_games(game_state=GameState.IN_PROGRESS)
+        return output
+
+    after = None if cursor is None else decode_cursor(cursor, basestring)
+    # One more than needed tells if there is a next page
+    games = game_manager.get_in_progress_page(after, None if limit is None else limit + 1)
+    if limit is not None and len(games) > limit:
+        games = games[:limit]
+        output['cursor'] = encode_cursor(games[-1])
+    output['games'] = games
     return output
 
 
-def create_new_game(players, columns, rows):
+def get_player_games(player, state=None, limit=None, cursor=None):
+    """Games player joined, in creation order, optionally only those in GameState state for them.
+    With limit, at most limit of them with the cursor of the next page if there is one.
+    """
     output = {}
-    new_game = game_manager.new_game(players, columns, rows)
-    output['gameId'] = new_game.get_game_id()
+    after = None if cursor is None else decode_cursor(cursor, basestring)
+    games = game_manager.get_player_games(player, state, after, None if limit is None else limit + 1)
+    if limit is not None and len(games) > limit:
+        games = games[:limit]
+        output['cursor'] = encode_cursor(games[-1])
+    output['games'] = games
     return output
 
 
-def get_game_state(game_id):
+def get_player_stats(player):
     output = {}
-    game = game_manager.get_game(game_id)
-    output['players'] = game.get_players()
-    game_state = game.get_game_state()
-    output['state'] = game_state.name
-    if game_state == GameState.DONE:
-        output['winner'] = game.get_winner()
+    output['player'] = player
+    output['wins'], output['losses'], output['draws'] = player_stats.get_player_stats(player)
     return output
 
 
-def get_game_moves(game_id, start=None, end=None):
+def get_players_stats(players):
+    """Results of every player of the list players, in the same order"""
+    return {'players': [get_player_stats(player) for player in players]}
+
+
+def get_leaderboard(k=LEADERBOARD_SIZE):
+    """The k players with the most wins, fewest losses first among equals"""
     output = {}
-    game = game_manager.get_game(game_id)
-    output['moves'] = [_move_output(m) for m in game.get_all_moves_taken(start, end)]
+    output['leaderboard'] = [{'player': player, 'wins': wins, 'losses': losses, 'draws': draws}
+                             for player, wins, losses, draws in player_stats.get_leaderboard(min(k, MAX_LEADERBOARD_SIZE))]
     return output
 
 
+def join_matchmaking(player, columns, rows, rating=None):
+    # Matched games are played with the standard rules
+    _check_board(columns, rows, MATCHES)
+    matchmaker.join(player, columns, rows, rating)
+    return {}
+
+
+def get_match(player, wait=0):
+    """The game player was matched into, waiting up to wait seconds for one"""
+    output = {}
+    game_id = matchmaker.get_match(player, min(wait, MAX_WAIT))
+    if game_id is None:
+        output['state'] = 'WAITING'
+    else:
+        output['state'] = 'MATCHED'
+        output['gameId'] = game_id
+    return output
+
+
+def leave_matchmaking(player):
+    matchmaker.leave(player)
+    return {}
+
+
+def create_new_game(players, columns, rows, win_length=MATCHES, wraparound=False, pop_out=False,
+                    turn_timeout=None):
+    output = {}
+    _check_board(columns, rows, win_length)
+    rules = GameRules(win_length, wraparound, pop_out, turn_timeout)
+    new_game = game_manager.new_game(players, columns, rows, None if rules.is_standard() else rules)
+    output['gameId'] = new_game.get_game_id()
+    return output
+
+
+def get_game_state(game_id):
+    """Returns the JSON body of the state of game_id"""
+    game = game_manager.get_game(game_id)
+    version = game.version
+    return _response_cache(game_id, game).get('state', version, lambda: _encode(_state_output(game)))
+
+
+def get_game_board(game_id, since=None):
+    """Returns (version, JSON body) of the board of game_id.
+    With since, the body only has the cells changed after version since, when they are known.
+    """
+    game = game_manager.get_game(game_id)
+    view = game.board_view
+    if view is None:
+        # The view must not miss a move while it is built
+        with game_manager.lock_game(game_id):
+            view = game.get_board_view()
+    if since is not None:
+        delta = view.changes_since(since)
+        if delta is not None:
+            version, cells = delta
+            changes = [{'column': col, 'row': row, 'player': player} for col, row, player in cells]
+            return version, _encode({'version': version, 'changes': changes})
+    return view.render(game.get_game_state())
+
+
+def get_game_moves(game_id, start=None, end=None, limit=None, cursor=None):
+    """Returns the JSON body of moves start to end of game_id.
+    With limit, at most limit moves are returned, with the cursor of the next page if
+    there is one. A cursor replaces start, end stays the same for every page.
+    """
+    game = game_manager.get_game(game_id)
+    version = game.version
+    cache = _response_cache(game_id, game)
+    if cursor is not None:
+        start = decode_cursor(cursor, (int, long))
+    if start is None and end is None and limit is None:
+        return cache.get('moves', version,
+                         lambda: _moves_body(cache.get_fragments(game.moves_log, None, None, _encode_move)))
+
+    start, end = game.moves_log.check_range(start, end)
+    next_cursor = None
+    if limit is not None and start + limit <= end:
+        next_cursor = encode_cursor(start + limit)
+        end = start + limit - 1
+    return _moves_body(cache.get_fragments(game.moves_log, start, end, _encode_move), next_cursor)
+
+
+def get_move_fragments(game_id, start, limit):
+    """Returns up to limit encoded moves of game_id from move start on, to stream them"""
+    game = game_manager.get_game(game_id)
+    moves = len(game.moves_log)
+    if start >= moves:
+        return []
+    return _response_cache(game_id, game).get_fragments(game.moves_log, start, min(moves, start + limit) - 1,
+                                                        _encode_move)
+
+
+def wait_for_game_moves(game_id, after, wait):
+    """Returns the JSON body of the moves of game_id after move after, waiting up to wait seconds for one"""
+    game = game_manager.wait_for_moves(game_id, after + 1, min(wait, MAX_WAIT))
+    if len(game.moves_log) > after + 1:
+        return _moves_body(_response_cache(game_id, game).get_fragments(game.moves_log, after + 1, None,
+                                                                        _encode_move))
+    return _moves_body([])
+
+
 def make_move(game_id, player, column):
     output = {}
-    move = game_manager.get_game(game_id).play_token(player, column)
+    with game_manager.lock_game(game_id):
+        move = game_manager.get_game(game_id).play_token(player, column)
+    output['move'] = '{}/moves/{}'.format(game_id, move.get_move_number())
+    return output
+
+
+def pop_token(game_id, player, column):
+    output = {}
+    with game_manager.lock_game(game_id):
+        move = game_manager.get_game(game_id).pop_token(player, column)
     output['move'] = '{}/moves/{}'.format(game_id, move.get_move_number())
     return output
     
 
+def make_auto_move(game_id, player, time_budget=AI_TIME):
+    output = {}
+    # The search runs on a copy of the board, without holding a lock other games may share.
+    # Only the moves are copied under the lock, the board is built from them after.
+    with game_manager.lock_game(game_id):
+        game = game_manager.get_game(game_id)
+        game.check_turn(player)
+        version = game.version
+        snapshot = SearchBoard.snapshot(game)
+        player_idx, players = game.curr_player_idx, len(game.get_players())
+    board = SearchBoard.from_moves(*snapshot)
+    column = AiPlayer().choose_board_column(board, player_idx, players, min(time_budget, MAX_AI_TIME))
+    with game_manager.lock_game(game_id):
+        game = game_manager.get_game(game_id)
+        if game.version != version:
+            raise GameChangedException("Game '{}' changed while the AI player was searching.".format(game_id))
+        move = game.play_token(player, column)
+    output['move'] = '{}/moves/{}'.format(game_id, move.get_move_number())
+    output['column'] = column
+    return output
+
+
+def make_moves(moves, stop_on_failure=False):
+    """Applies a list of (game_id, player, column) moves in order.
+    Each move gets its own result, a move url or an error. If stop_on_failure is set,
+    the moves after a failed one in the same game are skipped.
+    """
+    output = {}
+    results = []
+    failed_games = set()
+    # Runs of moves on the same game are played under a single lock and lookup
+    for game_id, run in groupby(moves, lambda move: move[0]):
+        with game_manager.lock_game(game_id):
+            try:
+                game = game_manager.get_game(game_id)
+            except ApiException as e:
+                results.extend(_error_output(e) for move in run)
+                continue
+            for move_game_id, player, column in run:
+                if game_id in failed_games:
+                    results.append({'message': "Skipped after an earlier move failed in game '{}'.".format(game_id),
+                                    'status': 424})
+                    continue
+                try:
+                    move = game.play_token(player, column)
+                    results.append({'move': '{}/moves/{}'.format(game_id, move.get_move_number())})
+                except ApiException as e:
+                    results.append(_error_output(e))
+                    if stop_on_failure:
+                        failed_games.add(game_id)
+    output['moves'] = results
+    return output
+
+
 def get_move(game_id, move_number):
     output = {}
     output['move'] = _move_output(game_manager.get_game(game_id).get_move(move_number))
@@ -50,10 +279,76 @@ def get_move(game_id, move_number):
 
 
 def player_quits(game_id, player):
-    game_manager.get_game(game_id).remove_player(player)
+    with game_manager.lock_game(game_id):
+        game_manager.get_game(game_id).remove_player(player)
     return {}
 
 
+def rewind_game(game_id, move_number):
+    """Takes back move move_number and every move after it"""
+    with game_manager.lock_game(game_id):
+        game_manager.rewind_game(game_id, move_number)
+    return {}
+
+
+def get_metrics():
+    """Returns the metrics of this process, see metrics.Registry.collect"""
+    return metrics.REGISTRY.collect()
+
+
+def _check_board(columns, rows, win_length):
+    """Raises MalformedRequestException unless a game of win_length in a row fits on a board of columns by rows"""
+    if columns < 1 or rows < 1:
+        raise MalformedRequestException("'columns' and 'rows' should be 1 or more.")
+    if columns > MAX_BOARD_SIZE or rows > MAX_BOARD_SIZE:
+        raise MalformedRequestException("'columns' and 'rows' can't be more than {}.".format(MAX_BOARD_SIZE))
+    if win_length > max(columns, rows):
+        raise MalformedRequestException("'winLength' can't be more than the number of columns or rows.")
+
+
+def _error_output(error):
+    output = error.to_dict()
+    output['status'] = error.status_code
+    return output
+
+
+def _response_cache(game_id, game):
+    cache = game.response_cache
+    if cache is None:
+        # The cache must not miss an undo while it is built
+        with game_manager.lock_game(game_id):
+            cache = game.get_response_cache()
+    return cache
+
+
+@metrics.timed('game_service.serialize')
+def _encode(obj):
+    return json_encoder.dumps(obj)
+
+
+def _encode_move(move):
+    return _encode(_move_output(move))
+
+
+def _moves_body(fragments, cursor=None):
+    body = '{"moves":[' + ','.join(fragments) + ']'
+    if cursor is not None:
+        body += ',"cursor":' + _encode(cursor)
+    return body + '}'
+
+
+def _state_output(game):
+    output = {}
+    output['players'] = game.get_players()
+    game_state = game.get_game_state()
+    output['state'] = game_state.name
+    if game_state == GameState.DONE:
+        output['winner'] = game.get_winner()
+    if not game.rules.is_standard():
+        output['rules'] = game.rules.to_dict()
+    return output
+
+
 def _move_output(move):
     output = {}
     output['type'] = move.get_type().name.upper()
@@ -0,0 +1,32 @@
+"""JSON encoding of response bodies.
+
+Uses ujson when it is installed (pip install ujson), which encodes the small dicts
+and lists of this service several times faster, and the standard json module otherwise.
+Another encoder can be plugged in with set_encoder.
+"""
+
+import json
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+def _json_dumps(obj):
+    return json.dumps(obj, separators=(',', ':'))
+
+
+def _ujson_dumps(obj):
+    return ujson.dumps(obj)
+
+
+dumps = _ujson_dumps if ujson is not None else _json_dumps
+
+
+def set_encoder(encoder):
+    """Makes dumps use encoder, a function taking an object and returning its JSON str.
+    None restores the standard json module.
+    """
+    global dumps
+    dumps = encoder or _json_dumps
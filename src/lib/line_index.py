@@ -0,0 +1,91 @@
+from collections import OrderedDict
+from threading import Lock
+
+
+# Number of geometries kept by get_line_index, least recently used dropped first
+MAX_GEOMETRIES = 32
+# Geometries with more (line, cell) pairs than this aren't indexed, so one index
+# never takes more than a few MB
+MAX_LINE_CELLS = 1 << 16
+
+_indexes = OrderedDict()
+_lock = Lock()
+
+
+class LineIndex:
+    """Every line of win_length cells a player can win with on one board geometry,
+    and the lines going through each cell.
+
+    Cell (column, row) is number column * height + row, lines are numbered from 0 to size - 1.
+    Indexes are shared by every game with the same geometry and never change once built.
+    """
+
+    def __init__(self, width, height, win_length, wraparound=False):
+        """Arguments
+        width -- int number of columns on the board
+        height -- int number of rows on the board
+        win_length -- int number of tokens in a row needed to win
+        wraparound -- if True, lines can run off the last column and continue from the first one
+        """
+        self.width = width
+        self.height = height
+        self.win_length = win_length
+        lines = []
+        seen = set()
+        for dx, dy in _directions(width, win_length, wraparound):
+            # Lines are listed by their first cell, the one with the lowest column then row
+            last_start = width - 1 if wraparound and dx else width - 1 - dx * (win_length - 1)
+            for col in xrange(last_start + 1):
+                for row in xrange(height):
+                    end_row = row + dy * (win_length - 1)
+                    if not (0 <= end_row < height):
+                        continue
+                    cells = tuple(((col + dx * i) % width) * height + row + dy * i for i in xrange(win_length))
+                    # With wraparound and a line as long as the row, every start column gives the same row
+                    if frozenset(cells) not in seen:
+                        seen.add(frozenset(cells))
+                        lines.append(cells)
+        self.size = len(lines)
+        # Built from a single list of numbers, so the tuples share their int objects
+        numbers = range(self.size)
+        cell_lines = [[] for cell in xrange(width * height)]
+        for line, cells in enumerate(lines):
+            for cell in cells:
+                cell_lines[cell].append(numbers[line])
+        # Tuple of the lines going through each cell
+        self.cell_lines = [tuple(through) for through in cell_lines]
+
+
+def get_line_index(width, height, win_length, wraparound=False):
+    """Returns the shared LineIndex of a geometry, built on first use,
+    or None if the geometry has too many lines to be worth indexing.
+    """
+    geometry = (width, height, win_length, wraparound)
+    with _lock:
+        index = _indexes.pop(geometry, None)
+        if index is None:
+            if _count_line_cells(width, height, win_length, wraparound) > MAX_LINE_CELLS:
+                return None
+            index = LineIndex(width, height, win_length, wraparound)
+        _indexes[geometry] = index
+        while len(_indexes) > MAX_GEOMETRIES:
+            _indexes.popitem(last=False)
+        return index
+
+
+def _directions(width, win_length, wraparound):
+    """Returns the (column, row) steps of horizontal, vertical, right and left diagonal lines"""
+    # A row can't hold more than width distinct tokens
+    if wraparound and win_length > width:
+        return [(0, 1), (1, 1), (1, -1)]
+    return [(1, 0), (0, 1), (1, 1), (1, -1)]
+
+
+def _count_line_cells(width, height, win_length, wraparound):
+    """Returns an upper bound of the number of (line, cell) pairs of a geometry, without building it"""
+    start_cols = width if wraparound else max(width - win_length + 1, 0)
+    start_rows = max(height - win_length + 1, 0)
+    lines = 0
+    for dx, dy in _directions(width, win_length, wraparound):
+        lines += (start_cols if dx else width) * (start_rows if dy else height)
+    return lines * win_length
@@ -0,0 +1,254 @@
+import logging
+import threading
+import time
+from collections import deque, OrderedDict
+from exception import DuplicatePlayersException, PlayerNotFoundException
+
+
+# Rating of players who don't give one
+DEFAULT_RATING = 1500
+# Players are queued with those whose rating is in the same band of RATING_BAND points
+RATING_BAND = 100
+# A player waiting alone gets matched one band further away every WIDEN_AFTER seconds,
+# up to MAX_WIDEN bands away
+WIDEN_AFTER = 5
+MAX_WIDEN = 3
+# Seconds between two rounds of matching
+MATCH_INTERVAL = 0.05
+# Most matches remembered for players who haven't asked for their game, oldest forgotten first
+MAX_MATCHES = 100000
+
+logger = logging.getLogger(__name__)
+
+
+class Matchmaker:
+    """Pairs up players waiting for a game and starts their games.
+
+    Players wait in a queue per board size and rating band, first come first served, so joining
+    and leaving cost O(1) however many players wait. A round of matching only visits the queues
+    players joined since the last round, and those left with a single player, who get matched
+    with the neighbouring bands the longer they wait. It costs as much as the players it matches,
+    never as much as the players waiting. All the games of a round are made by a single
+    GameManager.new_games.
+
+    Once started, rounds are run by a daemon thread made when the first player joins.
+    """
+
+    def __init__(self, game_manager, clock=time.time):
+        """Arguments
+        game_manager -- GameManager the games are made in
+        clock -- function returning the current time in seconds
+        """
+        self.game_manager = game_manager
+        self.clock = clock
+        # Guards everything below, never held while making games
+        self.lock = threading.Lock()
+        # Notified when players got their game
+        self.matched = threading.Condition(self.lock)
+        # (columns, rows, rating band) -> deque of [player, queue key, time joined].
+        # Players who left stay in the deque until popped, see sizes.
+        self.queues = {}
+        # Queue key -> number of players in the queue who haven't left
+        self.sizes = {}
+        # Player -> their queue entry, while they wait
+        self.waiting = {}
+        # Player -> their queue entry, while their game is being made
+        self.pairing = {}
+        # Keys of the queues players joined since the last round
+        self.ready = set()
+        # Keys of the queues holding a single player
+        self.lonely = set()
+        # Player -> id of the game they were matched into
+        self.matches = OrderedDict()
+        # Set by start, the thread is made when the next player joins
+        self.started = False
+        self.thread = None
+        self.stopped = threading.Event()
+
+
+    def join(self, player, columns, rows, rating=None):
+        """Queues player for a game of columns by rows
+
+        Arguments
+        player -- name of the player, waiting for a single game at a time
+        columns -- width of the board
+        rows -- height of the board
+        rating -- optional int rating, players are matched with those of a close rating
+        """
+        key = (columns, rows, (DEFAULT_RATING if rating is None else rating) // RATING_BAND)
+        with self.lock:
+            if player in self.waiting or player in self.pairing:
+                raise DuplicatePlayersException("Player '{}' is already waiting for a game.".format(player))
+            self.matches.pop(player, None)
+            entry = [player, key, self.clock()]
+            self.waiting[player] = entry
+            queue = self.queues.get(key)
+            if queue is None:
+                queue = self.queues[key] = deque()
+            queue.append(entry)
+            self._resize(key, 1)
+            self.ready.add(key)
+            if self.started and self.thread is None:
+                self._start_thread()
+
+
+    def leave(self, player):
+        """Takes player out of the queue. Raises PlayerNotFoundException if they aren't in it,
+        or their game is already being made.
+        """
+        with self.lock:
+            entry = self.waiting.pop(player, None)
+            if entry is None:
+                raise PlayerNotFoundException("Player '{}' isn't waiting for a game.".format(player))
+            key = entry[1]
+            self._resize(key, -1)
+            queue = self.queues.get(key)
+            # Drops the entries of players who left once they outnumber the others
+            if queue is not None and len(queue) > 2 * self.sizes[key]:
+                self.queues[key] = deque(other for other in queue if self.waiting.get(other[0]) is other)
+
+
+    def get_match(self, player, timeout=0):
+        """Returns the id of the game player was matched into, or None while they wait for one.
+        Waits up to timeout seconds for the game. Raises PlayerNotFoundException if player
+        isn't waiting and has no game, which is also the case when their game couldn't be made.
+        """
+        deadline = time.time() + timeout
+        with self.lock:
+            while player in self.waiting or player in self.pairing:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self.matched.wait(remaining)
+            if player not in self.matches:
+                raise PlayerNotFoundException("Player '{}' isn't waiting for a game.".format(player))
+            return self.matches[player]
+
+
+    def match(self):
+        """Runs a round of matching. Returns the list of games made."""
+        now = self.clock()
+        pairs = []
+        with self.lock:
+            for key in self.ready:
+                while self.sizes.get(key, 0) >= 2:
+                    pairs.append((self._pop(key), self._pop(key)))
+            self.ready.clear()
+            for key in list(self.lonely):
+                self._widen(key, now, pairs)
+        if not pairs:
+            return []
+
+        games = self._new_games(pairs)
+        with self.lock:
+            for (first, second), game in zip(pairs, games):
+                for entry in (first, second):
+                    del self.pairing[entry[0]]
+                    # Players whose game failed are dropped from the queue
+                    if game is not None:
+                        self.matches[entry[0]] = game.get_game_id()
+            while len(self.matches) > MAX_MATCHES:
+                self.matches.popitem(last=False)
+            self.matched.notify_all()
+        return [game for game in games if game is not None]
+
+
+    def start(self):
+        """Runs a round of matching every MATCH_INTERVAL seconds from now on, in a daemon thread
+        started once a player joins
+        """
+        with self.lock:
+            self.started = True
+            if self.waiting and self.thread is None:
+                self._start_thread()
+
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+
+
+    def _new_games(self, pairs):
+        """Makes the game of each pair of entries. Returns the list of games, in the same order,
+        None for those that couldn't be made.
+        """
+        games = [([first[0], second[0]], first[1][0], first[1][1], None) for first, second in pairs]
+        try:
+            return self.game_manager.new_games(games)
+        except Exception:
+            logger.exception("Making %d matched games at once failed, making them one by one", len(games))
+        made = []
+        for players, columns, rows, rules in games:
+            try:
+                made.append(self.game_manager.new_game(players, columns, rows, rules))
+            except Exception:
+                logger.exception("Making the game of %s failed, they are dropped from the queue", players)
+                made.append(None)
+        return made
+
+
+    def _widen(self, key, now, pairs):
+        """Pairs the player alone in queue key with one alone in a queue of a close band,
+        closest first, if they waited long enough. Must be called holding self.lock.
+        """
+        if key not in self.lonely:
+            # Already paired up from a neighbouring queue this round
+            return
+        columns, rows, band = key
+        reach = min(int((now - self._peek(key)[2]) // WIDEN_AFTER), MAX_WIDEN)
+        for distance in xrange(1, reach + 1):
+            for other in ((columns, rows, band - distance), (columns, rows, band + distance)):
+                if other in self.lonely:
+                    pairs.append((self._pop(key), self._pop(other)))
+                    return
+
+
+    def _peek(self, key):
+        """Returns the first entry of queue key of a player who didn't leave. Must be called holding self.lock."""
+        queue = self.queues[key]
+        while self.waiting.get(queue[0][0]) is not queue[0]:
+            queue.popleft()
+        return queue[0]
+
+
+    def _pop(self, key):
+        """Takes the first player who didn't leave out of queue key, to make their game.
+        Must be called holding self.lock.
+        """
+        entry = self._peek(key)
+        self.queues[key].popleft()
+        del self.waiting[entry[0]]
+        self.pairing[entry[0]] = entry
+        self._resize(key, -1)
+        return entry
+
+
+    def _resize(self, key, step):
+        """Adds step to the size of queue key. Must be called holding self.lock."""
+        size = self.sizes.get(key, 0) + step
+        if size:
+            self.sizes[key] = size
+        else:
+            del self.sizes[key]
+            del self.queues[key]
+        if size == 1:
+            self.lonely.add(key)
+        else:
+            self.lonely.discard(key)
+
+
+    def _start_thread(self):
+        """Must be called holding self.lock"""
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+
+    def _run(self):
+        while not self.stopped.wait(MATCH_INTERVAL):
+            try:
+                self.match()
+            except Exception:
+                # The next rounds can still match the players who keep waiting
+                logger.exception("Matchmaking round failed")
@@ -0,0 +1,228 @@
+"""Counters and latency histograms cheap enough to leave on in production,
+exported in the Prometheus text format.
+
+Histograms have fixed buckets allocated up front, so recording a value is a bisect
+and two additions. Functions decorated with timed are counted on every call but only
+timed once every SAMPLE_EVERY calls.
+
+Set DROP_TOKEN_METRICS=0 to turn instrumentation fully off: timed then returns functions
+undecorated and the app doesn't time requests nor serve /metrics.
+"""
+
+import bisect
+import functools
+import itertools
+import os
+import threading
+import timeit
+
+
+ENABLED = os.environ.get('DROP_TOKEN_METRICS', '1') != '0'
+# Upper bounds of the latency buckets, in seconds
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# A function decorated with timed is timed once every SAMPLE_EVERY calls
+SAMPLE_EVERY = 16
+
+clock = timeit.default_timer
+
+
+class Counter:
+    """Count that can be increased from any thread without a lock"""
+
+    def __init__(self):
+        # next() on an itertools.count is a single step under the GIL, unlike += 1
+        self.count = itertools.count()
+
+
+    def inc(self):
+        next(self.count)
+
+
+    def get(self):
+        # The pickling state of a count is the next value it will return
+        return self.count.__reduce__()[1][0]
+
+
+class Histogram:
+    """Number of values recorded in each of a fixed set of buckets, and their sum"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        """Arguments
+        buckets -- sorted tuple of the upper bounds of the buckets, a last +Inf bucket is added
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+    def snapshot(self):
+        """Returns (cumulative count per bucket, total count, sum)"""
+        with self.lock:
+            counts = list(self.counts)
+            total = self.sum
+        cumulative = _accumulate(counts)
+        return cumulative, cumulative[-1], total
+
+
+class Family:
+    """A metric and its children, one per combination of label values"""
+
+    def __init__(self, name, kind, help, label_names, make_child):
+        self.name = name
+        # 'counter' or 'histogram'
+        self.kind = kind
+        self.help = help
+        self.label_names = label_names
+        self.make_child = make_child
+        self.children = {}
+        self.lock = threading.Lock()
+
+
+    def labels(self, *values):
+        """Returns the Counter or Histogram for these label values, made on first use"""
+        child = self.children.get(values)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(values, self.make_child())
+        return child
+
+
+    def samples(self):
+        """Returns a list of (sample name, tuple of (label, value) pairs, value)"""
+        samples = []
+        for values, child in sorted(self.children.items()):
+            labels = tuple(zip(self.label_names, values))
+            if self.kind == 'counter':
+                samples.append((self.name, labels, child.get()))
+                continue
+            cumulative, count, total = child.snapshot()
+            for bound, bucket_count in zip(child.buckets + (float('inf'),), cumulative):
+                samples.append((self.name + '_bucket', labels + (('le', _format_value(bound)),), bucket_count))
+            samples.append((self.name + '_sum', labels, total))
+            samples.append((self.name + '_count', labels, count))
+        return samples
+
+
+class Registry:
+    """Every metric of a process, by name"""
+
+    def __init__(self):
+        self.families = {}
+        self.lock = threading.Lock()
+
+
+    def counter(self, name, help, label_names=()):
+        return self._family(name, 'counter', help, label_names, Counter)
+
+
+    def histogram(self, name, help, label_names=(), buckets=LATENCY_BUCKETS):
+        return self._family(name, 'histogram', help, label_names, lambda: Histogram(buckets))
+
+
+    def collect(self):
+        """Returns a list of (name, kind, help, samples), see Family.samples.
+        Plain tuples, so they can be sent to another process and merged before rendering.
+        """
+        return [(family.name, family.kind, family.help, family.samples())
+                for name, family in sorted(self.families.items())]
+
+
+    def _family(self, name, kind, help, label_names, make_child):
+        with self.lock:
+            if name not in self.families:
+                self.families[name] = Family(name, kind, help, tuple(label_names), make_child)
+            return self.families[name]
+
+
+REGISTRY = Registry()
+
+FUNCTION_CALLS = REGISTRY.counter('drop_token_function_calls_total',
+                                  "Calls of instrumented functions.", ('function',))
+FUNCTION_SECONDS = REGISTRY.histogram('drop_token_function_seconds',
+                                      "Run time of instrumented functions, sampled.", ('function',))
+
+
+def timed(name, sample_every=SAMPLE_EVERY):
+    """Returns a decorator counting every call of a function and timing one call in sample_every
+
+    Arguments
+    name -- str function label of the drop_token_function_* metrics, can be shared by several functions
+    sample_every -- int number of calls per timed call
+    """
+    calls = FUNCTION_CALLS.labels(name).count
+    seconds = FUNCTION_SECONDS.labels(name)
+
+    def decorate(function):
+        if not ENABLED:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if next(calls) % sample_every:
+                return function(*args, **kwargs)
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                seconds.observe(clock() - start)
+        return wrapper
+    return decorate
+
+
+def render(families):
+    """Returns the Prometheus text format of families, as returned by Registry.collect.
+    Families with the same name, e.g. from several processes, are merged.
+    """
+    merged = {}
+    for name, kind, help, samples in families:
+        if name in merged:
+            merged[name][2].extend(samples)
+        else:
+            merged[name] = (kind, help, list(samples))
+    lines = []
+    for name, (kind, help, samples) in sorted(merged.items()):
+        lines.append('# HELP {} {}'.format(name, help))
+        lines.append('# TYPE {} {}'.format(name, kind))
+        for sample_name, labels, value in samples:
+            if labels:
+                label_text = ','.join('{}="{}"'.format(label, _escape(label_value)) for label, label_value in labels)
+                sample_name = '{}{{{}}}'.format(sample_name, label_text)
+            lines.append('{} {}'.format(sample_name, _format_value(value)))
+    return '\n'.join(lines) + '\n'
+
+
+def add_labels(families, labels):
+    """Returns families with the (label, value) pairs of labels added to every sample"""
+    labels = tuple(labels)
+    return [(name, kind, help, [(sample_name, labels + sample_labels, value)
+                                for sample_name, sample_labels, value in samples])
+            for name, kind, help, samples in families]
+
+
+def _accumulate(counts):
+    cumulative = []
+    total = 0
+    for count in counts:
+        total += count
+        cumulative.append(total)
+    return cumulative
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    # repr keeps every digit of a float, str doesn't add the L of a long
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,157 @@
+from array import array
+from game_token import GameToken
+from move import Move
+from move_type import MoveType
+from exception import MovesNotFoundException, MalformedRequestException
+
+
+# Layout of a packed entry: bit 0 is set for quits, bits 1-11 hold the player index,
+# bit 31 is set for pops (see GameRules.pop_out) and the bits in between hold the column
+QUIT_BIT = 1
+PLAYER_SHIFT = 1
+PLAYER_MASK = 0x7FF
+COLUMN_SHIFT = 12
+POP_BIT = 1 << 31
+COLUMN_MASK = POP_BIT - 1
+
+
+class MoveLog:
+    """Packed, append-only log of the moves of a single game.
+
+    Each move costs one unsigned int for its type, player and column plus one for its row,
+    instead of a Move and a GameToken object. Moves are handed out as Move views built on read.
+    """
+
+    def __init__(self, players=()):
+        """Arguments
+        players -- optional list of players to index upfront
+        """
+        self.entries = array('I')
+        self.rows = array('I')
+        # Player names by index, and the reverse lookup
+        self.players = []
+        self.player_idx = {}
+        for player in players:
+            self._get_player_idx(player)
+
+
+    @classmethod
+    def from_packed(cls, players, entries, rows):
+        """Rebuilds a MoveLog from the output of to_packed"""
+        moves_log = cls()
+        moves_log.players = players
+        moves_log.player_idx = dict(zip(players, xrange(len(players))))
+        moves_log.entries.fromstring(entries)
+        moves_log.rows.fromstring(rows)
+        return moves_log
+
+
+    def to_packed(self):
+        """Returns (players, entries, rows) where entries and rows are the raw bytes of the log"""
+        # Entries are appended last, so copying them first gives a consistent view
+        # even while another thread is logging a move
+        entries = self.entries.tostring()
+        rows = self.rows[:len(entries) // self.entries.itemsize].tostring()
+        return list(self.players), entries, rows
+
+
+    def __len__(self):
+        return len(self.entries)
+
+
+    # Rows are appended before entries: readers only go up to len(entries),
+    # so a reader on another thread never sees an entry without its row
+    def append_move(self, player, col, row):
+        entry = (col << COLUMN_SHIFT) | (self._get_player_idx(player) << PLAYER_SHIFT)
+        self.rows.append(row)
+        self.entries.append(entry)
+
+
+    def append_quit(self, player):
+        entry = (self._get_player_idx(player) << PLAYER_SHIFT) | QUIT_BIT
+        self.rows.append(0)
+        self.entries.append(entry)
+
+
+    def append_pop(self, player, col):
+        entry = POP_BIT | (col << COLUMN_SHIFT) | (self._get_player_idx(player) << PLAYER_SHIFT)
+        self.rows.append(0)
+        self.entries.append(entry)
+
+
+    def pop(self):
+        """Removes and returns the last Move"""
+        if len(self.entries) == 0:
+            raise MovesNotFoundException("No moves made thus far.")
+        move = self._unpack(len(self.entries) - 1)
+        # Entries first, so readers never see an entry without its row
+        self.entries.pop()
+        self.rows.pop()
+        return move
+
+
+    def get_move(self, move_number):
+        """Gets the move at move_number
+
+        Arguments:
+        move_number -- index of the move to retrieve
+
+        Returns a Move
+        """
+        if move_number < 0 or move_number >= len(self.entries):
+            raise MovesNotFoundException("Move '{}' not found.".format(move_number))
+        return self._unpack(move_number)
+
+
+    def get_all_moves_taken(self, start=None, end=None):
+        """Get a list of moves taken
+
+        Arguments
+        start -- optional int index of the first move to get. If None, will be 0
+        end -- optional int index of the last move to get. If None, will be the index of the last move
+
+        Returns a list of Moves from start to end inclusive
+        """
+        return list(self.iter_moves_taken(start, end))
+
+
+    def iter_moves_taken(self, start=None, end=None):
+        """Same as get_all_moves_taken, but returns an iterator building each Move as it is read.
+        The range is checked right away, not on the first read.
+        """
+        start, end = self.check_range(start, end)
+        return (self._unpack(i) for i in xrange(start, end+1))
+
+
+    def check_range(self, start, end):
+        """Returns (start, end) with the defaults filled in, raises MovesNotFoundException if out of range"""
+        moves = len(self.entries)
+        if moves == 0:
+            raise MovesNotFoundException("No moves made thus far.")
+        if start is None:
+            start = 0
+        if end is None:
+            end = moves-1
+        if start < 0 or start > end or end >= moves:
+            raise MovesNotFoundException("Moves {} to {} not found. Current total moves: {}.".format(start, end, moves))
+        return start, end
+
+
+    def _get_player_idx(self, player):
+        if player not in self.player_idx:
+            if len(self.players) > PLAYER_MASK:
+                raise MalformedRequestException("Games are limited to {} players.".format(PLAYER_MASK + 1))
+            self.player_idx[player] = len(self.players)
+            self.players.append(player)
+        return self.player_idx[player]
+
+
+    def _unpack(self, move_number):
+        entry = self.entries[move_number]
+        player = self.players[(entry >> PLAYER_SHIFT) & PLAYER_MASK]
+        if entry & QUIT_BIT:
+            return Move(MoveType.QUIT, player, move_number)
+        token = GameToken((entry & COLUMN_MASK) >> COLUMN_SHIFT, self.rows[move_number], player)
+        if entry & POP_BIT:
+            return Move(MoveType.POP, player, move_number, token)
+        return Move(MoveType.MOVE, player, move_number, token)
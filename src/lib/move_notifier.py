@@ -0,0 +1,55 @@
+import threading
+import time
+from game_state import GameState
+
+
+class MoveNotifier:
+    """Lets callers block until a game gets new moves.
+
+    A Condition is only kept for games that currently have someone waiting,
+    so moves on games nobody waits on cost a single dict lookup.
+    """
+
+    def __init__(self):
+        # game id -> [Condition, number of waiters]
+        self.waiters = {}
+        self.lock = threading.Lock()
+
+
+    def wait_for_moves(self, game, moves, timeout):
+        """Blocks until game has more than moves moves logged, it ends, or timeout seconds pass.
+
+        Arguments
+        game -- DropTokenGame or ArchivedGame to wait on
+        moves -- int number of moves the caller already knows about
+        timeout -- max number of seconds to wait
+
+        Returns True if new moves are available
+        """
+        deadline = time.time() + timeout
+        game_id = game.get_game_id()
+        with self.lock:
+            waiter = self.waiters.setdefault(game_id, [threading.Condition(), 0])
+            waiter[1] += 1
+        condition = waiter[0]
+        try:
+            with condition:
+                while len(game.moves_log) <= moves and game.get_game_state() == GameState.IN_PROGRESS:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    condition.wait(remaining)
+        finally:
+            with self.lock:
+                waiter[1] -= 1
+                if waiter[1] == 0:
+                    del self.waiters[game_id]
+        return len(game.moves_log) > moves
+
+
+    def notify(self, game, move):
+        """Wakes up everyone waiting on game. Registered as a DropTokenGame move listener."""
+        waiter = self.waiters.get(game.get_game_id())
+        if waiter is not None:
+            with waiter[0]:
+                waiter[0].notify_all()
@@ -4,4 +4,5 @@ from enum import Enum
 class MoveType(Enum):
     MOVE = 1
     QUIT = 2
+    POP = 3
 
@@ -0,0 +1,36 @@
+"""Opaque cursors for paginated listings.
+
+A cursor is the urlsafe base64 of the JSON of where the next page starts,
+so clients pass it back as is and never build one themselves.
+"""
+
+import base64
+import binascii
+import json
+from exception import MalformedRequestException
+
+
+def encode_cursor(position):
+    """Returns the cursor of position, any JSON value"""
+    return base64.urlsafe_b64encode(json.dumps(position, separators=(',', ':')))
+
+
+def decode_cursor(cursor, position_types):
+    """Returns the position of a cursor made by encode_cursor
+
+    Arguments
+    cursor -- str cursor sent by a client
+    position_types -- type or tuple of types the position must be an instance of
+    """
+    try:
+        position = json.loads(base64.urlsafe_b64decode(str(cursor)))
+    except (TypeError, ValueError, binascii.Error):
+        position = None
+    if not isinstance(position, position_types):
+        raise MalformedRequestException("Invalid cursor '{}'.".format(cursor))
+    return position
+
+
+def game_id_key(game_id):
+    """Sort key putting game ids in creation order, e.g. gameid9 before gameid10"""
+    return (len(game_id), game_id)
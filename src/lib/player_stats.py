@@ -0,0 +1,120 @@
+import threading
+from drop_token_game import DropTokenGame
+from game_state import GameState
+from skip_list import SkipList
+
+
+# Number of players on a leaderboard by default, and at most
+LEADERBOARD_SIZE = 10
+MAX_LEADERBOARD_SIZE = 1000
+
+
+class PlayerStats:
+    """Wins, losses and draws of every player, updated as games end, and a leaderboard.
+
+    When a game is done its winner gets a win and every other player who joined it,
+    including those who quit, a loss. In a draw, the players still in the game get a draw
+    instead. An undo that puts a finished game back in progress takes its result back.
+
+    Players are ranked by most wins, then fewest losses, then name, in a SkipList,
+    so a result costs O(log players) and reading the top k costs O(k).
+    """
+
+    def __init__(self):
+        # Player -> [wins, losses, draws]
+        self.stats = {}
+        # (-wins, losses, player) of every player with a finished game
+        self.ranking = SkipList()
+        # Game id -> (winner, players in a draw) of every finished resident game counted,
+        # so the result can be taken back. Archived games never change, their results aren't kept.
+        self.results = {}
+        self.lock = threading.Lock()
+
+
+    def attach(self, game_manager):
+        """Counts the finished games of game_manager, and from now on every game that ends
+        or is restored
+        """
+        game_manager.add_game_listener(self._watch)
+        game_manager.add_restore_listener(self._add_games)
+        game_manager.add_archive_listener(self._on_archive)
+        self._add_games(game_manager.get_all_games())
+
+
+    def get_player_stats(self, player):
+        """Returns (wins, losses, draws) of player"""
+        with self.lock:
+            return tuple(self.stats.get(player, (0, 0, 0)))
+
+
+    def get_leaderboard(self, k):
+        """Returns the list of (player, wins, losses, draws) of the k best players, best first"""
+        with self.lock:
+            leaders = self.ranking.first(k)
+            return [(player,) + tuple(self.stats[player]) for minus_wins, losses, player in leaders]
+
+
+    def _add_games(self, games):
+        """Counts the finished games among games, DropTokenGames or ArchivedGames"""
+        for game in games:
+            if isinstance(game, DropTokenGame):
+                self._on_game_state_change(game, GameState.IN_PROGRESS)
+                # Finished games can be in progress again through an undo
+                game.add_state_listener(self._on_game_state_change)
+            elif game.get_game_state() == GameState.DONE:
+                winner, drawn = _result(game)
+                with self.lock:
+                    self._count(game.moves_log.players, winner, drawn, 1)
+
+
+    def _watch(self, game):
+        if game.get_game_state() == GameState.DONE:
+            # Brought back by GameManager.unarchive_game, it was counted while archived.
+            # Its result is kept again so that an undo can take it back.
+            with self.lock:
+                self.results.setdefault(game.get_game_id(), _result(game))
+        game.add_state_listener(self._on_game_state_change)
+
+
+    def _on_archive(self, game_ids):
+        """GameManager archive listener"""
+        with self.lock:
+            for game_id in game_ids:
+                self.results.pop(game_id, None)
+
+
+    def _on_game_state_change(self, game, old_state):
+        game_id = game.get_game_id()
+        with self.lock:
+            if game.get_game_state() == GameState.DONE and game_id not in self.results:
+                winner, drawn = self.results[game_id] = _result(game)
+                self._count(game.moves_log.players, winner, drawn, 1)
+            elif game.get_game_state() != GameState.DONE and game_id in self.results:
+                winner, drawn = self.results.pop(game_id)
+                self._count(game.moves_log.players, winner, drawn, -1)
+
+
+    def _count(self, players, winner, drawn, step):
+        """Adds step to the result of every player. Must be called holding self.lock."""
+        for player in players:
+            stats = self.stats.get(player)
+            if stats is None:
+                stats = self.stats[player] = [0, 0, 0]
+            else:
+                self.ranking.remove((-stats[0], stats[1], player))
+            if player == winner:
+                stats[0] += step
+            elif player in drawn:
+                stats[2] += step
+            else:
+                stats[1] += step
+            if any(stats):
+                self.ranking.add((-stats[0], stats[1], player))
+            else:
+                del self.stats[player]
+
+
+def _result(game):
+    """Returns (winner, players in a draw) of a finished game"""
+    winner = game.get_winner()
+    return winner, () if winner is not None else tuple(game.get_players())
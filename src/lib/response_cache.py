@@ -0,0 +1,58 @@
+import threading
+
+
+class ResponseCache:
+    """Encoded response bodies of one game, reused until the game changes.
+
+    Bodies are stored with the game version they were built at and rebuilt once the
+    version moves on, so finished games keep theirs for good. Every move is also encoded
+    once into a fragment, and move lists are joined from the fragments.
+    """
+
+    def __init__(self):
+        # Body name -> (version, encoded body)
+        self.bodies = {}
+        # Encoded moves, by move number. Extended on read, truncated by undos.
+        self.fragments = []
+        self.lock = threading.Lock()
+
+
+    def get(self, name, version, build):
+        """Returns the body called name at version, calling build() to encode it if needed
+
+        Arguments
+        name -- str name of the body, e.g. 'state'
+        version -- int current version of the game, read before calling get
+        build -- function returning the encoded body
+        """
+        entry = self.bodies.get(name)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        # A move landing while building only makes the body newer than version,
+        # the next call rebuilds it
+        body = build()
+        self.bodies[name] = (version, body)
+        return body
+
+
+    def get_fragments(self, moves_log, start, end, encode_move):
+        """Returns the list of encoded moves start to end (inclusive)
+
+        Arguments
+        moves_log -- MoveLog of the game
+        start -- optional int first move, defaults to the first one
+        end -- optional int last move, defaults to the last one
+        encode_move -- function turning a Move into its JSON str
+        """
+        start, end = moves_log.check_range(start, end)
+        with self.lock:
+            if len(self.fragments) <= end:
+                for move in moves_log.iter_moves_taken(len(self.fragments), end):
+                    self.fragments.append(encode_move(move))
+            return self.fragments[start:end + 1]
+
+
+    def on_undo(self, game, move):
+        """DropTokenGame undo listener"""
+        with self.lock:
+            del self.fragments[move.get_move_number():]
@@ -0,0 +1,67 @@
+import time
+from collections import OrderedDict, deque
+
+
+class RetentionPolicy:
+    """Decides which finished games GameManager should evict to its archive.
+
+    Only finished games are ever evicted. They are picked least recently used first
+    when more than max_resident games are resident, and once done_ttl seconds have
+    passed since they finished.
+    """
+
+    def __init__(self, max_resident=None, done_ttl=None, clock=time.time):
+        """Arguments
+        max_resident -- optional int max number of games (in progress or done) kept resident
+        done_ttl -- optional number of seconds a finished game stays resident
+        clock -- function returning the current time in seconds
+        """
+        self.max_resident = max_resident
+        self.done_ttl = done_ttl
+        self.clock = clock
+        # Resident finished game ids to their finish time, least recently used first
+        self.lru = OrderedDict()
+        # (finish time, game id) in the order games finished
+        self.finished = deque()
+
+
+    def game_done(self, game_id):
+        """Called when a resident game reaches GameState.DONE"""
+        finished_at = self.clock()
+        self.lru[game_id] = finished_at
+        if self.done_ttl is not None:
+            self.finished.append((finished_at, game_id))
+
+
+    def game_resumed(self, game_id):
+        """Called when a resident finished game is in progress again, after an undo"""
+        self.lru.pop(game_id, None)
+
+
+    def game_used(self, game_id):
+        """Called every time a resident game is retrieved"""
+        if game_id in self.lru:
+            self.lru[game_id] = self.lru.pop(game_id)
+
+
+    def get_evictions(self, resident):
+        """Returns the list of finished game ids to evict
+
+        Arguments
+        resident -- int number of games currently resident
+        """
+        evictions = []
+        if self.done_ttl is not None:
+            expired = self.clock() - self.done_ttl
+            while self.finished and self.finished[0][0] <= expired:
+                finished_at, game_id = self.finished.popleft()
+                # Games can already be gone because of max_resident,
+                # or have been resumed (and maybe finished again) since
+                if self.lru.get(game_id) == finished_at:
+                    del self.lru[game_id]
+                    evictions.append(game_id)
+
+        if self.max_resident is not None:
+            while self.lru and resident - len(evictions) > self.max_resident:
+                evictions.append(self.lru.popitem(last=False)[0])
+        return evictions
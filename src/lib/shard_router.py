@@ -0,0 +1,290 @@
+import itertools
+import os
+import shutil
+import tempfile
+import threading
+import traceback
+from multiprocessing import Event, Process
+from multiprocessing.connection import Client, Listener
+from game_manager import GameManager
+from game_persistence import GamePersistence
+from pagination import encode_cursor, game_id_key
+from player_stats import LEADERBOARD_SIZE, MAX_LEADERBOARD_SIZE
+import metrics
+from exception.api_exception import ApiException
+
+
+class ShardRouter:
+    """Spreads games over worker processes, each with its own GameManager.
+
+    Worker s only hands out game ids whose number is s + 1 modulo the number of workers,
+    so the owner of a game is known from its id alone. The router exposes the same functions
+    as game_service: calls about a game are forwarded to its owner over a local socket,
+    new games go to the workers in turn and listing games asks every worker.
+
+    Routers hold no game state, so any number of processes can build their own router
+    from the same addresses and authkey.
+    """
+
+    def __init__(self, addresses, authkey, processes=None):
+        """Arguments
+        addresses -- list of socket addresses of the workers, by shard
+        authkey -- str key shared with the workers
+        processes -- optional list of worker Processes, stopped by stop
+        """
+        self.addresses = addresses
+        self.authkey = authkey
+        self.processes = processes or []
+        self.socket_dir = None
+        # Idle connections per shard. A call takes one or opens a new one,
+        # so a long running call (e.g. waiting for moves) never holds up the others
+        self.idle = [[] for address in addresses]
+        self.lock = threading.Lock()
+        self.next_shard = itertools.count()
+
+
+    @classmethod
+    def start(cls, shards, data_dir=None):
+        """Starts shards worker processes and returns a router to them
+
+        Arguments
+        shards -- int number of worker processes
+        data_dir -- optional directory to persist games in, one sub directory per worker
+        """
+        socket_dir = tempfile.mkdtemp(prefix='drop_token_shards')
+        authkey = os.urandom(16)
+        addresses = [os.path.join(socket_dir, 'shard{}.sock'.format(shard)) for shard in xrange(shards)]
+        processes = []
+        for shard in xrange(shards):
+            ready = Event()
+            process = Process(target=_run_worker, args=(shard, addresses, authkey, data_dir, ready))
+            process.daemon = True
+            process.start()
+            ready.wait()
+            processes.append(process)
+        router = cls(addresses, authkey, processes)
+        router.socket_dir = socket_dir
+        return router
+
+
+    def stop(self):
+        """Stops the workers started by start"""
+        for process in self.processes:
+            process.terminate()
+            process.join()
+        if self.socket_dir is not None:
+            shutil.rmtree(self.socket_dir, ignore_errors=True)
+
+
+    def shard_for(self, game_id):
+        """Returns the shard owning game_id. Unknown ids go to shard 0, which will not find them."""
+        suffix = str(game_id)[len(GameManager.game_id_prefix):]
+        if not str(game_id).startswith(GameManager.game_id_prefix) or not suffix.isdigit() or int(suffix) == 0:
+            return 0
+        return (int(suffix) - 1) % len(self.addresses)
+
+
+    def call(self, shard, name, *args, **kwargs):
+        """Calls game_service.name(*args, **kwargs) on the worker for shard"""
+        connection = self._take_connection(shard)
+        connection.send((name, args, kwargs))
+        result = connection.recv()
+        self._release_connection(shard, connection)
+        return self._unwrap(result)
+
+
+    def call_all(self, name, *args, **kwargs):
+        """Calls game_service.name(*args, **kwargs) on every worker at once.
+        Returns the list of results, by shard.
+        """
+        connections = [self._take_connection(shard) for shard in xrange(len(self.addresses))]
+        for connection in connections:
+            connection.send((name, args, kwargs))
+        results = []
+        for shard, connection in enumerate(connections):
+            result = connection.recv()
+            self._release_connection(shard, connection)
+            results.append(result)
+        return [self._unwrap(result) for result in results]
+
+
+    def get_all_in_progress_games(self, limit=None, cursor=None):
+        # Ask every worker at once, then merge. A cursor is the last game id returned,
+        # which every worker understands, so each one returns its own next page.
+        connections = [self._take_connection(shard) for shard in xrange(len(self.addresses))]
+        for connection in connections:
+            connection.send(('get_all_in_progress_games', (), {'limit': limit, 'cursor': cursor}))
+        games = []
+        more = False
+        for shard, connection in enumerate(connections):
+            result = connection.recv()
+            self._release_connection(shard, connection)
+            output = self._unwrap(result)
+            games.extend(output['games'])
+            more = more or 'cursor' in output
+        if limit is None and cursor is None:
+            return {'games': games}
+
+        games.sort(key=game_id_key)
+        output = {}
+        if limit is not None and (len(games) > limit or more):
+            games = games[:limit]
+            output['cursor'] = encode_cursor(games[-1])
+        output['games'] = games
+        return output
+
+
+    def get_player_games(self, player, state=None, limit=None, cursor=None):
+        # Like get_all_in_progress_games, every worker returns its own next page
+        connections = [self._take_connection(shard) for shard in xrange(len(self.addresses))]
+        for connection in connections:
+            connection.send(('get_player_games', (player,), {'state': state, 'limit': limit, 'cursor': cursor}))
+        games = []
+        more = False
+        for shard, connection in enumerate(connections):
+            result = connection.recv()
+            self._release_connection(shard, connection)
+            output = self._unwrap(result)
+            games.extend(output['games'])
+            more = more or 'cursor' in output
+
+        games.sort(key=game_id_key)
+        output = {}
+        if limit is not None and (len(games) > limit or more):
+            games = games[:limit]
+            output['cursor'] = encode_cursor(games[-1])
+        output['games'] = games
+        return output
+
+
+    def get_player_stats(self, player):
+        return self.get_players_stats([player])['players'][0]
+
+
+    def get_players_stats(self, players):
+        # A player's games can be on any worker, their results add up
+        output = [{'player': player, 'wins': 0, 'losses': 0, 'draws': 0} for player in players]
+        for shard_output in self.call_all('get_players_stats', players):
+            for total, stats in zip(output, shard_output['players']):
+                for name in ('wins', 'losses', 'draws'):
+                    total[name] += stats[name]
+        return {'players': output}
+
+
+    def get_leaderboard(self, k=LEADERBOARD_SIZE):
+        # Candidates are the top k of every worker, ranked on their results from all workers.
+        # A player never in any worker's top k but first overall when summed can be missed.
+        k = min(k, MAX_LEADERBOARD_SIZE)
+        candidates = set()
+        for output in self.call_all('get_leaderboard', k):
+            candidates.update(entry['player'] for entry in output['leaderboard'])
+        leaders = sorted(self.get_players_stats(list(candidates))['players'],
+                         key=lambda stats: (-stats['wins'], stats['losses'], stats['player']))
+        return {'leaderboard': leaders[:k]}
+
+
+    # Players are only matched with players queued on the same worker, so every one queues on worker 0,
+    # which makes all the matched games
+    def join_matchmaking(self, player, columns, rows, rating=None):
+        return self.call(0, 'join_matchmaking', player, columns, rows, rating)
+
+
+    def get_match(self, player, wait=0):
+        return self.call(0, 'get_match', player, wait)
+
+
+    def leave_matchmaking(self, player):
+        return self.call(0, 'leave_matchmaking', player)
+
+
+    def create_new_game(self, players, columns, rows, **rules):
+        shard = next(self.next_shard) % len(self.addresses)
+        return self.call(shard, 'create_new_game', players, columns, rows, **rules)
+
+
+    def make_moves(self, moves, stop_on_failure=False):
+        # Every shard plays its own moves in order, results go back to their original position
+        by_shard = {}
+        for index, move in enumerate(moves):
+            by_shard.setdefault(self.shard_for(move[0]), []).append(index)
+        results = [None] * len(moves)
+        for shard, indexes in by_shard.iteritems():
+            output = self.call(shard, 'make_moves', [moves[i] for i in indexes], stop_on_failure)
+            for index, result in zip(indexes, output['moves']):
+                results[index] = result
+        return {'moves': results}
+
+
+    def get_metrics(self):
+        # The router's own metrics (e.g. request latencies) and every worker's, labelled by shard
+        families = metrics.REGISTRY.collect()
+        for shard in xrange(len(self.addresses)):
+            families.extend(metrics.add_labels(self.call(shard, 'get_metrics'), [('shard', str(shard))]))
+        return families
+
+
+    def __getattr__(self, name):
+        # Every other game_service function takes the game id first
+        if name.startswith('_'):
+            raise AttributeError(name)
+        def forward(game_id, *args, **kwargs):
+            return self.call(self.shard_for(game_id), name, game_id, *args, **kwargs)
+        return forward
+
+
+    def _take_connection(self, shard):
+        with self.lock:
+            if self.idle[shard]:
+                return self.idle[shard].pop()
+        return Client(self.addresses[shard], authkey=self.authkey)
+
+
+    def _release_connection(self, shard, connection):
+        with self.lock:
+            self.idle[shard].append(connection)
+
+
+    def _unwrap(self, result):
+        if result[0] == 'error':
+            exception_class, message, status_code, payload = result[1:]
+            raise exception_class(message, status_code, payload)
+        if result[0] == 'crash':
+            raise RuntimeError("Shard worker failed:\n{}".format(result[1]))
+        return result[1]
+
+
+def _run_worker(shard, addresses, authkey, data_dir, ready):
+    """Entry point of a worker process"""
+    GameManager.next_game_id = shard + 1
+    GameManager.game_id_step = len(addresses)
+    import game_service
+    if data_dir is not None:
+        persistence = GamePersistence(os.path.join(data_dir, 'shard{}'.format(shard)), snapshot_interval=300)
+        persistence.recover(game_service.game_manager)
+        persistence.attach(game_service.game_manager)
+
+    listener = Listener(addresses[shard], authkey=authkey)
+    ready.set()
+    while True:
+        connection = listener.accept()
+        thread = threading.Thread(target=_serve_connection, args=(game_service, connection))
+        thread.daemon = True
+        thread.start()
+
+
+def _serve_connection(service, connection):
+    while True:
+        try:
+            name, args, kwargs = connection.recv()
+        except EOFError:
+            return
+        try:
+            if name.startswith('_'):
+                raise AttributeError(name)
+            result = ('ok', getattr(service, name)(*args, **kwargs))
+        except ApiException as e:
+            # ApiExceptions can't be pickled as they are, send what's needed to rebuild them
+            result = ('error', e.__class__, e.message, e.status_code, e.payload)
+        except Exception:
+            result = ('crash', traceback.format_exc())
+        connection.send(result)
@@ -0,0 +1,111 @@
+class TimingWheel:
+    """Hierarchical timing wheel: timers are scheduled, rescheduled and cancelled in O(1),
+    and advancing by one tick only looks at the timers due around that tick,
+    however many timers are pending.
+
+    Level 0 has one slot per tick, level l one slot per SLOTS ** l ticks. A timer goes in the
+    lowest level whose span covers its delay, and moves down a level whenever the level above
+    reaches its slot, until it expires from level 0.
+
+    Not thread safe, callers serialize access.
+    """
+
+    # Slots per level, a power of 2
+    SLOTS = 256
+    BITS = 8
+    # 4 levels of 256 slots cover 2 ** 32 ticks, over 49 days with 1 ms ticks.
+    # Timers further away wait in the top level until they come within range.
+    LEVELS = 4
+
+    def __init__(self, tick, start):
+        """Arguments
+        tick -- seconds per tick, the resolution of the wheel
+        start -- time the wheel starts at, in seconds
+        """
+        self.tick = tick
+        # Last tick processed
+        self.now = int(start / tick)
+        # wheels[level][slot] is a dict of key -> (expiry tick, value)
+        self.wheels = [[{} for slot in xrange(self.SLOTS)] for level in xrange(self.LEVELS)]
+        # Key of every pending timer -> the slot dict holding it
+        self.timers = {}
+
+
+    def __len__(self):
+        return len(self.timers)
+
+
+    def __contains__(self, key):
+        return key in self.timers
+
+
+    def schedule(self, key, deadline, value=None):
+        """Arms the timer of key to expire at deadline, replacing any pending timer of key
+
+        Arguments
+        key -- hashable name of the timer
+        deadline -- time in seconds, on the same clock as start
+        value -- optional object returned with key when the timer expires
+        """
+        self.cancel(key)
+        # Rounded up, so timers never expire before their deadline
+        expiry = -int(-deadline // self.tick)
+        self._insert(key, max(expiry, self.now + 1), value)
+
+
+    def cancel(self, key):
+        """Removes the pending timer of key, if any"""
+        slot = self.timers.pop(key, None)
+        if slot is not None:
+            del slot[key]
+
+
+    def advance(self, now):
+        """Processes every tick up to time now and returns the (key, value) of the expired timers,
+        in expiry order
+        """
+        target = int(now / self.tick)
+        expired = []
+        mask = self.SLOTS - 1
+        level0 = self.wheels[0]
+        while self.now < target:
+            if not self.timers:
+                # Nothing can expire or cascade, skip the idle ticks
+                self.now = target
+                break
+            self.now += 1
+            tick = self.now
+            if not tick & mask:
+                self._cascade(tick)
+            slot = level0[tick & mask]
+            if slot:
+                level0[tick & mask] = {}
+                for key, (expiry, value) in slot.iteritems():
+                    del self.timers[key]
+                    expired.append((key, value))
+        return expired
+
+
+    def _insert(self, key, expiry, value):
+        delay = expiry - self.now
+        level = 0
+        while delay >> (self.BITS * (level + 1)) and level < self.LEVELS - 1:
+            level += 1
+        slot = self.wheels[level][(expiry >> (self.BITS * level)) & (self.SLOTS - 1)]
+        slot[key] = (expiry, value)
+        self.timers[key] = slot
+
+
+    def _cascade(self, tick):
+        """Moves the timers of every level that reached a new slot at tick down a level"""
+        mask = self.SLOTS - 1
+        for level in xrange(1, self.LEVELS):
+            index = (tick >> (self.BITS * level)) & mask
+            slot = self.wheels[level][index]
+            if slot:
+                self.wheels[level][index] = {}
+                for key, (expiry, value) in slot.iteritems():
+                    self._insert(key, expiry, value)
+            # The next level only reaches a new slot when this one wraps around
+            if index:
+                break
@@ -0,0 +1,129 @@
+import threading
+import time
+from drop_token_game import DropTokenGame
+from game_state import GameState
+from timing_wheel import TimingWheel
+from exception import GameNotFoundException
+
+
+# Resolution of the turn deadlines, in seconds
+TICK = 0.001
+# Seconds between two looks for expired deadlines
+POLL_INTERVAL = 0.05
+
+
+class TurnClock:
+    """Makes players who don't move in time forfeit, as if they had quit.
+
+    Every in progress game with a turn timeout (its GameRules.turn_timeout, or the clock's default)
+    has a deadline on a TimingWheel, moved on by every move, quit or undo. When it passes,
+    the player whose turn it is gets removed from the game, so games whose players are gone
+    run out of players one turn at a time and end.
+
+    Once started, deadlines are looked for by a daemon thread, made with the first deadline
+    so that a process without turn timeouts runs no thread at all.
+    """
+
+    def __init__(self, turn_timeout=None, clock=time.time):
+        """Arguments
+        turn_timeout -- optional default number of seconds players have to move,
+                        for games without a turn timeout of their own
+        clock -- function returning the current time in seconds
+        """
+        self.turn_timeout = turn_timeout
+        self.clock = clock
+        self.wheel = TimingWheel(TICK, clock())
+        # Guards the wheel. Taken inside game locks, never the other way around.
+        self.lock = threading.Lock()
+        self.game_manager = None
+        # Set by start, the thread is made with the first deadline after it
+        self.started = False
+        self.thread = None
+        self.stopped = threading.Event()
+
+
+    def attach(self, game_manager):
+        """Gives a deadline to the in progress games of game_manager, from now on
+        and for every new or restored game
+        """
+        self.game_manager = game_manager
+        game_manager.add_game_listener(self._watch)
+        game_manager.add_restore_listener(self._watch_all)
+        self._watch_all(game_manager.get_all_games())
+
+
+    def start(self):
+        """Looks for expired deadlines every POLL_INTERVAL seconds from now on, in a daemon thread
+        started once there is a deadline
+        """
+        with self.lock:
+            self.started = True
+            if len(self.wheel) and self.thread is None:
+                self._start_thread()
+
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+
+
+    def expire(self):
+        """Makes the player to move forfeit in every game past its deadline.
+        Returns the list of (game id, player) that forfeited.
+        """
+        with self.lock:
+            expired = self.wheel.advance(self.clock())
+        forfeits = []
+        for game_id, version in expired:
+            with self.game_manager.lock_game(game_id):
+                try:
+                    game = self.game_manager.get_game(game_id)
+                except GameNotFoundException:
+                    continue
+                # A move landing after the deadline expired, but before the lock, made a new one
+                if not isinstance(game, DropTokenGame) or game.version != version \
+                        or game.get_game_state() != GameState.IN_PROGRESS:
+                    continue
+                player = game.get_players()[game.curr_player_idx]
+                game.remove_player(player)
+                forfeits.append((game_id, player))
+        return forfeits
+
+
+    def _watch_all(self, games):
+        for game in games:
+            # Finished games can be in progress again through an undo
+            if isinstance(game, DropTokenGame):
+                with self.game_manager.lock_game(game.get_game_id()):
+                    self._watch(game)
+
+
+    def _watch(self, game):
+        game.add_move_listener(self._on_change)
+        game.add_undo_listener(self._on_change)
+        self._on_change(game, None)
+
+
+    def _on_change(self, game, move):
+        """DropTokenGame move and undo listener, sets the deadline of the next turn"""
+        timeout = game.rules.turn_timeout or self.turn_timeout
+        with self.lock:
+            if timeout and game.get_game_state() == GameState.IN_PROGRESS:
+                self.wheel.schedule(game.get_game_id(), self.clock() + timeout, game.version)
+                if self.started and self.thread is None:
+                    self._start_thread()
+            else:
+                self.wheel.cancel(game.get_game_id())
+
+
+    def _start_thread(self):
+        """Must be called holding self.lock"""
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+
+    def _run(self):
+        while not self.stopped.wait(POLL_INTERVAL):
+            self.expire()
@@ -0,0 +1,89 @@
+import json
+import os
+import threading
+import time
+
+
+# Records buffered before they are written out together
+DEFAULT_BATCH_SIZE = 256
+# Max seconds a buffered record waits before being written out
+DEFAULT_FLUSH_INTERVAL = 0.05
+
+
+class WriteAheadLog:
+    """Append-only log file of game events, one JSON list per line.
+
+    Records are buffered and written with a single write (and fsync if enabled) per batch,
+    so many moves share the cost of one disk sync. A batch_size of 1 writes every record
+    on its own. A background thread writes out partial batches every flush_interval seconds.
+    """
+
+    def __init__(self, path, fsync=True, batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        """Arguments
+        path -- str path of the log file, appended to if it exists
+        fsync -- if True, every batch is synced to disk before the next one starts
+        batch_size -- int number of records written together
+        flush_interval -- optional max seconds a record stays buffered. If None, only full
+                          batches, commit and close write records out
+        """
+        self.path = path
+        self.fsync = fsync
+        self.batch_size = batch_size
+        self.buffer = []
+        self.lock = threading.Lock()
+        self.file = open(path, 'ab')
+        self.closed = False
+        if flush_interval is not None:
+            flusher = threading.Thread(target=self._flush_periodically, args=(flush_interval,))
+            flusher.daemon = True
+            flusher.start()
+
+
+    def append(self, record):
+        """Adds a record, a list of json serializable values"""
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        with self.lock:
+            self.buffer.append(line)
+            if len(self.buffer) >= self.batch_size:
+                self._write_buffer()
+
+
+    def commit(self):
+        """Writes out every buffered record"""
+        with self.lock:
+            self._write_buffer()
+
+
+    def close(self):
+        with self.lock:
+            self._write_buffer()
+            self.file.close()
+            self.closed = True
+
+
+    @staticmethod
+    def read(path):
+        """Yields every record of the log file at path.
+        A torn last line, left by a crash in the middle of a write, is ignored.
+        """
+        with open(path, 'rb') as log_file:
+            for line in log_file:
+                if not line.endswith('\n'):
+                    return
+                yield json.loads(line)
+
+
+    def _write_buffer(self):
+        if not self.buffer or self.closed:
+            return
+        self.file.write(''.join(self.buffer))
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
+        self.buffer = []
+
+
+    def _flush_periodically(self, flush_interval):
+        while not self.closed:
+            time.sleep(flush_interval)
+            self.commit()
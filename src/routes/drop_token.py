@@ -1,10 +1,21 @@
-from flask import jsonify, Blueprint, request
+from flask import jsonify, Blueprint, Response, request
 from ..lib import game_service as service
+from ..lib import json_encoder
+from ..lib.game_state import GameState
 from ..lib.exception import MalformedRequestException
 
 
 drop_token_bp = Blueprint('drop_token', __name__, url_prefix='/drop_token')
 
+# Number of games or moves fetched at a time when streaming
+STREAM_CHUNK = 1000
+
+
+def set_service(new_service):
+    """Makes the routes call new_service, e.g. a ShardRouter, instead of game_service"""
+    global service
+    service = new_service
+
 
 # Ideally we're using a library to help parse out parameters.
 # Also one that makes it easy to document the apis (like Swagger)
@@ -13,7 +24,77 @@ drop_token_bp = Blueprint('drop_token', __name__, url_prefix='/drop_token')
 
 @drop_token_bp.route('', methods=['GET'])
 def get_all_in_progress_games():
-    return jsonify(service.get_all_in_progress_games())
+    data = request.args.to_dict()
+
+    # Pagination: ?limit=N returns N games and a cursor, ?cursor=C gets the next page.
+    # ?stream=1 sends every game as a chunked response instead.
+    limit = _get_limit_param(data)
+    cursor = data.get('cursor')
+    if _get_bool_param('stream', data):
+        # The first chunk is fetched now, so a bad cursor is still a proper error response
+        page = service.get_all_in_progress_games(limit=STREAM_CHUNK, cursor=cursor)
+        return Response(_stream_games(page), mimetype='application/json')
+    return jsonify(service.get_all_in_progress_games(limit=limit, cursor=cursor))
+
+
+@drop_token_bp.route('/players/<player>/games', methods=['GET'])
+def get_player_games(player):
+    data = request.args.to_dict()
+
+    # ?state=IN_PROGRESS or DONE, as seen by the player: games they quit are done for them.
+    # Paginated like the list of games.
+    state = data.get('state')
+    if state is not None:
+        if state not in GameState.__members__:
+            raise MalformedRequestException("'state' should be one of {}.".format(', '.join(GameState.__members__)))
+        state = GameState[state]
+    return jsonify(service.get_player_games(player, state, limit=_get_limit_param(data), cursor=data.get('cursor')))
+
+
+@drop_token_bp.route('/players/<player>/stats', methods=['GET'])
+def get_player_stats(player):
+    return jsonify(service.get_player_stats(player))
+
+
+@drop_token_bp.route('/leaderboard', methods=['GET'])
+def get_leaderboard():
+    data = request.args.to_dict()
+
+    k = _get_int_param('k', data, required=False)
+    if k is None:
+        return jsonify(service.get_leaderboard())
+    if k < 1:
+        raise MalformedRequestException("'k' should be 1 or more.")
+    return jsonify(service.get_leaderboard(k))
+
+
+@drop_token_bp.route('/matchmaking', methods=['POST'])
+def join_matchmaking():
+    """Queues a player for a game with another player.
+    Body: {"player": ..., "columns": ..., "rows": ..., "rating": optional int}
+    """
+    data = request.get_json(force=True)
+
+    if 'player' not in data:
+        raise MalformedRequestException("'player' is required.")
+    columns = _get_int_param('columns', data)
+    rows = _get_int_param('rows', data)
+    rating = _get_int_param('rating', data, required=False)
+    return jsonify(service.join_matchmaking(data['player'], columns, rows, rating))
+
+
+@drop_token_bp.route('/matchmaking/<player>', methods=['GET'])
+def get_match(player):
+    data = request.args.to_dict()
+
+    # Long poll: ?wait=S blocks up to S seconds until the player has a game
+    wait = _get_int_param('wait', data, required=False) or 0
+    return jsonify(service.get_match(player, wait))
+
+
+@drop_token_bp.route('/matchmaking/<player>', methods=['DELETE'])
+def leave_matchmaking(player):
+    return jsonify(service.leave_matchmaking(player))
 
 
 @drop_token_bp.route('', methods=['POST'])
@@ -23,21 +104,81 @@ def create_new_game():
     players = _get_list_param('players', data)
     columns = _get_int_param('columns', data)
     rows = _get_int_param('rows', data)
-    return jsonify(service.create_new_game(players, columns, rows))
+    # Optional rule variants, see GameRules
+    rules = {}
+    if 'winLength' in data:
+        rules['win_length'] = _get_int_param('winLength', data)
+    if 'wraparound' in data:
+        rules['wraparound'] = _get_json_bool_param('wraparound', data)
+    if 'popOut' in data:
+        rules['pop_out'] = _get_json_bool_param('popOut', data)
+    if 'turnTimeout' in data:
+        # Seconds each player has to move before forfeiting their place in the game
+        rules['turn_timeout'] = _get_int_param('turnTimeout', data)
+    return jsonify(service.create_new_game(players, columns, rows, **rules))
+
+
+@drop_token_bp.route('/moves', methods=['POST'])
+def make_moves():
+    """Plays a batch of moves, in order, across any number of games.
+    Body: {"moves": [{"gameId": ..., "player": ..., "column": ...}, ...], "stopOnFailure": false}
+    """
+    data = request.get_json(force=True)
+
+    moves = []
+    for item in _get_list_param('moves', data):
+        if type(item) != dict or 'gameId' not in item or 'player' not in item:
+            raise MalformedRequestException("Each move needs a 'gameId', 'player' and 'column'.")
+        moves.append((item['gameId'], item['player'], _get_int_param('column', item)))
+    stop_on_failure = _get_json_bool_param('stopOnFailure', data)
+    return jsonify(service.make_moves(moves, stop_on_failure=stop_on_failure))
 
 
 @drop_token_bp.route('/<game_id>', methods=['GET'])
 def get_game_state(game_id):
-    return jsonify(service.get_game_state(game_id))
+    return _json_response(service.get_game_state(game_id))
+
+
+@drop_token_bp.route('/<game_id>/board', methods=['GET'])
+def get_game_board(game_id):
+    data = request.args.to_dict()
+
+    # Delta mode: ?since=V returns only the cells changed after version V,
+    # or the whole board if the server doesn't know them
+    since = _get_int_param('since', data, required=False)
+    if since is not None and since < 0:
+        raise MalformedRequestException("'since' should be 0 or more.")
+    version, body = service.get_game_board(game_id, since)
+    response = _json_response(body)
+    # A delta only holds the changes after since, so it can't share the ETag of the whole board
+    response.set_etag(str(version) if since is None else '{}-{}'.format(since, version))
+    return response.make_conditional(request)
 
 
 @drop_token_bp.route('/<game_id>/moves', methods=['GET'])
 def get_game_moves(game_id):
     data = request.args.to_dict()
 
+    # Long poll: ?after=N&wait=S returns the moves after move N,
+    # blocking up to S seconds until there is at least one
+    after = _get_int_param('after', data, required=False)
+    if after is not None:
+        if after < -1:
+            raise MalformedRequestException("'after' should be -1 or more.")
+        wait = _get_int_param('wait', data, required=False) or 0
+        return _json_response(service.wait_for_game_moves(game_id, after, wait))
+
+    # Pagination: ?limit=N returns N moves and a cursor, ?cursor=C gets the next page.
+    # ?stream=1 sends every move from start to until as a chunked response instead.
     start = _get_int_param('start', data, required=False)
     until = _get_int_param('until', data, required=False)
-    return jsonify(service.get_game_moves(game_id, start=start, end=until))
+    limit = _get_limit_param(data)
+    if _get_bool_param('stream', data):
+        # Checks the range now, so a bad one is still a proper error response
+        service.get_game_moves(game_id, start=start, end=until, limit=1)
+        return Response(_stream_moves(game_id, start or 0, until), mimetype='application/json')
+    return _json_response(service.get_game_moves(game_id, start=start, end=until, limit=limit,
+                                                 cursor=data.get('cursor')))
 
 
 @drop_token_bp.route('/<game_id>/<player>', methods=['POST'])
@@ -45,20 +186,73 @@ def make_move(game_id, player):
     data = request.get_json(force=True)
 
     column = _get_int_param('column', data)
+    # {"type": "POP"} pops the player's token out of the bottom of the column, in pop out games
+    if data.get('type', 'MOVE') == 'POP':
+        return jsonify(service.pop_token(game_id, player, column))
     return jsonify(service.make_move(game_id, player, column))
 
 
+@drop_token_bp.route('/<game_id>/<player>/auto', methods=['POST'])
+def make_auto_move(game_id, player):
+    """Lets the AI play for player. Optional body: {"timeBudget": milliseconds}"""
+    data = request.get_json(force=True, silent=True) or {}
+
+    time_budget = _get_int_param('timeBudget', data, required=False)
+    if time_budget is None:
+        return jsonify(service.make_auto_move(game_id, player))
+    return jsonify(service.make_auto_move(game_id, player, time_budget=time_budget / 1000.0))
+
+
 @drop_token_bp.route('/<game_id>/moves/<int:move_number>', methods=['GET'])
 def get_move(game_id, move_number):
     return jsonify(service.get_move(game_id, move_number))
 
 
+@drop_token_bp.route('/<game_id>/moves/<int:move_number>', methods=['DELETE'])
+def rewind_game(game_id, move_number):
+    return jsonify(service.rewind_game(game_id, move_number))
+
+
 @drop_token_bp.route('/<game_id>/<player>', methods=['DELETE'])
 def player_quits(game_id, player):
     return jsonify(service.player_quits(game_id, player))
 
 
 
+def _stream_games(page):
+    """Yields the JSON of {"games": [...]} page by page, starting with page"""
+    yield '{"games":['
+    separator = ''
+    while True:
+        if page['games']:
+            yield separator + ','.join(json_encoder.dumps(game_id) for game_id in page['games'])
+            separator = ','
+        if 'cursor' not in page:
+            break
+        page = service.get_all_in_progress_games(limit=STREAM_CHUNK, cursor=page['cursor'])
+    yield ']}'
+
+
+def _stream_moves(game_id, start, until):
+    """Yields the JSON of {"moves": [...]} for moves start to until, STREAM_CHUNK moves at a time"""
+    yield '{"moves":['
+    position = start
+    while until is None or position <= until:
+        limit = STREAM_CHUNK if until is None else min(STREAM_CHUNK, until - position + 1)
+        fragments = service.get_move_fragments(game_id, position, limit)
+        if fragments:
+            yield (',' if position > start else '') + ','.join(fragments)
+        position += len(fragments)
+        if len(fragments) < limit:
+            break
+    yield ']}'
+
+
+def _json_response(body):
+    """Wraps an already encoded JSON body, see json_encoder"""
+    return Response(body, mimetype='application/json')
+
+
 def _get_int_param(name, data, required=True):
     if name not in data:
         if required:
@@ -73,6 +267,27 @@ def _get_int_param(name, data, required=True):
         raise MalformedRequestException("'{}' should be a valid int.".format(name))
     return value
 
+def _get_limit_param(data):
+    limit = _get_int_param('limit', data, required=False)
+    if limit is not None and limit < 1:
+        raise MalformedRequestException("'limit' should be 1 or more.")
+    return limit
+
+
+def _get_bool_param(name, data):
+    return data.get(name, '').lower() in ('1', 'true')
+
+
+def _get_json_bool_param(name, data, default=False):
+    """Returns the boolean name of a JSON body, only true and false are booleans"""
+    if name not in data:
+        return default
+
+    if type(data[name]) != bool:
+        raise MalformedRequestException("'{}' should be true or false.".format(name))
+    return data[name]
+
+
 def _get_list_param(name, data, required=True):
     if name not in data:
         if required:
@@ -0,0 +1,30 @@
+from flask import Blueprint, Response, g, request
+from ..lib import metrics
+from . import drop_token
+
+
+metrics_bp = Blueprint('metrics', __name__)
+
+REQUEST_SECONDS = metrics.REGISTRY.histogram('drop_token_request_seconds', "Latency of API requests.",
+                                             ('route', 'method', 'status'))
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Every metric of the service, in the Prometheus text format"""
+    return Response(metrics.render(drop_token.service.get_metrics()), mimetype='text/plain; version=0.0.4')
+
+
+@metrics_bp.before_app_request
+def _start_timer():
+    g.request_start = metrics.clock()
+
+
+@metrics_bp.after_app_request
+def _record_latency(response):
+    # Streamed responses are timed until their first chunk is ready, not until they are sent
+    start = g.get('request_start')
+    if start is not None:
+        REQUEST_SECONDS.labels(request.endpoint or 'unknown', request.method,
+                               response.status_code).observe(metrics.clock() - start)
+    return response
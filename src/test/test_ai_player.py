@@ -0,0 +1,83 @@
+import time
+import unittest
+from ..lib import ai_player
+from ..lib.ai_player import AiPlayer, SearchBoard
+from ..lib.drop_token_game import DropTokenGame
+from ..lib.exception import MalformedRequestException
+
+class TestAiPlayer(unittest.TestCase):
+
+    def setUp(self):
+        self.players = ['red', 'blue']
+
+
+    def play(self, game, columns):
+        for col in columns:
+            game.play_token(game.get_players()[game.curr_player_idx], col)
+
+
+    def test_takes_win(self):
+        game = DropTokenGame(7, 6, self.players, 1)
+        self.play(game, [0, 6, 0, 6, 0, 5])
+        self.assertEquals(0, AiPlayer().choose_column(game, 1))
+
+
+    def test_blocks_win(self):
+        game = DropTokenGame(7, 6, self.players, 1)
+        self.play(game, [0, 6, 1, 6, 2])
+        self.assertEquals(3, AiPlayer().choose_column(game, 1))
+
+
+    def test_three_players(self):
+        game = DropTokenGame(5, 5, ['red', 'blue', 'green'], 1)
+        self.play(game, [0, 4, 4, 0, 4, 4, 0, 4])
+        game.remove_player('green')
+        # Green's tokens stay on the board but count for nobody
+        self.assertEquals(0, AiPlayer().choose_column(game, 1))
+
+
+    def test_undo_restores_board(self):
+        board = SearchBoard(4, 4, 2)
+        board.play(0, 1)
+        masks, heights, key = list(board.masks), list(board.heights), board.hash
+        board.play(1, 1)
+        board.play(0, 2)
+        board.undo(0, 2)
+        board.undo(1, 1)
+        self.assertEquals(masks, board.masks)
+        self.assertEquals(heights, board.heights)
+        self.assertEquals(key, board.hash)
+
+
+    def test_large_board_within_budget(self):
+        game = DropTokenGame(64, 64, self.players, 1)
+        self.play(game, [31, 32, 31, 33])
+        start = time.time()
+        AiPlayer().choose_column(game, 0.1)
+        self.assertTrue(time.time() - start < 0.2)
+        self.assertRaises(MalformedRequestException, SearchBoard.from_game, DropTokenGame(65, 64, self.players, 1))
+
+
+    def test_incremental_score(self):
+        test = self
+        class CheckedAiPlayer(AiPlayer):
+            def _evaluate(self, mover):
+                board = self.board
+                test.assertEquals(self._score_lines([window for window in board.windows() if not window & board.neutral]),
+                                  self.score)
+                return AiPlayer._evaluate(self, mover)
+        ai = CheckedAiPlayer()
+        # The neutral token is from a player who quit
+        board = SearchBoard.from_moves(5, 5, 2, 4, [(0, 2), (1, 2), (-1, 1), (0, 3), (1, 1)])
+        ai.choose_board_column(board, 0, 2, 10, max_depth=3)
+        self.assertEquals(3, ai.depth)
+
+
+    def test_zobrist_keys_bounded(self):
+        for size in xrange(4, 4 + ai_player.MAX_GEOMETRIES + 8):
+            SearchBoard(size, 4, 2)
+        self.assertEquals(ai_player.MAX_GEOMETRIES, len(ai_player._zobrist_keys))
+
+
+if __name__ == '__main__':
+    unittest.main()
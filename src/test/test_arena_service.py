@@ -0,0 +1,79 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from ..lib.arena_service import ArenaService
+from ..lib.game_arena import GameArena
+from ..lib.exception import UnsupportedOperationException
+
+class TestArenaService(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.arena = GameArena(os.path.join(self.dir, 'arena'), slots=8)
+        self.service = ArenaService(self.arena)
+        self.first = self.service.create_new_game(['red', 'blue'], 4, 4)['gameId']
+        self.second = self.service.create_new_game(['red', 'blue'], 4, 4)['gameId']
+
+
+    def tearDown(self):
+        self.arena.close()
+        shutil.rmtree(self.dir)
+
+
+    def test_make_moves(self):
+        output = self.service.make_moves([(self.first, 'red', 0), (self.second, 'blue', 0), (self.first, 'blue', 0),
+                                          ('nogame', 'red', 0)])
+        self.assertEquals({'move': '{}/moves/0'.format(self.first)}, output['moves'][0])
+        self.assertEquals(409, output['moves'][1]['status'])
+        self.assertEquals({'move': '{}/moves/1'.format(self.first)}, output['moves'][2])
+        self.assertEquals(404, output['moves'][3]['status'])
+
+
+    def test_make_moves_stop_on_failure(self):
+        moves = [(self.first, 'blue', 0), (self.second, 'red', 0), (self.first, 'red', 0)]
+        output = self.service.make_moves(moves, stop_on_failure=True)
+        self.assertEquals(409, output['moves'][0]['status'])
+        self.assertEquals({'move': '{}/moves/0'.format(self.second)}, output['moves'][1])
+        self.assertEquals(424, output['moves'][2]['status'])
+        self.assertEquals(0, self.arena.get_game(self.first)[4])
+
+
+    def test_wait_for_game_moves(self):
+        self.assertEquals({'moves': []}, json.loads(self.service.wait_for_game_moves(self.first, -1, 0)))
+        timer = threading.Timer(0.05, self.service.make_move, (self.first, 'red', 2))
+        timer.start()
+        try:
+            moves = json.loads(self.service.wait_for_game_moves(self.first, -1, 5))['moves']
+        finally:
+            timer.join()
+        self.assertEquals([{'type': 'MOVE', 'player': 'red', 'column': 2}], moves)
+
+
+    def test_pagination(self):
+        third = self.service.create_new_game(['red', 'blue'], 4, 4)['gameId']
+        page = self.service.get_all_in_progress_games(limit=2)
+        self.assertEquals([self.first, self.second], page['games'])
+        page = self.service.get_all_in_progress_games(limit=2, cursor=page['cursor'])
+        self.assertEquals({'games': [third]}, page)
+
+        for player, column in [('red', 0), ('blue', 1), ('red', 2)]:
+            self.service.make_move(self.first, player, column)
+        page = json.loads(self.service.get_game_moves(self.first, limit=2))
+        self.assertEquals([0, 1], [move['column'] for move in page['moves']])
+        page = json.loads(self.service.get_game_moves(self.first, limit=2, cursor=page['cursor']))
+        self.assertEquals([2], [move['column'] for move in page['moves']])
+        self.assertFalse('cursor' in page)
+
+
+    def test_unsupported(self):
+        with self.assertRaises(UnsupportedOperationException) as context:
+            self.service.undo_last_move(self.first)
+        self.assertEquals(501, context.exception.status_code)
+        self.assertRaises(AttributeError, getattr, self.service, '_lock')
+
+
+if __name__ == '__main__':
+    unittest.main()
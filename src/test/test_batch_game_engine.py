@@ -0,0 +1,69 @@
+import unittest
+from ..lib.game_state import GameState
+from ..lib.drop_token_game import DropTokenGame
+
+try:
+    import numpy as np
+    from ..lib.batch_game_engine import BatchGameEngine
+except ImportError:
+    np = None
+
+@unittest.skipIf(np is None, "numpy not installed")
+class TestBatchGameEngine(unittest.TestCase):
+
+    def test_vertical_win(self):
+        engine = BatchGameEngine(2, 4, 4)
+        for columns in ([0, 1], [1, 2], [0, 1], [1, 2], [0, 3], [1, 3]):
+            engine.step(columns)
+            self.assertFalse(engine.done.any())
+        engine.step([0, 3])
+        self.assertEquals([True, False], list(engine.done))
+        self.assertEquals(0, engine.winner[0])
+
+
+    def test_invalid_moves_keep_turn(self):
+        engine = BatchGameEngine(3, 2, 1)
+        played = engine.step([0, 2, -1])
+        self.assertEquals([True, False, False], list(played))
+        self.assertEquals([1, 0, 0], list(engine.curr_player_idx))
+        played = engine.step([0, 1, 1])
+        self.assertEquals([False, True, True], list(played))
+
+
+    def test_draw(self):
+        engine = BatchGameEngine(1, 2, 2)
+        for column in (0, 1, 1, 0):
+            engine.step([column])
+        self.assertTrue(engine.done[0])
+        self.assertEquals(-1, engine.winner[0])
+
+
+    def test_matches_drop_token_game(self):
+        players = ['red', 'blue', 'green']
+        for width, height in ((4, 4), (7, 6), (3, 8)):
+            engine = BatchGameEngine(300, width, height, len(players))
+            engine.play_random(seed=width)
+            for i in xrange(300):
+                game = engine.export_game(i, players, i)
+                self.assertEquals(GameState.DONE, game.get_game_state())
+                winner = players[engine.winner[i]] if engine.winner[i] >= 0 else None
+                self.assertEquals(winner, game.get_winner())
+                self.assertEquals(engine.move_counts[i], len(game.moves_log))
+
+
+    def test_export_win_length(self):
+        players = ['red', 'blue']
+        for matches in (3, 5):
+            engine = BatchGameEngine(100, 7, 6, len(players), matches)
+            engine.play_random(seed=matches)
+            for i in xrange(100):
+                game = engine.export_game(i, players, i)
+                self.assertEquals(matches, game.rules.win_length)
+                self.assertEquals(GameState.DONE, game.get_game_state())
+                winner = players[engine.winner[i]] if engine.winner[i] >= 0 else None
+                self.assertEquals(winner, game.get_winner())
+
+
+
+if __name__ == '__main__':
+    unittest.main()
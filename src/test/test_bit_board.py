@@ -0,0 +1,109 @@
+import random
+import unittest
+from ..lib.board import Board
+from ..lib.bit_board import BitBoard
+from ..lib.game_state import GameState
+from ..lib.drop_token_game import DropTokenGame
+from ..lib.game_rules import GameRules
+from ..lib.exception import *
+
+class TestBitBoard(unittest.TestCase):
+
+    def setUp(self):
+        self.players = ['red', 'blue', 'green']
+
+
+    def test_get_token(self):
+        board = BitBoard(3, 3)
+        board.add_token('red', 1)
+        board.add_token('blue', 1)
+        self.assertEquals('red', board.get_token(1, 0).get_player())
+        self.assertEquals('blue', board.get_token(1, 1).get_player())
+        self.assertEquals(None, board.get_token(1, 2))
+        self.assertEquals(None, board.get_token(3, 0))
+
+
+    def test_invalid_move(self):
+        board = BitBoard(2, 1)
+        board.add_token('red', 0)
+        with self.assertRaises(InvalidMoveException):
+            board.add_token('blue', 0)
+        with self.assertRaises(InvalidMoveException):
+            board.add_token('blue', 2)
+
+
+    def test_is_full(self):
+        board = BitBoard(2, 1)
+        board.add_token('red', 0)
+        self.assertFalse(board.is_full())
+        board.add_token('blue', 1)
+        self.assertTrue(board.is_full())
+
+
+    def test_no_wrap_between_columns(self):
+        # red fills the top of column 0 and the bottom of column 1, which are
+        # adjacent bits but not a vertical line
+        board = BitBoard(2, 4)
+        for player in ['blue', 'red', 'red', 'red']:
+            board.add_token(player, 0)
+        token = board.add_token('red', 1)
+        self.assertFalse(board.is_winning_token(token, 4))
+
+
+    def test_play_game_win_diagonal(self):
+        game = DropTokenGame(4, 4, self.players[:2], 1, BitBoard)
+        for col in [0, 1, 1, 2, 2, 3, 2, 3, 3, 0]:
+            game.play_token(game.get_players()[game.curr_player_idx], col)
+        self.assertEquals(GameState.IN_PROGRESS, game.get_game_state())
+        game.play_token('red', 3)
+        self.assertEquals(GameState.DONE, game.get_game_state())
+        self.assertEquals('red', game.get_winner())
+
+
+    def test_matches_board(self):
+        rand = random.Random(7)
+        for i in xrange(200):
+            width = rand.randint(1, 9)
+            height = rand.randint(1, 9)
+            games = [DropTokenGame(width, height, list(self.players), i, board_class)
+                     for board_class in (Board, BitBoard)]
+            while games[0].get_game_state() == GameState.IN_PROGRESS:
+                player = games[0].get_players()[games[0].curr_player_idx]
+                col = rand.randrange(width)
+                try:
+                    games[0].play_token(player, col)
+                except InvalidMoveException:
+                    with self.assertRaises(InvalidMoveException):
+                        games[1].play_token(player, col)
+                    continue
+                games[1].play_token(player, col)
+                self.assertEquals(games[0].get_game_state(), games[1].get_game_state())
+                self.assertEquals(games[0].get_winner(), games[1].get_winner())
+
+
+    def test_matches_board_with_rules(self):
+        rand = random.Random(11)
+        for i in xrange(300):
+            width = rand.randint(1, 9)
+            height = rand.randint(1, 9)
+            rules = GameRules(rand.randint(1, max(width, height)), rand.random() < 0.5, rand.random() < 0.5)
+            games = [DropTokenGame(width, height, list(self.players), i, board_class, rules)
+                     for board_class in (Board, BitBoard)]
+            while games[0].get_game_state() == GameState.IN_PROGRESS and len(games[0].moves_log) < 100:
+                player = games[0].get_players()[games[0].curr_player_idx]
+                col = rand.randrange(width)
+                play = 'pop_token' if rules.pop_out and rand.random() < 0.3 else 'play_token'
+                try:
+                    getattr(games[0], play)(player, col)
+                except InvalidMoveException:
+                    with self.assertRaises(InvalidMoveException):
+                        getattr(games[1], play)(player, col)
+                    continue
+                getattr(games[1], play)(player, col)
+                self.assertEquals(games[0].get_game_state(), games[1].get_game_state())
+                self.assertEquals(games[0].get_winner(), games[1].get_winner())
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import json
+import unittest
+from ..lib.archived_game import ArchivedGame
+from ..lib.drop_token_game import DropTokenGame
+
+class TestBoardView(unittest.TestCase):
+
+    def setUp(self):
+        self.game = DropTokenGame(3, 3, ['red', 'blue', 'green'], 1)
+        self.game.play_token('red', 0)
+
+
+    def test_render(self):
+        view = self.game.get_board_view()
+        self.game.play_token('blue', 0)
+        version, body = view.render(self.game.get_game_state())
+        self.assertEquals(2, version)
+        board = json.loads(body)['board']
+        self.assertEquals(['red', None, None], board[0])
+        self.assertEquals(['blue', None, None], board[1])
+        self.assertTrue(view.render(self.game.get_game_state())[1] is body)
+
+
+    def test_changes_since(self):
+        view = self.game.get_board_view()
+        self.game.play_token('blue', 1)
+        self.game.remove_player('green')
+        self.game.undo_last_move()
+        self.game.undo_last_move()
+        self.game.play_token('blue', 2)
+        self.assertEquals((6, [(1, 0, None), (2, 0, 'blue')]), view.changes_since(1))
+        self.assertEquals((6, []), view.changes_since(6))
+        # Changes before the view was built aren't known
+        self.assertEquals(None, view.changes_since(0))
+        self.assertEquals(None, view.changes_since(7))
+
+
+    def test_archived_game(self):
+        self.game.remove_player('blue')
+        self.game.remove_player('green')
+        archived = ArchivedGame.from_game(self.game)
+        version, body = archived.get_board_view().render(archived.get_game_state())
+        self.assertEquals(3, version)
+        self.assertEquals('DONE', json.loads(body)['state'])
+        self.assertEquals('red', json.loads(body)['board'][0][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,10 @@
 import unittest
 from ..lib.game_state import GameState
+from ..lib.move_type import MoveType
 from ..lib.drop_token_game import DropTokenGame
+from ..lib.board import Board
+from ..lib.bit_board import BitBoard
+from ..lib.game_rules import GameRules
 from ..lib.exception import *
 
 class TestDropTokenGame(unittest.TestCase):
@@ -142,6 +146,146 @@ class TestDropTokenGame(unittest.TestCase):
         with self.assertRaises(MovesNotFoundException):
             moves = game.get_all_moves_taken(start=-1, end=1)
 
+
+    def test_get_all_moves_taken_single_move(self):
+        game = DropTokenGame(2, 2, self.players, 1)
+        game.play_token(self.players[0], 1)
+        moves = game.get_all_moves_taken()
+        self.assertEquals(1, len(moves))
+        self.assertEquals(1, moves[0].get_token().get_column())
+
+
+    def test_iter_moves_taken_with_quit(self):
+        game = DropTokenGame(3, 3, ['red', 'blue', 'green'], 1)
+        game.play_token('red', 2)
+        game.play_token('blue', 2)
+        game.remove_player('green')
+        moves = list(game.iter_moves_taken(start=1))
+        self.assertEquals(2, len(moves))
+        self.assertEquals(1, moves[0].get_move_number())
+        self.assertEquals(1, moves[0].get_token().get_row())
+        self.assertEquals(MoveType.QUIT, moves[1].get_type())
+        self.assertEquals('green', moves[1].get_player())
+        self.assertEquals(None, moves[1].get_token())
+        with self.assertRaises(MovesNotFoundException):
+            game.iter_moves_taken(start=3)
+
+
+    def test_win_length(self):
+        for board_class in (Board, BitBoard):
+            game = DropTokenGame(6, 2, self.players, 1, board_class, GameRules(win_length=5))
+            for col in (0, 0, 1, 1, 2, 2, 3, 3):
+                game.play_token(game.get_players()[game.curr_player_idx], col)
+            self.assertEquals(GameState.IN_PROGRESS, game.get_game_state())
+            game.play_token('red', 4)
+            self.assertEquals('red', game.get_winner())
+
+
+    def test_wraparound(self):
+        for board_class in (Board, BitBoard):
+            games = [DropTokenGame(5, 2, self.players, 1, board_class, GameRules(wraparound=wraparound))
+                     for wraparound in (False, True)]
+            for game in games:
+                for col in (3, 3, 4, 4, 0, 0):
+                    game.play_token(game.get_players()[game.curr_player_idx], col)
+                game.play_token('red', 1)
+            self.assertEquals(None, games[0].get_winner())
+            self.assertEquals('red', games[1].get_winner())
+
+
+    def test_pop_out(self):
+        for board_class in (Board, BitBoard):
+            game = DropTokenGame(4, 4, self.players, 1, board_class, GameRules(pop_out=True))
+            for col in (0, 1, 0, 2, 0, 1):
+                game.play_token(game.get_players()[game.curr_player_idx], col)
+            with self.assertRaises(InvalidMoveException):
+                game.pop_token('red', 1)
+            move = game.pop_token('red', 0)
+            self.assertEquals(MoveType.POP, game.get_move(move.get_move_number()).get_type())
+            self.assertEquals(0, game.get_move(6).get_token().get_column())
+            self.assertEquals('red', game.get_board().get_token(0, 1).get_player())
+            self.assertEquals(None, game.get_board().get_token(0, 2))
+            game.undo_last_move()
+            self.assertEquals('red', game.get_board().get_token(0, 2).get_player())
+            self.assertEquals('red', game.players[game.curr_player_idx])
+
+
+    def test_pop_out_win_for_other_player(self):
+        game = DropTokenGame(4, 4, self.players, 1, Board, GameRules(pop_out=True))
+        # blue has 3 in a row on row 1, column 3 holds red, red, blue
+        for col in (0, 2, 1, 0, 3, 1, 3, 2, 0, 3):
+            game.play_token(game.get_players()[game.curr_player_idx], col)
+        self.assertEquals(GameState.IN_PROGRESS, game.get_game_state())
+        game.pop_token('red', 3)
+        self.assertEquals('blue', game.get_winner())
+
+
+    def test_pop_not_allowed(self):
+        game = DropTokenGame(4, 4, self.players, 1)
+        game.play_token('red', 0)
+        game.play_token('blue', 1)
+        with self.assertRaises(InvalidMoveException):
+            game.pop_token('red', 0)
+
+
+    def test_undo_move(self):
+        for board_class in (Board, BitBoard):
+            game = DropTokenGame(2, 2, self.players, 1, board_class)
+            game.play_token('red', 0)
+            game.play_token('blue', 0)
+            move = game.undo_last_move()
+            self.assertEquals('blue', move.get_player())
+            self.assertEquals(1, len(game.moves_log))
+            self.assertEquals(None, game.get_board().get_token(0, 1))
+            game.play_token('blue', 1)
+            self.assertEquals(0, game.get_move(1).get_token().get_row())
+            game.play_token('red', 0)
+            game.play_token('blue', 1)
+            self.assertEquals(GameState.DONE, game.get_game_state())
+            game.undo_last_move()
+            self.assertEquals(GameState.IN_PROGRESS, game.get_game_state())
+            game.play_token('blue', 1)
+
+
+    def test_undo_win(self):
+        game = DropTokenGame(4, 4, self.players, 1)
+        for col in (0, 1, 0, 1, 0, 1, 0):
+            game.play_token(game.get_players()[game.curr_player_idx], col)
+        self.assertEquals('red', game.get_winner())
+        game.undo_last_move()
+        self.assertEquals(None, game.get_winner())
+        self.assertEquals(GameState.IN_PROGRESS, game.get_game_state())
+        game.play_token('red', 2)
+        self.assertEquals(GameState.IN_PROGRESS, game.get_game_state())
+
+
+    def test_undo_quit(self):
+        game = DropTokenGame(3, 3, ['red', 'blue', 'green'], 1)
+        game.play_token('red', 0)
+        game.remove_player('blue')
+        game.remove_player('red')
+        self.assertEquals('green', game.get_winner())
+        game.undo_last_move()
+        game.undo_last_move()
+        self.assertEquals(['red', 'blue', 'green'], game.get_players())
+        self.assertEquals(GameState.IN_PROGRESS, game.get_game_state())
+        game.play_token('blue', 0)
+
+
+    def test_rewind(self):
+        game = DropTokenGame(3, 3, self.players, 1)
+        for col in (0, 1, 2, 0):
+            game.play_token(game.get_players()[game.curr_player_idx], col)
+        game.rewind(1)
+        self.assertEquals(1, len(game.moves_log))
+        self.assertEquals(None, game.get_board().get_token(1, 0))
+        game.play_token('blue', 1)
+        with self.assertRaises(MovesNotFoundException):
+            game.rewind(3)
+        game.rewind(0)
+        with self.assertRaises(MovesNotFoundException):
+            game.undo_last_move()
+
     
 
 if __name__ == '__main__':
@@ -0,0 +1,125 @@
+import os
+import shutil
+import tempfile
+import unittest
+from multiprocessing import Process
+from ..lib.game_arena import GameArena
+from ..lib.game_state import GameState
+from ..lib.move_type import MoveType
+from ..lib.exception import GameNotFoundException, NotYourTurnException, InvalidMoveException, \
+    PlayerNotFoundException, GameEndedException, MalformedRequestException, ArenaFullException
+
+
+def _play(path, game_id, player, col):
+    arena = GameArena(path)
+    arena.play_token(game_id, player, col)
+    arena.close()
+
+
+class TestGameArena(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'arena')
+        self.arena = GameArena(self.path, slots=4)
+
+
+    def tearDown(self):
+        self.arena.close()
+        shutil.rmtree(self.dir)
+
+
+    def test_win(self):
+        game_id = self.arena.new_game(['red', 'blue'], 4, 4)
+        for player, col in [('red', 0), ('blue', 1), ('red', 0), ('blue', 1), ('red', 0), ('blue', 3)]:
+            self.arena.play_token(game_id, player, col)
+        self.assertRaises(NotYourTurnException, self.arena.play_token, game_id, 'blue', 0)
+        self.assertRaises(InvalidMoveException, self.arena.play_token, game_id, 'red', 4)
+        self.assertEquals(6, self.arena.play_token(game_id, 'red', 0))
+        self.assertEquals((['red', 'blue'], GameState.DONE, 'red', 7, 7), self.arena.get_game(game_id))
+        self.assertEquals([(MoveType.MOVE, 'red', 0), (MoveType.MOVE, 'blue', 1)], self.arena.get_moves(game_id, 0, 1))
+        self.assertRaises(NotYourTurnException, self.arena.play_token, game_id, 'blue', 1)
+        version, game_state, grid = self.arena.get_board(game_id)
+        self.assertEquals(['red', 'blue', None, None], grid[1])
+        self.assertEquals(['red', None, None, None], grid[3])
+
+
+    def test_quit(self):
+        game_id = self.arena.new_game(['red', 'blue', 'green'], 4, 4)
+        self.arena.remove_player(game_id, 'red')
+        self.assertRaises(PlayerNotFoundException, self.arena.play_token, game_id, 'red', 0)
+        self.arena.play_token(game_id, 'blue', 0)
+        self.arena.remove_player(game_id, 'blue')
+        self.assertEquals((['green'], GameState.DONE, 'green', 3, 3), self.arena.get_game(game_id))
+        self.assertEquals((MoveType.QUIT, 'blue', None), self.arena.get_moves(game_id)[2])
+        self.assertRaises(GameEndedException, self.arena.remove_player, game_id, 'green')
+
+
+    def test_shared_between_processes(self):
+        game_id = self.arena.new_game(['red', 'blue'], 4, 4)
+        process = Process(target=_play, args=(self.path, game_id, 'red', 2))
+        process.start()
+        process.join()
+        self.assertEquals([(MoveType.MOVE, 'red', 2)], self.arena.get_moves(game_id))
+        other = GameArena(self.path)
+        self.assertEquals(self.arena.new_game(['red', 'blue'], 4, 4), other.get_in_progress_page()[1])
+        other.close()
+
+
+    def test_full_arena_recycles_finished_games(self):
+        game_ids = [self.arena.new_game(['red', 'blue'], 4, 4) for i in xrange(4)]
+        self.assertRaises(ArenaFullException, self.arena.new_game, ['red', 'blue'], 4, 4)
+        self.arena.remove_player(game_ids[2], 'red')
+        self.arena.remove_player(game_ids[1], 'red')
+        recycled = self.arena.new_game(['red', 'blue'], 4, 4)
+        self.assertRaises(GameNotFoundException, self.arena.get_game, game_ids[1])
+        self.assertEquals(['red', 'blue'], self.arena.get_game(recycled)[0])
+        self.assertEquals(GameState.DONE, self.arena.get_game(game_ids[2])[1])
+        self.assertEquals([game_ids[0], game_ids[3], recycled], self.arena.get_in_progress_page())
+        self.assertEquals([game_ids[3]], self.arena.get_in_progress_page(after=game_ids[0], limit=1))
+
+
+    def test_in_progress_pages(self):
+        game_ids = [self.arena.new_game(['red', 'blue'], 4, 4) for i in xrange(4)]
+        self.assertEquals(game_ids[1:3], self.arena.get_in_progress_page(after=game_ids[0], limit=2))
+        self.arena.remove_player(game_ids[1], 'red')
+        self.arena.remove_player(game_ids[3], 'blue')
+        # From a cursor that isn't in progress anymore
+        self.assertEquals([game_ids[2]], self.arena.get_in_progress_page(after=game_ids[1]))
+        recycled = self.arena.new_game(['red', 'blue'], 4, 4)
+        self.assertEquals([game_ids[2], recycled], self.arena.get_in_progress_page(after=game_ids[0]))
+        self.arena.remove_player(game_ids[0], 'red')
+        self.assertEquals([game_ids[2], recycled], self.arena.get_in_progress_page())
+        self.assertEquals([], self.arena.get_in_progress_page(after=recycled))
+        # Back past several finished games
+        newer = [self.arena.new_game(['red', 'blue'], 4, 4) for i in xrange(2)]
+        self.arena.remove_player(recycled, 'red')
+        self.arena.remove_player(newer[0], 'red')
+        self.assertEquals([newer[1]], self.arena.get_in_progress_page(after=newer[0]))
+
+
+    def test_player_names(self):
+        for players in [['red', 5], ['red', None], ['red', {'name': 'blue'}]]:
+            self.assertRaises(MalformedRequestException, self.arena.new_game, players, 4, 4)
+        self.assertRaises(MalformedRequestException, self.arena.new_game, ['red', 'b' * 33], 4, 4)
+        game_id = self.arena.new_game([u'r\xe9d', 'blue'], 4, 4)
+        self.assertEquals([u'r\xe9d', u'blue'], self.arena.get_game(game_id)[0])
+
+
+    def test_read_retries_torn_failures(self):
+        game_id = self.arena.new_game(['red', 'blue'], 4, 4)
+        calls = []
+        def read(offset):
+            calls.append(offset)
+            if len(calls) == 1:
+                # A move made by someone else while reading
+                self.arena.play_token(game_id, 'red', 0)
+                raise ValueError("torn read")
+            return len(calls)
+        self.assertEquals(2, self.arena.read(game_id, read))
+        def fail(offset):
+            raise ValueError("bad read")
+        self.assertRaises(ValueError, self.arena.read, game_id, fail)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,9 @@
+import threading
 import unittest
 from ..lib.game_manager import GameManager
+from ..lib.game_state import GameState
+from ..lib.archived_game import ArchivedGame
+from ..lib.retention_policy import RetentionPolicy
 from ..lib.exception import *
 
 class TestGameManager(unittest.TestCase):
@@ -25,6 +29,142 @@ class TestGameManager(unittest.TestCase):
         self.assertNotEquals(game1.get_game_id(), game2.get_game_id())
 
 
+    def test_different_game_ids_threaded(self):
+        game_ids = []
+        def create_games():
+            for i in xrange(500):
+                game_ids.append(self.game_manager.new_game(['red', 'blue'], 4, 4).get_game_id())
+        threads = [threading.Thread(target=create_games) for i in xrange(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEquals(4000, len(set(game_ids)))
+
+
+    def test_get_all_games_by_state(self):
+        game1 = self.game_manager.new_game(['red', 'blue'], 4, 4)
+        game2 = self.game_manager.new_game(['red', 'blue'], 4, 4)
+        self.assertEquals(set([game1.get_game_id(), game2.get_game_id()]),
+                          set(self.game_manager.get_all_games(game_state=GameState.IN_PROGRESS)))
+        game1.remove_player('red')
+        self.assertEquals([game2.get_game_id()], self.game_manager.get_all_games(game_state=GameState.IN_PROGRESS))
+        self.assertEquals([game1.get_game_id()], self.game_manager.get_all_games(game_state=GameState.DONE))
+
+
+    def test_get_in_progress_page(self):
+        games = [self.game_manager.new_game(['red', 'blue'], 4, 4) for i in xrange(12)]
+        game_ids = [game.get_game_id() for game in games]
+        games[1].remove_player('red')
+        self.assertEquals([game_ids[0], game_ids[2]], self.game_manager.get_in_progress_page(limit=2))
+        self.assertEquals(game_ids[3:6], self.game_manager.get_in_progress_page(game_ids[2], 3))
+        # Paging goes on after the last game returned, even if it has ended since
+        games[5].remove_player('red')
+        self.assertEquals(game_ids[6:], self.game_manager.get_in_progress_page(game_ids[5]))
+        games[1].undo_last_move()
+        self.assertEquals(game_ids[:3], self.game_manager.get_in_progress_page(limit=3))
+
+
+    def test_get_player_games(self):
+        manager = self.game_manager
+        games = [manager.new_game(players, 4, 4) for players in
+                 (['red', 'blue'], ['red', 'green', 'blue'], ['green', 'blue'], ['red', 'green'])]
+        game_ids = [game.get_game_id() for game in games]
+        self.assertEquals([game_ids[0], game_ids[1], game_ids[3]], manager.get_player_games('red'))
+        self.assertEquals([game_ids[1]], manager.get_player_games('red', after=game_ids[0], limit=1))
+        # Quitting a game still in progress makes it done for that player only
+        games[1].remove_player('red')
+        self.assertEquals([game_ids[0], game_ids[3]], manager.get_player_games('red', GameState.IN_PROGRESS))
+        self.assertEquals([game_ids[1]], manager.get_player_games('red', GameState.DONE))
+        self.assertEquals(game_ids[:3], manager.get_player_games('blue', GameState.IN_PROGRESS))
+        # Ending a game makes it done for everyone who joined
+        games[1].remove_player('green')
+        self.assertEquals([game_ids[0], game_ids[2]], manager.get_player_games('blue', GameState.IN_PROGRESS))
+        self.assertEquals(game_ids[1:2], manager.get_player_games('green', GameState.DONE))
+        games[1].undo_last_move()
+        games[1].undo_last_move()
+        self.assertEquals(game_ids[:2] + game_ids[3:], manager.get_player_games('red', GameState.IN_PROGRESS))
+        self.assertEquals([], manager.get_player_games('nobody'))
+
+
+
+    def test_evict_max_resident(self):
+        game_manager = GameManager(retention_policy=RetentionPolicy(max_resident=1))
+        game = game_manager.new_game(['red', 'blue'], 4, 4)
+        game.play_token('red', 2)
+        game.remove_player('blue')
+        game_manager.new_game(['red', 'blue'], 4, 4)
+        archived = game_manager.get_game(game.get_game_id())
+        self.assertTrue(isinstance(archived, ArchivedGame))
+        self.assertEquals(['red'], archived.get_players())
+        self.assertEquals('red', archived.get_winner())
+        self.assertEquals(GameState.DONE, archived.get_game_state())
+        self.assertEquals(2, archived.get_move(0).get_token().get_column())
+        self.assertEquals('blue', archived.get_move(1).get_player())
+        with self.assertRaises(GameEndedException):
+            archived.remove_player('red')
+
+
+    def test_rewind_not_archived_meanwhile(self):
+        game_manager = GameManager(retention_policy=RetentionPolicy(max_resident=1))
+        game = game_manager.new_game(['red', 'blue'], 4, 4)
+        game.play_token('red', 2)
+        game.remove_player('blue')
+        rewind = game.rewind
+        def rewind_racing_new_game(moves):
+            # Another thread makes a game, which archives finished games over max_resident
+            game_manager.new_game(['red', 'blue'], 4, 4)
+            rewind(moves)
+        game.rewind = rewind_racing_new_game
+        with game_manager.lock_game(game.get_game_id()):
+            self.assertEquals(game, game_manager.rewind_game(game.get_game_id(), 1))
+        self.assertEquals(game, game_manager.get_game(game.get_game_id()))
+        self.assertEquals(GameState.IN_PROGRESS, game.get_game_state())
+
+
+    def test_rewind_archived(self):
+        game_manager = GameManager(retention_policy=RetentionPolicy(max_resident=1))
+        game = game_manager.new_game(['red', 'blue'], 4, 4)
+        game.play_token('red', 2)
+        game.remove_player('blue')
+        game_manager.new_game(['red', 'blue'], 4, 4)
+        with game_manager.lock_game(game.get_game_id()):
+            rewound = game_manager.rewind_game(game.get_game_id(), 1)
+        self.assertEquals(rewound, game_manager.get_game(game.get_game_id()))
+        self.assertEquals(['red', 'blue'], rewound.get_players())
+
+
+    def test_evict_done_ttl(self):
+        now = [0]
+        game_manager = GameManager(retention_policy=RetentionPolicy(done_ttl=10, clock=lambda: now[0]))
+        game = game_manager.new_game(['red', 'blue'], 4, 4)
+        in_progress = game_manager.new_game(['red', 'blue'], 4, 4)
+        game.remove_player('blue')
+        now[0] = 5
+        self.assertEquals(game, game_manager.get_game(game.get_game_id()))
+        now[0] = 10
+        self.assertTrue(isinstance(game_manager.get_game(game.get_game_id()), ArchivedGame))
+        self.assertEquals(in_progress, game_manager.get_game(in_progress.get_game_id()))
+
+
+
+    def test_wait_for_moves(self):
+        game = self.game_manager.new_game(['red', 'blue'], 4, 4)
+        timer = threading.Timer(0.05, game.play_token, args=('red', 0))
+        timer.start()
+        self.game_manager.wait_for_moves(game.get_game_id(), 0, 5)
+        timer.join()
+        self.assertEquals(1, len(game.moves_log))
+
+
+    def test_wait_for_moves_timeout(self):
+        game = self.game_manager.new_game(['red', 'blue'], 4, 4)
+        game.play_token('red', 0)
+        self.game_manager.wait_for_moves(game.get_game_id(), 1, 0.05)
+        self.assertEquals(1, len(game.moves_log))
+        self.assertEquals({}, self.game_manager.move_notifier.waiters)
+
+
 
 if __name__ == '__main__':
     unittest.main()
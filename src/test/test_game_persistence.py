@@ -0,0 +1,191 @@
+import shutil
+import tempfile
+import unittest
+from ..lib.archived_game import ArchivedGame
+from ..lib.game_manager import GameManager
+from ..lib.game_persistence import GamePersistence
+from ..lib.game_rules import GameRules
+from ..lib.game_state import GameState
+from ..lib.write_ahead_log import WriteAheadLog
+
+class TestGamePersistence(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+    def recover(self):
+        game_manager = GameManager()
+        persistence = GamePersistence(self.directory, fsync=False)
+        persistence.recover(game_manager)
+        persistence.attach(game_manager)
+        return game_manager, persistence
+
+
+    def test_recover_from_log(self):
+        game_manager, persistence = self.recover()
+        game = game_manager.new_game(['red', 'blue', 'green'], 4, 4)
+        game.play_token('red', 1)
+        game.remove_player('blue')
+        game.play_token('green', 1)
+        persistence.close()
+
+        game_manager, persistence = self.recover()
+        recovered = game_manager.get_game(game.get_game_id())
+        self.assertEquals(['red', 'green'], recovered.get_players())
+        self.assertEquals(3, len(recovered.moves_log))
+        recovered.play_token('red', 2)
+        persistence.close()
+
+
+    def test_recover_from_snapshot_and_log(self):
+        game_manager, persistence = self.recover()
+        done = game_manager.new_game(['red', 'blue'], 4, 4)
+        done.play_token('red', 0)
+        done.remove_player('blue')
+        in_progress = game_manager.new_game(['red', 'blue'], 4, 4)
+        in_progress.play_token('red', 3)
+        persistence.snapshot()
+        in_progress.play_token('blue', 3)
+        persistence.close()
+
+        game_manager, persistence = self.recover()
+        recovered = game_manager.get_game(done.get_game_id())
+        self.assertTrue(isinstance(recovered, ArchivedGame))
+        self.assertEquals('red', recovered.get_winner())
+        self.assertEquals(0, recovered.get_move(0).get_token().get_column())
+        recovered = game_manager.get_game(in_progress.get_game_id())
+        self.assertEquals(GameState.IN_PROGRESS, recovered.get_game_state())
+        self.assertEquals(1, recovered.get_move(1).get_token().get_row())
+        self.assertEquals([in_progress.get_game_id()], game_manager.get_all_games(game_state=GameState.IN_PROGRESS))
+        persistence.close()
+
+
+    def test_recover_quit_from_snapshot(self):
+        game_manager, persistence = self.recover()
+        game = game_manager.new_game(['red', 'blue', 'green'], 4, 4)
+        game.play_token('red', 0)
+        game.remove_player('blue')
+        game.play_token('green', 1)
+        persistence.snapshot()
+        persistence.close()
+
+        game_manager, persistence = self.recover()
+        recovered = game_manager.get_game(game.get_game_id())
+        self.assertEquals(['red', 'green'], recovered.get_players())
+        self.assertEquals(['red', 'blue', 'green'], recovered.moves_log.players)
+        recovered.play_token('red', 2)
+        self.assertEquals('green', recovered.get_move(2).get_player())
+        self.assertEquals('red', recovered.get_move(3).get_player())
+        persistence.close()
+
+
+    def test_recover_undo(self):
+        game_manager, persistence = self.recover()
+        game = game_manager.new_game(['red', 'blue'], 4, 4)
+        game.play_token('red', 0)
+        game.remove_player('blue')
+        persistence.snapshot()
+        game.undo_last_move()
+        game.play_token('blue', 2)
+        persistence.close()
+
+        game_manager, persistence = self.recover()
+        recovered = game_manager.get_game(game.get_game_id())
+        self.assertEquals(GameState.IN_PROGRESS, recovered.get_game_state())
+        self.assertEquals(2, recovered.get_move(1).get_token().get_column())
+        self.assertEquals([game.get_game_id()], game_manager.get_all_games(game_state=GameState.IN_PROGRESS))
+        persistence.close()
+
+
+    def test_recover_versions(self):
+        game_manager, persistence = self.recover()
+        in_progress = game_manager.new_game(['red', 'blue'], 4, 4)
+        done = game_manager.new_game(['red', 'blue'], 4, 4)
+        for game in (in_progress, done):
+            game.play_token('red', 0)
+            game.undo_last_move()
+            game.play_token('red', 1)
+        persistence.snapshot()
+        in_progress.play_token('blue', 1)
+        in_progress.undo_last_move()
+        done.remove_player('blue')
+        persistence.close()
+
+        game_manager, persistence = self.recover()
+        recovered = game_manager.get_game(in_progress.get_game_id())
+        self.assertEquals(in_progress.version, recovered.version)
+        self.assertEquals(5, recovered.version)
+        self.assertEquals(done.version, game_manager.get_game(done.get_game_id()).version)
+        persistence.close()
+
+        # Only from the snapshot
+        game_manager, persistence = self.recover()
+        persistence.snapshot()
+        persistence.close()
+        game_manager, persistence = self.recover()
+        self.assertEquals(5, game_manager.get_game(in_progress.get_game_id()).version)
+        recovered = game_manager.get_game(done.get_game_id())
+        self.assertTrue(isinstance(recovered, ArchivedGame))
+        self.assertEquals(4, recovered.version)
+        persistence.close()
+
+
+    def test_recover_rules(self):
+        game_manager, persistence = self.recover()
+        rules = GameRules(win_length=3, wraparound=True, pop_out=True)
+        in_progress = game_manager.new_game(['red', 'blue'], 4, 4, rules)
+        done = game_manager.new_game(['red', 'blue'], 4, 4, rules)
+        persistence.snapshot()
+        for game in (in_progress, done):
+            game.play_token('red', 0)
+            game.play_token('blue', 1)
+            game.pop_token('red', 0)
+        done.play_token('blue', 2)
+        done.play_token('red', 3)
+        done.play_token('blue', 0)
+        self.assertEquals('blue', done.get_winner())
+        persistence.snapshot()
+        in_progress.play_token('blue', 3)
+        persistence.close()
+
+        game_manager, persistence = self.recover()
+        recovered = game_manager.get_game(in_progress.get_game_id())
+        self.assertEquals(3, recovered.rules.win_length)
+        self.assertTrue(recovered.rules.pop_out)
+        self.assertEquals(None, recovered.get_board().get_token(0, 0))
+        self.assertEquals('blue', recovered.get_board().get_token(3, 0).get_player())
+        recovered = game_manager.get_game(done.get_game_id())
+        self.assertTrue(recovered.rules.wraparound)
+        self.assertEquals('blue', recovered.get_winner())
+        persistence.close()
+
+
+    def test_new_game_ids_after_recovery(self):
+        game_manager, persistence = self.recover()
+        game = game_manager.new_game(['red', 'blue'], 4, 4)
+        persistence.close()
+        GameManager.next_game_id = 1
+
+        game_manager, persistence = self.recover()
+        self.assertNotEquals(game.get_game_id(), game_manager.new_game(['red', 'blue'], 4, 4).get_game_id())
+        persistence.close()
+
+
+    def test_torn_log_record_ignored(self):
+        path = self.directory + '/torn.log'
+        wal = WriteAheadLog(path, fsync=False, flush_interval=None)
+        wal.append(['N', 'gameid1', 4, 4, ['red', 'blue']])
+        wal.close()
+        with open(path, 'ab') as log_file:
+            log_file.write('["M","game')
+        self.assertEquals(1, len(list(WriteAheadLog.read(path))))
+
+
+
+if __name__ == '__main__':
+    unittest.main()
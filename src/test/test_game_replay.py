@@ -0,0 +1,45 @@
+import json
+import unittest
+from ..lib.drop_token_game import DropTokenGame
+from ..lib.game_replay import game_record, replay_record, verify_records
+
+class TestGameReplay(unittest.TestCase):
+
+    def setUp(self):
+        self.game = DropTokenGame(4, 4, ['red', 'blue', 'green'], 'gameid1')
+        for player, col in (('red', 0), ('blue', 1), ('green', 2), ('red', 0), ('blue', 1)):
+            self.game.play_token(player, col)
+        self.game.remove_player('green')
+        for player, col in (('red', 0), ('blue', 1), ('red', 0)):
+            self.game.play_token(player, col)
+
+
+    def test_replay_record(self):
+        record = json.loads(json.dumps(game_record(self.game)))
+        self.assertEquals('red', record['winner'])
+        self.assertEquals(None, replay_record(record))
+
+
+    def test_replay_mismatch(self):
+        record = game_record(self.game)
+        record['winner'] = 'blue'
+        self.assertEquals("winner is red, recorded blue", replay_record(record))
+        record['moves'][1]['player'] = 'red'
+        self.assertTrue(replay_record(record).startswith("move 1: "))
+        self.assertTrue(replay_record({'moves': []}).startswith("malformed record"))
+
+
+    def test_verify_records(self):
+        lines = [json.dumps(game_record(self.game))] * 5 + ['', 'not json']
+        bad = game_record(self.game)
+        bad['state'] = 'IN_PROGRESS'
+        lines.append(json.dumps(bad))
+        for processes in (1, 2):
+            report = verify_records(iter(lines), processes=processes, engine='bitboard', chunk_size=2)
+            self.assertEquals(7, report.games)
+            self.assertEquals(2, len(report.failures))
+            self.assertEquals('gameid1', report.failures[1][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import json
+import unittest
+from ..app import app
+from ..lib import game_service
+from ..lib.exception import GameChangedException
+
+class TestGameService(unittest.TestCase):
+
+    def setUp(self):
+        self.first = game_service.create_new_game(['red', 'blue'], 4, 4)['gameId']
+        self.second = game_service.create_new_game(['red', 'blue'], 4, 4)['gameId']
+
+
+    def test_make_moves(self):
+        output = game_service.make_moves([(self.first, 'red', 0), (self.second, 'red', 9), (self.first, 'blue', 0),
+                                          ('nogame', 'red', 0), (self.second, 'red', 1)])
+        self.assertEquals({'move': '{}/moves/0'.format(self.first)}, output['moves'][0])
+        self.assertEquals(400, output['moves'][1]['status'])
+        self.assertEquals({'move': '{}/moves/1'.format(self.first)}, output['moves'][2])
+        self.assertEquals(404, output['moves'][3]['status'])
+        self.assertEquals({'move': '{}/moves/0'.format(self.second)}, output['moves'][4])
+
+
+    def test_make_moves_stop_on_failure(self):
+        moves = [(self.first, 'blue', 0), (self.second, 'red', 0), (self.first, 'red', 0)]
+        output = game_service.make_moves(moves, stop_on_failure=True)
+        self.assertEquals(409, output['moves'][0]['status'])
+        self.assertEquals({'move': '{}/moves/0'.format(self.second)}, output['moves'][1])
+        self.assertEquals(424, output['moves'][2]['status'])
+        self.assertEquals(0, len(game_service.game_manager.get_game(self.first).moves_log))
+
+
+    def test_make_moves_route(self):
+        body = {'moves': [{'gameId': self.first, 'player': 'red', 'column': 0},
+                          {'gameId': self.first, 'player': 'red', 'column': 1}]}
+        response = app.test_client().post('/drop_token/moves', data=json.dumps(body))
+        self.assertEquals(200, response.status_code)
+        moves = json.loads(response.data)['moves']
+        self.assertEquals({'move': '{}/moves/0'.format(self.first)}, moves[0])
+        self.assertEquals(409, moves[1]['status'])
+        response = app.test_client().post('/drop_token/moves', data=json.dumps({'moves': [{'gameId': self.first}]}))
+        self.assertEquals(400, response.status_code)
+        body['stopOnFailure'] = 'false'
+        response = app.test_client().post('/drop_token/moves', data=json.dumps(body))
+        self.assertEquals(400, response.status_code)
+
+
+    def test_create_rules_route(self):
+        client = app.test_client()
+        body = {'players': ['red', 'blue'], 'columns': 4, 'rows': 4, 'wraparound': True, 'popOut': False}
+        response = client.post('/drop_token', data=json.dumps(body))
+        self.assertEquals(200, response.status_code)
+        game = game_service.game_manager.get_game(json.loads(response.data)['gameId'])
+        self.assertTrue(game.rules.wraparound)
+        self.assertFalse(game.rules.pop_out)
+        for name, value in (('wraparound', 'false'), ('popOut', 1), ('popOut', None)):
+            body = {'players': ['red', 'blue'], 'columns': 4, 'rows': 4, name: value}
+            self.assertEquals(400, client.post('/drop_token', data=json.dumps(body)).status_code)
+
+
+    def test_join_matchmaking_checks_board(self):
+        client = app.test_client()
+        for columns, rows in ((0, 4), (3, 3), (4, 1001)):
+            body = {'player': 'violet', 'columns': columns, 'rows': rows}
+            self.assertEquals(400, client.post('/drop_token/matchmaking', data=json.dumps(body)).status_code)
+        body = {'players': ['red', 'blue'], 'columns': 1001, 'rows': 4}
+        self.assertEquals(400, client.post('/drop_token', data=json.dumps(body)).status_code)
+
+
+    def test_board_etags(self):
+        client = app.test_client()
+        game_service.make_move(self.first, 'red', 0)
+        full = client.get('/drop_token/{}/board'.format(self.first))
+        delta = client.get('/drop_token/{}/board?since=0'.format(self.first))
+        self.assertNotEquals(full.headers['ETag'], delta.headers['ETag'])
+        response = client.get('/drop_token/{}/board?since=0'.format(self.first),
+                              headers={'If-None-Match': full.headers['ETag']})
+        self.assertEquals(200, response.status_code)
+        response = client.get('/drop_token/{}/board?since=0'.format(self.first),
+                              headers={'If-None-Match': delta.headers['ETag']})
+        self.assertEquals(304, response.status_code)
+
+
+    def test_auto_move_searches_without_lock(self):
+        first = self.first
+        class Searcher:
+            def choose_board_column(self, board, player, players, time_budget):
+                lock = game_service.game_manager.lock_game(first)
+                locked = lock.acquire(False)
+                if locked:
+                    lock.release()
+                Searcher.locked = not locked
+                return 2
+        ai_player = game_service.AiPlayer
+        game_service.AiPlayer = Searcher
+        try:
+            self.assertEquals({'move': '{}/moves/0'.format(first), 'column': 2},
+                              game_service.make_auto_move(first, 'red'))
+            self.assertFalse(Searcher.locked)
+        finally:
+            game_service.AiPlayer = ai_player
+
+
+    def test_auto_move_rejected_if_game_changed(self):
+        first = self.first
+        class Searcher:
+            def choose_board_column(self, board, player, players, time_budget):
+                game_service.player_quits(first, 'blue')
+                return 0
+        ai_player = game_service.AiPlayer
+        game_service.AiPlayer = Searcher
+        try:
+            with self.assertRaises(GameChangedException) as context:
+                game_service.make_auto_move(first, 'red')
+            self.assertEquals(409, context.exception.status_code)
+        finally:
+            game_service.AiPlayer = ai_player
+        self.assertEquals(1, len(game_service.game_manager.get_game(first).moves_log))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import random
+import unittest
+from ..lib import line_index
+from ..lib.line_index import LineIndex, get_line_index
+from ..lib.board import Board
+from ..lib.exception import InvalidMoveException
+
+class TestLineIndex(unittest.TestCase):
+
+    def test_lines(self):
+        index = LineIndex(7, 6, 4)
+        # 24 horizontal, 21 vertical and 12 of each diagonal
+        self.assertEquals(69, index.size)
+        # A corner is on one line of each direction but the left diagonal
+        self.assertEquals(3, len(index.cell_lines[0]))
+        # Wrapping around, it is also on 3 more horizontal lines and a left diagonal
+        self.assertEquals(7, len(LineIndex(7, 6, 4, True).cell_lines[0]))
+
+
+    def test_wraparound_full_row(self):
+        # Every start column gives the same row, which is one line
+        index = LineIndex(3, 1, 3, True)
+        self.assertEquals(1, index.size)
+
+
+    def test_shared_and_bounded(self):
+        index = get_line_index(7, 6, 4)
+        self.assertTrue(index is get_line_index(7, 6, 4))
+        self.assertFalse(index is get_line_index(7, 6, 4, True))
+        for width in xrange(1, line_index.MAX_GEOMETRIES + 2):
+            get_line_index(width, 1, 1)
+        self.assertTrue(len(line_index._indexes) <= line_index.MAX_GEOMETRIES)
+        self.assertEquals(None, get_line_index(1000, 1000, 4))
+
+
+    def test_board_counts_match_scan(self):
+        rand = random.Random(3)
+        for trial in xrange(200):
+            width, height = rand.randint(1, 8), rand.randint(1, 8)
+            matches = rand.randint(1, max(width, height))
+            wraparound = rand.random() < 0.5
+            indexed = Board(width, height)
+            scanned = Board(width, height)
+            is_winning = indexed.make_win_check(matches, wraparound)
+            self.assertTrue(indexed.lines is not None)
+            for move in xrange(width * height):
+                try:
+                    token = indexed.add_token(rand.choice(['red', 'blue']), rand.randrange(width))
+                except InvalidMoveException:
+                    continue
+                scanned.add_token(token.get_player(), token.get_column())
+                found = any(scanned._find_matching_consecutive_tokens(token, dx, dy, matches, wraparound) >= matches
+                            for dx, dy in line_index._directions(width, matches, wraparound))
+                self.assertEquals(found, is_winning(token))
+                if found:
+                    break
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import logging
+import unittest
+from ..lib.game_manager import GameManager
+from ..lib.matchmaker import Matchmaker, WIDEN_AFTER
+from ..lib.exception import DuplicatePlayersException, PlayerNotFoundException
+
+class TestMatchmaker(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        self.game_manager = GameManager()
+        self.matchmaker = Matchmaker(self.game_manager, clock=lambda: self.now)
+
+
+    def test_pairs_in_order(self):
+        for player in ['red', 'blue', 'green']:
+            self.matchmaker.join(player, 4, 4)
+        self.matchmaker.join('yellow', 5, 4)
+        games = self.matchmaker.match()
+        self.assertEquals(1, len(games))
+        self.assertEquals(['red', 'blue'], games[0].get_players())
+        self.assertEquals(games[0].get_game_id(), self.matchmaker.get_match('blue'))
+        self.assertEquals(None, self.matchmaker.get_match('green'))
+        self.assertEquals(None, self.matchmaker.get_match('yellow'))
+
+        self.matchmaker.join('black', 4, 4)
+        game = self.matchmaker.match()[0]
+        self.assertEquals(['green', 'black'], game.get_players())
+        self.assertEquals(game, self.game_manager.get_game(self.matchmaker.get_match('green')))
+
+
+    def test_rating_bands_widen(self):
+        self.matchmaker.join('red', 4, 4, 1000)
+        self.matchmaker.join('blue', 4, 4, 1390)
+        self.matchmaker.join('green', 4, 4, 1250)
+        self.assertEquals([], self.matchmaker.match())
+        self.now += WIDEN_AFTER
+        game = self.matchmaker.match()[0]
+        self.assertEquals(['blue', 'green'], sorted(game.get_players()))
+        self.assertEquals([], self.matchmaker.match())
+        self.now += WIDEN_AFTER
+        self.matchmaker.join('yellow', 4, 4, 1250)
+        self.assertEquals([['red', 'yellow']], [game.get_players() for game in self.matchmaker.match()])
+
+
+    def test_leave(self):
+        self.matchmaker.join('red', 4, 4)
+        self.assertRaises(DuplicatePlayersException, self.matchmaker.join, 'red', 4, 4)
+        self.matchmaker.leave('red')
+        self.assertRaises(PlayerNotFoundException, self.matchmaker.leave, 'red')
+        self.assertRaises(PlayerNotFoundException, self.matchmaker.get_match, 'red')
+        for player in ['blue', 'green', 'yellow']:
+            self.matchmaker.join(player, 4, 4)
+        self.matchmaker.leave('green')
+        self.assertEquals([['blue', 'yellow']], [game.get_players() for game in self.matchmaker.match()])
+
+
+    def test_bulk_new_games(self):
+        created = []
+        self.game_manager.add_game_listener(created.append)
+        games = self.game_manager.new_games([(['red', 'blue'], 4, 4, None), (['red', 'green'], 5, 5, None)])
+        self.assertEquals(games, created)
+        self.assertEquals(sorted(game.get_game_id() for game in games),
+                          sorted(self.game_manager.get_player_games('red')))
+
+
+
+    def test_failed_games_dropped(self):
+        class FailingManager(GameManager):
+            def new_games(self, games):
+                raise RuntimeError("new_games failed")
+            def new_game(self, players, columns, rows, rules=None):
+                if 'black' in players:
+                    raise RuntimeError("new_game failed")
+                return GameManager.new_game(self, players, columns, rows, rules)
+        matchmaker = Matchmaker(FailingManager(), clock=lambda: self.now)
+        for player in ['red', 'blue', 'green', 'black']:
+            matchmaker.join(player, 4, 4)
+        logging.disable(logging.ERROR)
+        try:
+            games = matchmaker.match()
+        finally:
+            logging.disable(logging.NOTSET)
+        self.assertEquals([['red', 'blue']], [game.get_players() for game in games])
+        self.assertEquals(games[0].get_game_id(), matchmaker.get_match('red'))
+        self.assertRaises(PlayerNotFoundException, matchmaker.get_match, 'black')
+        self.assertEquals({}, matchmaker.pairing)
+        matchmaker.join('black', 4, 4)
+
+
+    def test_thread_starts_with_first_player(self):
+        self.matchmaker.start()
+        self.assertEquals(None, self.matchmaker.thread)
+        self.matchmaker.join('red', 4, 4)
+        self.assertTrue(self.matchmaker.thread.is_alive())
+        self.matchmaker.stop()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+from ..lib import metrics
+from ..lib.metrics import Counter, Histogram, Registry
+
+class TestMetrics(unittest.TestCase):
+
+    def test_counter(self):
+        counter = Counter()
+        counter.inc()
+        counter.inc()
+        self.assertEquals(2, counter.get())
+
+
+    def test_histogram(self):
+        histogram = Histogram((0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+        self.assertEquals(([2, 3, 4], 4, 3.65), histogram.snapshot())
+
+
+    def test_render(self):
+        registry = Registry()
+        registry.counter('calls_total', "Calls.", ('route',)).labels('a"b').inc()
+        registry.histogram('latency_seconds', "Latency.", buckets=(0.5,)).labels().observe(0.25)
+        text = metrics.render(metrics.add_labels(registry.collect(), [('shard', '0')]))
+        self.assertEquals('# HELP calls_total Calls.\n'
+                          '# TYPE calls_total counter\n'
+                          'calls_total{shard="0",route="a\\"b"} 1\n'
+                          '# HELP latency_seconds Latency.\n'
+                          '# TYPE latency_seconds histogram\n'
+                          'latency_seconds_bucket{shard="0",le="0.5"} 1\n'
+                          'latency_seconds_bucket{shard="0",le="+Inf"} 1\n'
+                          'latency_seconds_sum{shard="0"} 0.25\n'
+                          'latency_seconds_count{shard="0"} 1\n', text)
+
+
+    @unittest.skipUnless(metrics.ENABLED, "DROP_TOKEN_METRICS=0")
+    def test_timed_samples(self):
+        @metrics.timed('test.sampled', sample_every=4)
+        def double(x):
+            return 2 * x
+        self.assertEquals([0, 2, 4, 6, 8, 10, 12, 14, 16], map(double, xrange(9)))
+        self.assertEquals(9, metrics.FUNCTION_CALLS.labels('test.sampled').get())
+        self.assertEquals(3, metrics.FUNCTION_SECONDS.labels('test.sampled').snapshot()[1])
+
+
+    def test_timed_off(self):
+        enabled = metrics.ENABLED
+        metrics.ENABLED = False
+        try:
+            function = lambda: None
+            self.assertTrue(metrics.timed('test.off')(function) is function)
+        finally:
+            metrics.ENABLED = enabled
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+from ..lib.archived_game import ArchivedGame
+from ..lib.game_manager import GameManager
+from ..lib.player_stats import PlayerStats
+from ..lib.retention_policy import RetentionPolicy
+
+class TestPlayerStats(unittest.TestCase):
+
+    def setUp(self):
+        self.game_manager = GameManager()
+        self.player_stats = PlayerStats()
+        self.player_stats.attach(self.game_manager)
+
+
+    def play(self, players, columns):
+        game = self.game_manager.new_game(players, 4, 4)
+        for col in columns:
+            game.play_token(game.get_players()[game.curr_player_idx], col)
+        return game
+
+
+    def test_win_and_quit(self):
+        self.play(['red', 'blue'], [0, 1, 0, 1, 0, 1, 0])
+        game = self.play(['red', 'blue', 'green'], [])
+        game.remove_player('red')
+        game.remove_player('green')
+        self.assertEquals((1, 1, 0), self.player_stats.get_player_stats('red'))
+        self.assertEquals((1, 1, 0), self.player_stats.get_player_stats('blue'))
+        self.assertEquals((0, 1, 0), self.player_stats.get_player_stats('green'))
+        self.assertEquals((0, 0, 0), self.player_stats.get_player_stats('nobody'))
+
+
+    def test_draw(self):
+        self.play(['red', 'blue'], [0, 0, 0, 0, 1, 1, 1, 1, 3, 2, 2, 2, 2, 3, 3, 3])
+        self.assertEquals((0, 0, 1), self.player_stats.get_player_stats('red'))
+        self.assertEquals((0, 0, 1), self.player_stats.get_player_stats('blue'))
+
+
+    def test_undo_takes_result_back(self):
+        game = self.play(['red', 'blue'], [0, 1, 0, 1, 0, 1, 0])
+        game.undo_last_move()
+        self.assertEquals([], self.player_stats.get_leaderboard(10))
+        game.play_token('red', 2)
+        game.play_token('blue', 1)
+        self.assertEquals([('blue', 1, 0, 0), ('red', 0, 1, 0)], self.player_stats.get_leaderboard(10))
+
+
+    def test_leaderboard(self):
+        for players in (['red', 'blue'], ['green', 'blue'], ['green', 'red'], ['green', 'orange']):
+            self.play(players, [0, 1, 0, 1, 0, 1, 0])
+        self.assertEquals([('green', 3, 0, 0), ('red', 1, 1, 0)], self.player_stats.get_leaderboard(2))
+
+
+    def test_attach_counts_finished_games(self):
+        self.play(['red', 'blue'], [0, 1, 0, 1, 0, 1, 0])
+        player_stats = PlayerStats()
+        player_stats.attach(self.game_manager)
+        self.assertEquals([('red', 1, 0, 0), ('blue', 0, 1, 0)], player_stats.get_leaderboard(5))
+
+
+
+    def test_restored_games(self):
+        other_manager = GameManager()
+        done = other_manager.new_game(['red', 'blue'], 4, 4)
+        done.remove_player('blue')
+        archived = other_manager.new_game(['green', 'blue'], 4, 4)
+        archived.remove_player('green')
+        self.game_manager.restore_games([done, ArchivedGame.from_game(archived)])
+        self.assertEquals([('red', 1, 0, 0), ('blue', 1, 1, 0), ('green', 0, 1, 0)],
+                          self.player_stats.get_leaderboard(5))
+        self.assertEquals([done.get_game_id()], self.player_stats.results.keys())
+
+
+    def test_archived_results_dropped(self):
+        game_manager = GameManager(retention_policy=RetentionPolicy(max_resident=1))
+        player_stats = PlayerStats()
+        player_stats.attach(game_manager)
+        game = game_manager.new_game(['red', 'blue'], 4, 4)
+        game.remove_player('blue')
+        for i in xrange(2):
+            game_manager.new_game(['green', 'blue'], 4, 4)
+        self.assertTrue(isinstance(game_manager.get_game(game.get_game_id()), ArchivedGame))
+        self.assertEquals({}, player_stats.results)
+        self.assertEquals((1, 0, 0), player_stats.get_player_stats('red'))
+
+        # An undo once the game is back takes its result back
+        game_manager.unarchive_game(game.get_game_id()).undo_last_move()
+        self.assertEquals((0, 0, 0), player_stats.get_player_stats('red'))
+        self.assertEquals([], player_stats.get_leaderboard(5))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import json
+import unittest
+from ..lib import json_encoder
+from ..lib.drop_token_game import DropTokenGame
+from ..lib.exception import *
+
+def encode_move(move):
+    return json.dumps([move.get_player(), move.get_move_number()])
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.game = DropTokenGame(4, 4, ['red', 'blue'], 1)
+        self.cache = self.game.get_response_cache()
+
+
+    def test_get_rebuilds_on_new_version(self):
+        builds = []
+        def build():
+            builds.append(self.game.version)
+            return str(self.game.version)
+        self.assertEquals('0', self.cache.get('state', self.game.version, build))
+        self.assertEquals('0', self.cache.get('state', self.game.version, build))
+        self.game.play_token('red', 0)
+        self.assertEquals('1', self.cache.get('state', self.game.version, build))
+        self.assertEquals([0, 1], builds)
+
+
+    def test_get_fragments(self):
+        self.game.play_token('red', 0)
+        self.game.play_token('blue', 0)
+        fragments = self.cache.get_fragments(self.game.moves_log, 1, None, encode_move)
+        self.assertEquals([['blue', 1]], map(json.loads, fragments))
+        self.game.undo_last_move()
+        self.game.play_token('blue', 3)
+        self.game.play_token('red', 3)
+        fragments = self.cache.get_fragments(self.game.moves_log, None, None, encode_move)
+        self.assertEquals([['red', 0], ['blue', 1], ['red', 2]], map(json.loads, fragments))
+        self.assertEquals(3, len(self.cache.fragments))
+        with self.assertRaises(MovesNotFoundException):
+            self.cache.get_fragments(self.game.moves_log, 2, 3, encode_move)
+
+
+    def test_set_encoder(self):
+        json_encoder.set_encoder(lambda obj: 'encoded')
+        try:
+            self.assertEquals('encoded', json_encoder.dumps({}))
+        finally:
+            json_encoder.set_encoder(None)
+        self.assertEquals('{"a":1}', json_encoder.dumps({'a': 1}))
+
+
+if __name__ == '__main__':
+    unittest.main()
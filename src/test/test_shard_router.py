@@ -0,0 +1,94 @@
+import json
+import unittest
+from ..lib.shard_router import ShardRouter
+from ..lib.game_state import GameState
+from ..lib.exception import *
+
+class TestShardRouter(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.router = ShardRouter.start(2)
+
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.router.stop()
+
+
+    def test_games_spread_over_shards(self):
+        game_ids = [self.router.create_new_game(['red', 'blue'], 4, 4)['gameId'] for i in xrange(4)]
+        self.assertEquals(4, len(set(game_ids)))
+        self.assertEquals(set([0, 1]), set(self.router.shard_for(game_id) for game_id in game_ids))
+        self.assertTrue(set(game_ids) <= set(self.router.get_all_in_progress_games()['games']))
+
+
+    def test_paginate_games(self):
+        game_ids = [self.router.create_new_game(['red', 'blue'], 4, 4)['gameId'] for i in xrange(5)]
+        listed = []
+        cursor = None
+        while True:
+            page = self.router.get_all_in_progress_games(limit=2, cursor=cursor)
+            self.assertTrue(len(page['games']) <= 2)
+            listed.extend(page['games'])
+            if 'cursor' not in page:
+                break
+            cursor = page['cursor']
+        self.assertEquals(sorted(self.router.get_all_in_progress_games()['games']), sorted(listed))
+        self.assertEquals(game_ids, [game_id for game_id in listed if game_id in game_ids])
+
+
+    def test_player_games(self):
+        game_ids = [self.router.create_new_game(['orange', 'blue'], 4, 4)['gameId'] for i in xrange(3)]
+        self.router.player_quits(game_ids[1], 'orange')
+        page = self.router.get_player_games('orange', GameState.IN_PROGRESS, limit=1)
+        self.assertEquals([game_ids[0]], page['games'])
+        page = self.router.get_player_games('orange', GameState.IN_PROGRESS, limit=1, cursor=page['cursor'])
+        self.assertEquals({'games': [game_ids[2]]}, page)
+        self.assertEquals([game_ids[1]], self.router.get_player_games('orange', GameState.DONE)['games'])
+
+
+    def test_make_moves_keep_order(self):
+        game_ids = [self.router.create_new_game(['red', 'blue'], 4, 4)['gameId'] for i in xrange(2)]
+        self.assertNotEquals(self.router.shard_for(game_ids[0]), self.router.shard_for(game_ids[1]))
+        moves = [(game_ids[0], 'red', 0), (game_ids[1], 'red', 1), (game_ids[0], 'red', 2),
+                 (game_ids[1], 'blue', 3), (game_ids[0], 'blue', 0)]
+        output = self.router.make_moves(moves, stop_on_failure=True)['moves']
+        self.assertEquals({'move': '{}/moves/0'.format(game_ids[0])}, output[0])
+        self.assertEquals({'move': '{}/moves/0'.format(game_ids[1])}, output[1])
+        self.assertEquals(409, output[2]['status'])
+        self.assertEquals({'move': '{}/moves/1'.format(game_ids[1])}, output[3])
+        self.assertEquals(424, output[4]['status'])
+
+
+    def test_player_stats_add_up(self):
+        for i in xrange(2):
+            game_id = self.router.create_new_game(['violet', 'black'], 4, 4)['gameId']
+            self.router.player_quits(game_id, 'black')
+        self.assertEquals({'player': 'violet', 'wins': 2, 'losses': 0, 'draws': 0},
+                          self.router.get_player_stats('violet'))
+        self.assertEquals({'player': 'violet', 'wins': 2, 'losses': 0, 'draws': 0},
+                          self.router.get_leaderboard(1)['leaderboard'][0])
+        self.assertEquals([{'player': 'black', 'wins': 0, 'losses': 2, 'draws': 0},
+                           {'player': 'nobody', 'wins': 0, 'losses': 0, 'draws': 0}],
+                          self.router.get_players_stats(['black', 'nobody'])['players'])
+
+
+    def test_forward_to_owner(self):
+        game_id = self.router.create_new_game(['red', 'blue'], 4, 4)['gameId']
+        self.router.make_move(game_id, 'red', 2)
+        moves = json.loads(self.router.get_game_moves(game_id))['moves']
+        self.assertEquals([{'type': 'MOVE', 'player': 'red', 'column': 2}], moves)
+
+
+    def test_errors_forwarded(self):
+        game_id = self.router.create_new_game(['red', 'blue'], 4, 4)['gameId']
+        with self.assertRaises(NotYourTurnException):
+            self.router.make_move(game_id, 'blue', 2)
+        with self.assertRaises(GameNotFoundException):
+            self.router.get_game_state('nope')
+
+
+
+if __name__ == '__main__':
+    unittest.main()
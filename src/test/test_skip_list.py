@@ -0,0 +1,38 @@
+import random
+import unittest
+from ..lib.skip_list import SkipList
+
+class TestSkipList(unittest.TestCase):
+
+    def test_sorted(self):
+        skip_list = SkipList(seed=1)
+        for key in [5, 1, 4, 1, 3]:
+            skip_list.add(key)
+        self.assertEquals([1, 3, 4, 5], list(skip_list))
+        self.assertEquals([1, 3], skip_list.first(2))
+        skip_list.remove(4)
+        self.assertEquals([1, 3, 5], list(skip_list))
+        self.assertTrue(3 in skip_list)
+        self.assertFalse(4 in skip_list)
+        with self.assertRaises(KeyError):
+            skip_list.remove(4)
+
+
+    def test_matches_sorted_set(self):
+        rand = random.Random(2)
+        skip_list = SkipList(seed=2)
+        keys = set()
+        for i in xrange(5000):
+            key = rand.randrange(500)
+            if key in keys:
+                skip_list.remove(key)
+                keys.discard(key)
+            else:
+                skip_list.add(key)
+                keys.add(key)
+        self.assertEquals(sorted(keys), list(skip_list))
+        self.assertEquals(len(keys), len(skip_list))
+
+
+if __name__ == '__main__':
+    unittest.main()
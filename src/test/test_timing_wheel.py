@@ -0,0 +1,49 @@
+import unittest
+from ..lib.timing_wheel import TimingWheel
+
+class TestTimingWheel(unittest.TestCase):
+
+    def setUp(self):
+        self.wheel = TimingWheel(1, 0)
+
+
+    def test_expire(self):
+        self.wheel.schedule('a', 4, 'value')
+        self.wheel.schedule('b', 2.5)
+        self.assertEquals([], self.wheel.advance(2))
+        self.assertEquals([('b', None)], self.wheel.advance(3))
+        self.assertEquals([('a', 'value')], self.wheel.advance(4))
+        self.assertEquals(0, len(self.wheel))
+
+
+    def test_reschedule_and_cancel(self):
+        self.wheel.schedule('a', 3)
+        self.wheel.schedule('b', 3)
+        self.wheel.schedule('a', 10)
+        self.wheel.cancel('b')
+        self.assertEquals([], self.wheel.advance(9))
+        self.assertEquals([('a', None)], self.wheel.advance(10))
+
+
+    def test_far_timers_cascade(self):
+        # 2 levels cover 65536 ticks, timers further away wait in the top level
+        self.wheel.LEVELS = 2
+        self.wheel.wheels = self.wheel.wheels[:2]
+        deadlines = [255, 256, 257, 65535, 70000, 200000, 200300]
+        for deadline in deadlines:
+            self.wheel.schedule(deadline, deadline)
+        expired = []
+        for now in deadlines:
+            self.assertEquals([], self.wheel.advance(now - 1))
+            expired.extend(key for key, value in self.wheel.advance(now))
+        self.assertEquals(deadlines, expired)
+
+
+    def test_past_deadline(self):
+        self.wheel.advance(5)
+        self.wheel.schedule('a', 1)
+        self.assertEquals([('a', None)], self.wheel.advance(6))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+from ..lib.game_manager import GameManager
+from ..lib.game_rules import GameRules
+from ..lib.game_state import GameState
+from ..lib.turn_clock import TurnClock
+
+class TestTurnClock(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        self.game_manager = GameManager()
+        self.turn_clock = TurnClock(10, clock=lambda: self.now)
+        self.turn_clock.attach(self.game_manager)
+
+
+    def test_forfeit(self):
+        game = self.game_manager.new_game(['red', 'blue', 'green'], 4, 4)
+        self.now += 9
+        self.assertEquals([], self.turn_clock.expire())
+        self.now += 1
+        self.assertEquals([(game.get_game_id(), 'red')], self.turn_clock.expire())
+        self.assertEquals(['blue', 'green'], game.get_players())
+        self.now += 10
+        self.assertEquals([(game.get_game_id(), 'blue')], self.turn_clock.expire())
+        self.assertEquals(GameState.DONE, game.get_game_state())
+        self.assertEquals('green', game.get_winner())
+        self.now += 100
+        self.assertEquals([], self.turn_clock.expire())
+
+
+    def test_move_resets_deadline(self):
+        game = self.game_manager.new_game(['red', 'blue'], 4, 4)
+        self.now += 8
+        game.play_token('red', 0)
+        self.now += 8
+        self.assertEquals([], self.turn_clock.expire())
+        self.now += 2
+        self.assertEquals([(game.get_game_id(), 'blue')], self.turn_clock.expire())
+        self.assertEquals('red', game.get_winner())
+
+
+    def test_undo_restarts_clock(self):
+        game = self.game_manager.new_game(['red', 'blue'], 4, 4)
+        game.remove_player('red')
+        self.now += 20
+        self.assertEquals([], self.turn_clock.expire())
+        game.undo_last_move()
+        self.now += 10
+        self.assertEquals([(game.get_game_id(), 'red')], self.turn_clock.expire())
+
+
+    def test_game_turn_timeout(self):
+        game = self.game_manager.new_game(['red', 'blue'], 4, 4, GameRules(turn_timeout=2))
+        untimed = TurnClock(clock=lambda: self.now)
+        other_game = self.game_manager.new_game(['red', 'blue'], 4, 4)
+        untimed.attach(self.game_manager)
+        self.now += 2
+        self.assertEquals([(game.get_game_id(), 'red')], untimed.expire())
+        self.now += 100
+        self.assertEquals([], untimed.expire())
+        self.assertEquals(GameState.IN_PROGRESS, other_game.get_game_state())
+
+
+
+    def test_restored_games(self):
+        game = GameManager().new_game(['red', 'blue'], 4, 4)
+        self.game_manager.restore_games([game])
+        self.now += 10
+        self.assertEquals([(game.get_game_id(), 'red')], self.turn_clock.expire())
+
+
+    def test_thread_starts_with_first_deadline(self):
+        untimed = TurnClock(clock=lambda: self.now)
+        untimed.attach(self.game_manager)
+        untimed.start()
+        self.game_manager.new_game(['red', 'blue'], 4, 4)
+        self.assertEquals(None, untimed.thread)
+        self.game_manager.new_game(['red', 'blue'], 4, 4, GameRules(turn_timeout=2))
+        self.assertTrue(untimed.thread.is_alive())
+        untimed.stop()
+
+if __name__ == '__main__':
+    unittest.main()